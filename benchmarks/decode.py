@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+比较各解码模式的耗时
+
+使用方法::
+
+    python benchmarks/decode.py [行政区数量] [重复次数]
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lbs.core import decoder  # noqa: E402
+from lbs.core.decoder import JsonDecoder  # noqa: E402
+
+
+def make_content(count):
+    # 模拟 extensions=all 的行政区查询结果
+    districts = []
+    for i in range(count):
+        districts.append({
+            'adcode': '%06d' % i, 'name': '区县%d' % i, 'level': 'district', 'citycode': '020',
+            'center': '113.%d,23.%d' % (i, i),
+            'polyline': ';'.join('113.%06d,23.%06d' % (i, j) for j in range(200)),
+            'districts': [
+                {'adcode': '%06d' % i, 'name': '街道%d' % j, 'level': 'street', 'center': '113.1,23.1', 'districts': []}
+                for j in range(20)
+            ],
+        })
+    return json.dumps({'status': '1', 'info': 'OK', 'count': str(count), 'districts': districts},
+                      ensure_ascii=False).encode('utf-8')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    content = make_content(count)
+    print("响应大小: %.2f MB, orjson: %s" % (len(content) / 1024.0 / 1024.0, decoder.orjson is not None))
+    cases = [('object', False), ('dict', False), ('lazy', False)]
+    if decoder.orjson is not None:
+        cases.extend([('dict', True), ('lazy', True)])
+    # 旧实现：先将响应复制为 str 再解析
+    seconds = min(timeit.repeat(lambda: json.loads(content.decode('utf-8')), number=number, repeat=3)) / number
+    print("%-6s orjson=%-5s 解码 %8.2f ms" % ('str', False, seconds * 1000))
+    for mode, use_orjson in cases:
+        json_decoder = JsonDecoder(mode, use_orjson=use_orjson)
+        seconds = min(timeit.repeat(lambda: json_decoder.loads(content), number=number, repeat=3)) / number
+        # 解码后访问一个嵌套字段
+        access = min(timeit.repeat(
+            lambda: json_decoder.loads(content)['districts'][0]['districts'][0]['name'], number=number, repeat=3
+        )) / number
+        print("%-6s orjson=%-5s 解码 %8.2f ms  解码并访问 %8.2f ms" % (
+            mode, json_decoder.use_orjson, seconds * 1000, access * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+基于 asyncio 的异步客户端（需要 Python 3.5+ 及 aiohttp）
+
+使用方法::
+
+    from lbs.client.aio import AsyncAmapClient
+
+    async with AsyncAmapClient('key') as client:
+        result = await client.geocode.geo("北京")
+"""
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import collections
+import copy
+import functools
+import inspect
+import itertools
+import time
+
+from six.moves.urllib.parse import urlparse
+
+from lbs.client.amap import AmapClient
+from lbs.client.baidu import BaiduMapClient
+from lbs.client.paginator import PageState, Paginator
+from lbs.client.qq import QQMapClient
+from lbs.core.batch import BatchResult, chunk_results, chunked
+from lbs.core.exceptions import LbsClientException
+from lbs.core.singleflight import FlightCall
+from lbs.core.utils import to_text
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class AsyncResponse(object):
+    """
+    已读取完毕的 aiohttp 响应，提供与 requests.Response 一致的属性，
+    使同步客户端的结果解析和错误处理逻辑可以直接复用
+    """
+
+    def __init__(self, response, content):
+        self.raw = response
+        self.content = content
+        self.status_code = response.status
+        self.headers = response.headers
+        self.url = response.url
+        self.request = response.request_info
+
+
+class AsyncPaginator(Paginator):
+    """
+    异步分页迭代器，使用 ``async for`` 迭代，参数同 :class:`lbs.client.paginator.Paginator`
+    """
+
+    def __iter__(self):
+        raise TypeError("异步分页迭代器请使用 async for")
+
+    def __aiter__(self):
+        return _AsyncPageIterator(self)
+
+
+class _AsyncPageIterator(object):
+
+    def __init__(self, paginator):
+        self.paginator = paginator
+        self.state = PageState(paginator.start_page, paginator.dedup)
+        self.items = collections.deque()
+        self.task = None
+        self.has_next = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        paginator = self.paginator
+        while True:
+            while self.items:
+                item = self.items.popleft()
+                if not paginator._is_duplicate(self.state, item):
+                    return item
+            if not self.has_next:
+                raise StopAsyncIteration
+            task = self.task if self.task is not None else asyncio.ensure_future(paginator.func(self.state.page))
+            self.task = None
+            items, self.has_next = paginator._handle_page(self.state, await task)
+            if self.has_next and paginator.prefetch:
+                self.task = asyncio.ensure_future(paginator.func(self.state.page))
+            self.items.extend(items)
+
+
+class AsyncBatch(object):
+    """
+    异步分块并发请求，使用 ``async for`` 按输入顺序逐个返回 :class:`lbs.core.batch.BatchResult`，
+    参数同 :func:`lbs.core.batch.imap_chunks`，func 返回 awaitable；
+    chunk_size 为 None 时不分块，同 :func:`lbs.core.batch.imap_items`
+
+    同时进行中的块数不超过 max_workers
+    """
+
+    def __init__(self, func, iterable, chunk_size, max_workers=4):
+        self.func = func
+        self.iterable = iterable
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    def __iter__(self):
+        raise TypeError("异步批量请求请使用 async for")
+
+    def __aiter__(self):
+        return _AsyncBatchIterator(self)
+
+
+class _AsyncBatchIterator(object):
+
+    def __init__(self, batch):
+        self.batch = batch
+        if batch.chunk_size is None:
+            self.chunks = enumerate(batch.iterable)
+        else:
+            self.chunks = enumerate(chunked(batch.iterable, batch.chunk_size))
+        self.pending = None
+        self.items = collections.deque()
+
+    def __aiter__(self):
+        return self
+
+    def _submit(self, n):
+        for chunk_index, chunk in itertools.islice(self.chunks, n):
+            self.pending.append((chunk_index, chunk, asyncio.ensure_future(self._call(chunk))))
+
+    async def _call(self, chunk):
+        result = self.batch.func(chunk)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def __anext__(self):
+        if self.pending is None:
+            self.pending = collections.deque()
+            self._submit(self.batch.max_workers)
+        while not self.items:
+            if not self.pending:
+                raise StopAsyncIteration
+            chunk_index, chunk, task = self.pending.popleft()
+            self._submit(1)
+            try:
+                results, error = await task, None
+            except Exception as e:
+                results, error = None, e
+            if self.batch.chunk_size is None:
+                self.items.append(BatchResult(chunk_index, chunk, results, error))
+            else:
+                self.items.extend(chunk_results(chunk_index * self.batch.chunk_size, chunk, results, error))
+        return self.items.popleft()
+
+
+class AsyncSingleFlight(object):
+    """
+    合并并发的相同协程调用，参数同 :class:`lbs.core.singleflight.SingleFlight`
+
+    请求在独立的 Task 中执行，发起请求的调用被取消时不影响其它等待者
+    """
+
+    def __init__(self, copy_result=copy.deepcopy):
+        self.copy_result = copy_result
+        self.shared = 0
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        """
+        执行或等待相同 key 的进行中调用
+
+        :param key: 调用标识
+        :param func: 返回 awaitable 的调用函数
+        :return: func 的结果
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            # 已完成的调用在 _done 执行前仍留在 _calls 中，此时加入将得不到结果副本
+            call = self._calls[key] = FlightCall()
+            call.task = asyncio.ensure_future(func(*args, **kwargs))
+            call.task.add_done_callback(functools.partial(self._done, key, call))
+            return await asyncio.shield(call.task)
+        call.waiters += 1
+        self.shared += 1
+        await asyncio.shield(call.task)
+        if call.error is not None:
+            raise call.error
+        return call.copies.pop()
+
+    def _done(self, key, call, task):
+        # 在所有等待者恢复执行之前调用
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        try:
+            call.copies = [self.copy_result(task.result()) for _ in range(call.waiters)]
+        except Exception as e:
+            call.error = e
+
+
+class AsyncClientMixin(object):
+    """
+    异步客户端，与同步客户端组合使用，所有接口方法均返回 awaitable
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        :param session: 自定义 aiohttp.ClientSession，不传时在首次请求时按 pool_maxsize/keep_alive 创建
+        """
+        self._session = kwargs.pop('session', None)
+        self._own_session = self._session is None
+        super(AsyncClientMixin, self).__init__(*args, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None:
+            if aiohttp is None:
+                raise RuntimeError("异步客户端需要安装 aiohttp")
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_maxsize, force_close=not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """
+        关闭客户端创建的连接池
+        """
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @classmethod
+    def _encode_params(cls, params):
+        encoded = list()
+        for k, v in params.items():
+            if isinstance(v, (list, tuple)):
+                encoded.extend((k, to_text(x)) for x in v)
+            else:
+                encoded.append((k, to_text(v)))
+        return encoded
+
+    async def _local_result(self, result):
+        return result
+
+    def _paginate(self, func, items_field, **kwargs):
+        return AsyncPaginator(func, items_field, **kwargs)
+
+    def _imap_chunks(self, func, iterable, chunk_size, max_workers=4):
+        return AsyncBatch(func, iterable, chunk_size, max_workers)
+
+    def _imap_items(self, func, iterable, max_workers=4):
+        return AsyncBatch(func, iterable, None, max_workers)
+
+    async def _collect_batch(self, batch, processor):
+        items = []
+        async for item in batch:
+            items.append(item)
+        return processor(items)
+
+    async def _request(self, method, url_or_endpoint, **kwargs):
+        url = self._real_url(url_or_endpoint, kwargs)
+        if 'params' not in kwargs:
+            kwargs['params'] = {}
+        timeout = kwargs.pop('timeout', self.timeout)
+        result_processor = kwargs.pop('result_processor', None)
+        cache_key, cache_ttl, result = self._cache_get(method, url, kwargs)
+        if result is not None:
+            if result_processor is not None:
+                result = result_processor(result)
+            return result
+        if self.rate_limiter is not None:
+            await asyncio.sleep(self.rate_limiter.reserve(urlparse(url).path))
+        request_kwargs = dict(kwargs, params=self._encode_params(kwargs['params']))
+        if timeout is not None and aiohttp is not None:
+            request_kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self._get_session().request(method, url, **request_kwargs) as response:
+            res = AsyncResponse(response, await response.read())
+        if res.status_code >= 400:
+            self.get_logger().error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：HTTP %s",
+                                    url, kwargs.get('params', ''), kwargs.get('data', ''), res.status_code)
+            raise LbsClientException(
+                errcode=None,
+                errmsg=None,
+                client=self,
+                request=res.request,
+                response=res
+            )
+
+        result = self._handle_result(res, method, url, **kwargs)
+        self._cache_set(cache_key, cache_ttl, result)
+        if result_processor is not None:
+            result = result_processor(result)
+
+        self.get_logger().debug("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【响应数据】：%s",
+                                url, kwargs.get('params', ''), kwargs.get('data', ''), result)
+        return result
+
+    def _create_single_flight(self):
+        return AsyncSingleFlight()
+
+    async def request(self, method, uri, **kwargs):
+        flight_key = self._single_flight_key(method, uri, kwargs)
+        if flight_key is None:
+            return await self._do_request(method, uri, **kwargs)
+        result_processor = kwargs.pop('result_processor', None)
+        result = await self.single_flight.do(flight_key, self._do_request, method, uri, **kwargs)
+        if result_processor is not None:
+            result = result_processor(result)
+        return result
+
+    async def _do_request(self, method, uri, **kwargs):
+        origin_kwargs = self._copy_request_kwargs(kwargs)
+        method, uri_with_key, kwargs = self._handle_pre_request(method, uri, kwargs)
+        pool_key = self._get_pool_key(kwargs)
+        transport_errors = (asyncio.TimeoutError, ) if aiohttp is None else (asyncio.TimeoutError, aiohttp.ClientError)
+        start = time.time()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return await self._request(method, uri_with_key, **kwargs)
+                except LbsClientException as e:
+                    delay = self._retry_delay(method, e, attempt, start)
+                    if delay is None:
+                        if self._cooldown_pool_key(pool_key, e):
+                            break
+                        return self._handle_request_except(e, self._do_request, method, uri, **kwargs)
+                except transport_errors as e:
+                    delay = self._retry_delay(method, e, attempt, start, transport=True)
+                    if delay is None:
+                        raise
+                await asyncio.sleep(delay)
+                attempt += 1
+        finally:
+            self._release_pool_key(pool_key)
+        # 切换 key 重新请求
+        return await self._do_request(method, uri, **origin_kwargs)
+
+
+class AsyncAmapClient(AsyncClientMixin, AmapClient):
+    """
+    高德地图异步客户端，参数同 :class:`lbs.client.amap.AmapClient`
+    """
+
+
+class AsyncQQMapClient(AsyncClientMixin, QQMapClient):
+    """
+    qq地图异步客户端，参数同 :class:`lbs.client.qq.QQMapClient`
+    """
+
+
+class AsyncBaiduMapClient(AsyncClientMixin, BaiduMapClient):
+    """
+    百度地图异步客户端，参数同 :class:`lbs.client.baidu.BaiduMapClient`
+    """
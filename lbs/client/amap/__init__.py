@@ -3,6 +3,7 @@ from __future__ import absolute_import, unicode_literals
 
 from lbs.core import utils, model
 from lbs.core.exceptions import LbsClientException
+from lbs.core.keypool import KeyPool
 from lbs.client.base import BaseClient
 from . import api
 
@@ -10,6 +11,10 @@ from . import api
 class AmapClient(BaseClient):
 
     API_BASE_URL = "https://restapi.amap.com/"
+    # 访问过于频繁、QPS超限、服务器繁忙等可重试的 infocode
+    RETRY_ERRCODES = ('10004', '10014', '10015', '10016', '10019', '10020', '10021')
+    # 配额用尽、key 无效等需要切换 key 的 infocode
+    KEY_COOLDOWN_ERRCODES = ('10001', '10003', '10009', '10012', '10013', '10029', '10044', '10045')
 
     geocode = api.Geocode()
     direction = api.Direction()
@@ -17,29 +22,44 @@ class AmapClient(BaseClient):
     traffic_status = api.TrafficStatus()
     tools = api.Tools()
 
-    def __init__(self, key, sig_key=None, timeout=None):
+    def __init__(self, key, sig_key=None, timeout=None, local_convert=False, **kwargs):
         """
         高德地图服务
 
-        :param key: 高德地图 Key
+        :param key: 高德地图 Key，传入 :class:`lbs.core.keypool.KeyPool` 或 (key, 私钥) 列表时使用多 key 轮换
         :param sig_key: 高德地图私钥
         :param timeout: 请求过期时间
+        :param local_convert: 坐标转换接口优先使用本地计算
+        :param kwargs: 其它客户端配置，见 :class:`lbs.client.base.BaseClient`
         """
-        super(AmapClient, self).__init__(timeout)
+        super(AmapClient, self).__init__(timeout, **kwargs)
+        if isinstance(key, (list, tuple)):
+            key = KeyPool(key)
+        if isinstance(key, KeyPool):
+            self.key_pool = key
+            key = None
         self.key = key
         self.sig_key = sig_key
+        self.local_convert = local_convert
 
     def _handle_pre_request(self, method, uri, kwargs):
         kwargs.setdefault("params", dict())
-        kwargs['params']['key'] = self.key
-        if self.sig_key:
-            kwargs['params']['sig'] = self.get_sig(**kwargs['params'])
+        if self.key_pool is not None:
+            key, sig_key = self.key_pool.acquire()
+        else:
+            key, sig_key = self.key, self.sig_key
+        kwargs['params']['key'] = key
+        if sig_key:
+            kwargs['params']['sig'] = self._get_sig(kwargs['params'], sig_key)
         return method, uri, kwargs
 
     def _handle_result(self, res, method=None, url=None, **kwargs):
         result = super(AmapClient, self)._handle_result(res, method=method, url=url, **kwargs)
         if not isinstance(result, dict):
             return result
+        if 'errcode' in result and 'status' not in result:
+            # v4 接口
+            return self._parse_error_code(url, kwargs, res, result, 'errmsg', 'errcode', 0, code_type=int)
         if 'status' in result:
             result['status'] = int(result['status'])
 
@@ -60,7 +80,10 @@ class AmapClient(BaseClient):
         return result
 
     def get_sig(self, **params):
-        signer = utils.LbsMd5Signer(delimiter=b'&', end=self.sig_key)
+        return self._get_sig(params, self.sig_key)
+
+    def _get_sig(self, params, sig_key):
+        signer = utils.LbsMd5Signer(delimiter=b'&', end=sig_key)
         for k, v in params.items():
             signer.add_data("%s=%s" % (k, v))
         return signer.signature
@@ -71,6 +94,11 @@ class AmapClient(BaseClient):
             return location, 0
         if isinstance(location, model.LbsLocation):
             return "%s,%s" % (location.longitude, location.latitude), 1
+        elif isinstance(location, model.LocationArray):
+            locations = [
+                "%s,%s" % (longitude, latitude) for longitude, latitude in location.to_pairs()
+            ]
+            return join_str.join(locations), len(locations)
         elif isinstance(location, (list, tuple)):
             if len(location) == 2 and not isinstance(location[0], (list, tuple)):
                 return "%s,%s" % tuple(location), 1
@@ -3,6 +3,7 @@ from __future__ import absolute_import, unicode_literals
 
 from optionaldict import optionaldict
 
+from lbs.core import polyline
 from . import base
 
 
@@ -11,13 +12,17 @@ class Direction(base.AmapBaseApi):
     路径规划
     https://lbs.amap.com/api/webservice/guide/api/direction
     """
+    # 距离测量单次请求最大出发点数
+    DISTANCE_BATCH_SIZE = 100
 
-    def walking(self, origin, destination):
+    def walking(self, origin, destination, decode_polyline=False, simplify_tolerance=None):
         """
         步行路径规划
 
         :param origin: 出发点
         :param destination: 目的地
+        :param decode_polyline: 是否解析结果中的 polyline，见 :func:`lbs.core.polyline.decode_amap_route_polylines`
+        :param simplify_tolerance: 解析 polyline 时的抽稀允许偏差（米）
         """
         origin, num = self._parse_location(origin, False)
         if num != 1:
@@ -29,10 +34,11 @@ class Direction(base.AmapBaseApi):
             "origin": origin,
             "destination": destination,
         })
-        self._get("/v3/direction/walking", data)
+        return self._get("/v3/direction/walking", data, **self._polyline_kwargs(decode_polyline, simplify_tolerance))
 
     def transit_integrated(self, origin, destination, city, cityd=None, extensions="base",
-                           strategy=0, nightflag=0, date=None, time=None):
+                           strategy=0, nightflag=0, date=None, time=None, decode_polyline=False,
+                           simplify_tolerance=None):
         """
         公交路径规划
 
@@ -45,6 +51,8 @@ class Direction(base.AmapBaseApi):
         :param nightflag: 是否计算夜班车
         :param date: 出发日期
         :param time: 出发时间
+        :param decode_polyline: 是否解析结果中的 polyline，见 :func:`lbs.core.polyline.decode_amap_route_polylines`
+        :param simplify_tolerance: 解析 polyline 时的抽稀允许偏差（米）
         """
         origin, num = self._parse_location(origin, False)
         if num != 1:
@@ -63,11 +71,14 @@ class Direction(base.AmapBaseApi):
             'date': date,
             'time': time,
         })
-        return self._get("/v3/direction/transit/integrated", data)
+        return self._get(
+            "/v3/direction/transit/integrated", data, **self._polyline_kwargs(decode_polyline, simplify_tolerance)
+        )
 
     def driving(self, origin, destination, originid=None, destinationid=None, origintype=None, destinationtype=None,
                 strategy=0, waypoints=None, avoidpolygons=None, avoidroad=None, province=None, number=None,
-                cartype=0, ferry=0, roadaggregation=False, nosteps=0, extensions='base'):
+                cartype=0, ferry=0, roadaggregation=False, nosteps=0, extensions='base', decode_polyline=False,
+                simplify_tolerance=None):
         """
         驾车路径规划
 
@@ -88,6 +99,8 @@ class Direction(base.AmapBaseApi):
         :param roadaggregation: 是否返回路径聚合信息
         :param nosteps: 是否返回steps字段内容
         :param extensions: 返回结果控制
+        :param decode_polyline: 是否解析结果中的 polyline，见 :func:`lbs.core.polyline.decode_amap_route_polylines`
+        :param simplify_tolerance: 解析 polyline 时的抽稀允许偏差（米）
         """
         origin, num = self._parse_location(origin, False)
         if not 0 < num <= 3:
@@ -115,13 +128,152 @@ class Direction(base.AmapBaseApi):
             'extensions': extensions,
         })
 
-        return self._get("/v3/direction/driving", data)
+        return self._get("/v3/direction/driving", data, **self._polyline_kwargs(decode_polyline, simplify_tolerance))
 
-    def bicycling(self, origin, destination, ):
-        pass
+    @classmethod
+    def _polyline_kwargs(cls, decode_polyline, simplify_tolerance):
+        if not decode_polyline:
+            return {}
+        return {
+            'result_processor': lambda result: polyline.decode_amap_route_polylines(result, simplify_tolerance)
+        }
 
-    def truck(self, origin, destination, ):
-        pass
+    def bicycling(self, origin, destination, decode_polyline=False, simplify_tolerance=None):
+        """
+        骑行路径规划
+
+        :param origin: 出发点
+        :param destination: 目的地
+        :param decode_polyline: 是否解析结果中的 polyline，见 :func:`lbs.core.polyline.decode_amap_route_polylines`
+        :param simplify_tolerance: 解析 polyline 时的抽稀允许偏差（米）
+        """
+        origin, num = self._parse_location(origin, False)
+        if num != 1:
+            raise ValueError("出发点解析失败")
+        destination, num = self._parse_location(destination, False)
+        if num != 1:
+            raise ValueError("目的地解析失败")
+        data = optionaldict({
+            'origin': origin,
+            'destination': destination,
+        })
+        return self._get("/v4/direction/bicycling", data, **self._polyline_kwargs(decode_polyline, simplify_tolerance))
+
+    def truck(self, origin, destination, size, originid=None, originidtype=None, destinationid=None,
+              destinationtype=None, diu=None, strategy=1, waypoints=None, height=None, width=None, load=None,
+              weight=None, axis=None, province=None, number=None, cartype=0, avoidpolygons=None, showpolyline=1,
+              nosteps=0, decode_polyline=False, simplify_tolerance=None):
+        """
+        货车路径规划
+
+        :param origin: 出发点
+        :param destination: 目的地
+        :param size: 车辆大小，1 微型车 / 2 轻型车 / 3 中型车 / 4 重型车
+        :param originid: 出发点poiid
+        :param originidtype: 起点的poi类别
+        :param destinationid: 目的地poiid
+        :param destinationtype: 终点的poi类别
+        :param diu: 设备唯一编号
+        :param strategy: 驾车选择策略
+        :param waypoints: 途经点
+        :param height: 车辆高度（米）
+        :param width: 车辆宽度（米）
+        :param load: 车辆总重（吨）
+        :param weight: 货车核定载重（吨）
+        :param axis: 车辆轴数
+        :param province: 车牌省份
+        :param number: 车牌详情
+        :param cartype: 车辆类型
+        :param avoidpolygons: 避让区域
+        :param showpolyline: 是否返回路线数据
+        :param nosteps: 是否返回steps字段内容
+        :param decode_polyline: 是否解析结果中的 polyline，见 :func:`lbs.core.polyline.decode_amap_route_polylines`
+        :param simplify_tolerance: 解析 polyline 时的抽稀允许偏差（米）
+        """
+        origin, num = self._parse_location(origin, False)
+        if num != 1:
+            raise ValueError("出发点解析失败")
+        destination, num = self._parse_location(destination, False)
+        if num != 1:
+            raise ValueError("目的地解析失败")
+        waypoints, _ = self._parse_location(waypoints, join_str=";")
+        data = optionaldict({
+            'origin': origin,
+            'destination': destination,
+            'size': size,
+            'originid': originid,
+            'originidtype': originidtype,
+            'destinationid': destinationid,
+            'destinationtype': destinationtype,
+            'diu': diu,
+            'strategy': strategy,
+            'waypoints': waypoints,
+            'height': height,
+            'width': width,
+            'load': load,
+            'weight': weight,
+            'axis': axis,
+            'province': province,
+            'number': number,
+            'cartype': cartype,
+            'avoidpolygons': avoidpolygons,
+            'showpolyline': showpolyline,
+            'nosteps': nosteps,
+        })
+        return self._get("/v4/direction/truck", data, **self._polyline_kwargs(decode_polyline, simplify_tolerance))
+
+    def distance(self, origins, destination, _type=1, max_workers=4):
+        """
+        距离测量
+        https://lbs.amap.com/api/webservice/guide/api/direction#distance
+
+        出发点超过 :attr:`DISTANCE_BATCH_SIZE` 个时自动分块并发请求，结果按出发点顺序合并，
+        origin_id 为出发点在 origins 中的序号（从 1 开始），任一分块请求失败时抛出异常
+
+        :param origins: 出发点列表
+        :param destination: 目的地
+        :param _type: 路径计算的方式，0 直线距离 / 1 驾车导航距离 / 3 步行规划距离
+        :param max_workers: 分块时最大并发请求数
+        :return: 距离测量结果列表
+        """
+        destination, num = self._parse_location(destination, False)
+        if num != 1:
+            raise ValueError("目的地解析失败")
+        origins, num = self._parse_location(origins)
+        if num == 0:
+            raise ValueError("出发点解析失败")
+        locations = origins.split("|")
+
+        def _distance(chunk, result_processor=lambda x: x['results']):
+            data = {
+                'origins': "|".join(chunk),
+                'destination': destination,
+                'type': _type,
+            }
+            return self._get("/v3/distance", data, result_processor=result_processor)
+
+        if len(locations) <= self.DISTANCE_BATCH_SIZE:
+            return _distance(locations)
+
+        def _align(chunk):
+            def processor(result):
+                # 按 origin_id 对齐，缺失的结果为 None
+                ret = [None] * len(chunk)
+                for item in result['results']:
+                    ret[int(item['origin_id']) - 1] = item
+                return ret
+            return _distance(chunk, processor)
+
+        def _merge(batch):
+            results = list()
+            for item in batch:
+                if not item.ok:
+                    raise item.error
+                if item.result is not None:
+                    item.result['origin_id'] = str(item.index + 1)
+                    results.append(item.result)
+            return results
 
-    def distance(self, origin, destination, ):
-        pass
+        return self._collect_batch(
+            self._imap_chunks(_align, locations, self.DISTANCE_BATCH_SIZE, max_workers), _merge
+        )
@@ -11,6 +11,10 @@ class Geocode(base.AmapBaseApi):
     地理/逆地理编码
     https://lbs.amap.com/api/webservice/guide/api/georegeo
     """
+    # 批量地理编码单次请求最大地址数
+    GEO_BATCH_SIZE = 10
+    # 批量逆地理编码单次请求最大坐标数
+    REGEO_BATCH_SIZE = 20
 
     def geo(self, address, city=None, batch=None):
         """
@@ -36,6 +40,8 @@ class Geocode(base.AmapBaseApi):
         """
         逆地理编码
 
+        单个坐标且客户端配置了 regeo_cache 时，优先返回附近坐标的缓存结果
+
         :param location: 经纬度坐标
         :param poitype: 返回附近POI类型
         :param radius: 搜索半径
@@ -59,4 +65,59 @@ class Geocode(base.AmapBaseApi):
             "homeorcorp": homeorcorp,
         })
         ret_field = 'regeocodes' if batch else 'regeocode'
+        if num == 1:
+            try:
+                longitude, latitude = (float(v) for v in location.split(','))
+            except ValueError:
+                pass
+            else:
+                return self._get_regeo(
+                    "/v3/geocode/regeo", data, longitude, latitude, result_processor=lambda x: x[ret_field]
+                )
         return self._get("/v3/geocode/regeo", data, result_processor=lambda x: x[ret_field])
+
+    def bulk_geo(self, addresses, city=None, max_workers=4):
+        """
+        大批量地理编码
+
+        按接口限制自动分块并发请求，按输入顺序逐个返回 :class:`lbs.core.batch.BatchResult`，
+        单个请求失败时对应地址的 error 为异常信息，不影响其它地址。
+        异步客户端返回异步迭代器，使用 ``async for`` 迭代
+
+        :param addresses: 结构化地址信息（可迭代对象）
+        :param city: 指定查询的城市
+        :param max_workers: 最大并发请求数
+        """
+        return self._imap_chunks(
+            lambda chunk: self.geo("|".join(chunk), city=city, batch=True),
+            addresses, self.GEO_BATCH_SIZE, max_workers
+        )
+
+    def bulk_regeo(self, locations, poitype=None, radius=1000, extensions='base', roadlevel=None, homeorcorp=0,
+                   max_workers=4):
+        """
+        大批量逆地理编码
+
+        分块及返回结果同 :meth:`bulk_geo`
+
+        :param locations: 经纬度坐标（可迭代对象）
+        :param poitype: 返回附近POI类型
+        :param radius: 搜索半径
+        :param extensions: 返回结果控制
+        :param roadlevel: 道路等级
+        :param homeorcorp: 是否优化POI返回顺序
+        :param max_workers: 最大并发请求数
+        """
+        def _regeo(chunk):
+            chunk_locations = list()
+            for location in chunk:
+                location, num = self._parse_location(location, False)
+                if num != 1:
+                    raise ValueError("location解析失败")
+                chunk_locations.append(location)
+            return self.regeo(
+                "|".join(chunk_locations), poitype=poitype, radius=radius, extensions=extensions, batch=True,
+                roadlevel=roadlevel, homeorcorp=homeorcorp
+            )
+
+        return self._imap_chunks(_regeo, locations, self.REGEO_BATCH_SIZE, max_workers)
@@ -97,6 +97,44 @@ class Search(base.AmapBaseApi):
         })
         return self._get("/v3/place/polygon", data)
 
+    def iter_text(self, max_pages=None, prefetch=True, **kwargs):
+        """
+        逐个返回关键字搜索的全部POI，自动翻页并按 id 去重，见 :class:`lbs.client.paginator.Paginator`
+
+        :param max_pages: 最多请求的页数
+        :param prefetch: 是否预取下一页
+        :param kwargs: 同 :meth:`text`（page 除外）
+        """
+        return self._paginate(
+            lambda page: self.text(page=page, **kwargs), 'pois', max_pages=max_pages, prefetch=prefetch
+        )
+
+    def iter_around(self, location, max_pages=None, prefetch=True, **kwargs):
+        """
+        逐个返回周边搜索的全部POI，自动翻页并按 id 去重
+
+        :param location: 中心点坐标
+        :param max_pages: 最多请求的页数
+        :param prefetch: 是否预取下一页
+        :param kwargs: 同 :meth:`around`（page 除外）
+        """
+        return self._paginate(
+            lambda page: self.around(location, page=page, **kwargs), 'pois', max_pages=max_pages, prefetch=prefetch
+        )
+
+    def iter_polygon(self, polygon, max_pages=None, prefetch=True, **kwargs):
+        """
+        逐个返回多边形搜索的全部POI，自动翻页并按 id 去重
+
+        :param polygon: 经纬度坐标对
+        :param max_pages: 最多请求的页数
+        :param prefetch: 是否预取下一页
+        :param kwargs: 同 :meth:`polygon`（page 除外）
+        """
+        return self._paginate(
+            lambda page: self.polygon(polygon, page=page, **kwargs), 'pois', max_pages=max_pages, prefetch=prefetch
+        )
+
     def detail(self, _id):
         """
         ID查询
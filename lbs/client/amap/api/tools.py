@@ -3,6 +3,7 @@ from __future__ import absolute_import, unicode_literals
 
 from optionaldict import optionaldict
 
+from lbs.core.coord_convert import CoordConvert
 from . import base
 
 
@@ -11,6 +12,13 @@ class Tools(base.AmapBaseApi):
     工具
     """
 
+    # 可在本地计算的坐标转换，key 为 coordsys，value 为批量转换方法（None 表示无需转换）
+    LOCAL_CONVERTERS = {
+        'gps': CoordConvert.wgs84_to_gcj02_batch,
+        'baidu': CoordConvert.bd09_to_gcj02_batch,
+        'autonavi': None,
+    }
+
     def district(self, keywords=None, subdistrict=1, page=1, offset=20, extensions="base", _filter=None):
         """
         行政区域查询
@@ -47,10 +55,15 @@ class Tools(base.AmapBaseApi):
         坐标转换
         https://lbs.amap.com/api/webservice/guide/api/convert
 
+        客户端开启 ``local_convert`` 时，gps/baidu/autonavi 坐标在本地计算且不限制坐标点数量，
+        其余坐标系（如 mapbar）仍请求远程接口
+
         :param locations: 坐标点
         :param coordsys: 原坐标系
         """
         locations, num = self._parse_location(locations)
+        if num > 0 and self._client.local_convert and coordsys in self.LOCAL_CONVERTERS:
+            return self._local_result(self._local_convert(locations, coordsys))
         if not 0 < num <= 40:
             raise ValueError("坐标点解析失败")
         data = optionaldict({
@@ -59,6 +72,18 @@ class Tools(base.AmapBaseApi):
         })
         return self._get("/v3/assistant/coordinate/convert", data, result_processor=lambda x: x['locations'].split(";"))
 
+    def _local_convert(self, locations, coordsys):
+        longitudes = list()
+        latitudes = list()
+        for location in locations.split("|"):
+            longitude, latitude = location.split(",")
+            longitudes.append(float(longitude))
+            latitudes.append(float(latitude))
+        converter = self.LOCAL_CONVERTERS[coordsys]
+        if converter is not None:
+            longitudes, latitudes = converter(longitudes, latitudes)
+        return ["%s,%s" % (float(longitude), float(latitude)) for longitude, latitude in zip(longitudes, latitudes)]
+
     def inputtips(self, keywords, _type=None, location=None, city=None, citylimit=False, datatype='all'):
         """
         输入提示
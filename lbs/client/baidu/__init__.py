@@ -12,16 +12,19 @@ from lbs.core.utils import to_binary
 class BaiduMapClient(BaseClient):
 
     API_BASE_URL = "http://api.map.baidu.com/"
+    # 服务器内部错误、并发量超过配额
+    RETRY_ERRCODES = ('1', '401')
 
-    def __init__(self, ak, sk=None, timeout=None):
+    def __init__(self, ak, sk=None, timeout=None, **kwargs):
         """
         百度地图服务
 
         :param ak: 百度地图 ak
         :param sk: 百度地图 sk
         :param timeout: 请求过期时间
+        :param kwargs: 其它客户端配置，见 :class:`lbs.client.base.BaseClient`
         """
-        super(BaiduMapClient, self).__init__(timeout)
+        super(BaiduMapClient, self).__init__(timeout, **kwargs)
         self.ak = ak
         self.sk = sk
 
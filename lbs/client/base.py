@@ -3,11 +3,19 @@ from __future__ import absolute_import, unicode_literals
 
 import inspect
 import logging
+import threading
+import time
+
 import requests
-from six.moves.urllib.parse import urljoin, urlencode
+from requests.adapters import HTTPAdapter
+from six.moves.urllib.parse import urljoin, urlencode, urlparse
 
+from lbs.client.paginator import Paginator
+from lbs.core.batch import imap_chunks, imap_items
+from lbs.core.decoder import JsonDecoder
 from lbs.core.exceptions import LbsClientException
-from lbs.core.utils import json_loads
+from lbs.core.singleflight import SingleFlight
+from lbs.core.utils import normalize_request
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +42,45 @@ class LbsBaseAPI(object):
             kwargs['api_base_url'] = self.API_BASE_URL
         return self._client.gen_get_url(url, **kwargs)
 
+    def _local_result(self, result):
+        return self._client._local_result(result)
+
+    def _paginate(self, func, items_field, **kwargs):
+        return self._client._paginate(func, items_field, **kwargs)
+
+    def _imap_chunks(self, func, iterable, chunk_size, max_workers=4):
+        return self._client._imap_chunks(func, iterable, chunk_size, max_workers)
+
+    def _imap_items(self, func, iterable, max_workers=4):
+        return self._client._imap_items(func, iterable, max_workers)
+
+    def _collect_batch(self, batch, processor):
+        return self._client._collect_batch(batch, processor)
+
+    def _get_regeo(self, url, params, longitude, latitude, result_processor=None):
+        """
+        单点逆地理编码请求，客户端配置了 regeo_cache 时优先返回附近坐标的缓存结果
+
+        除坐标外的参数作为缓存命名空间，参数不同的结果互不复用
+        """
+        cache = self._client.regeo_cache
+        if cache is None:
+            return self._get(url, params, result_processor=result_processor)
+        namespace = "%s?%s" % (url, "&".join(
+            "%s=%s" % (k, v) for k, v in sorted(params.items()) if k != 'location'
+        ))
+        result = cache.get(longitude, latitude, namespace, self._client.decoder)
+        if result is not None:
+            return self._local_result(result)
+
+        def processor(result):
+            if result_processor is not None:
+                result = result_processor(result)
+            cache.set(longitude, latitude, result, namespace)
+            return result
+
+        return self._get(url, params, result_processor=processor)
+
 
 def _is_api_endpoint(obj):
     return isinstance(obj, LbsBaseAPI)
@@ -41,9 +88,13 @@ def _is_api_endpoint(obj):
 
 class BaseClient(object):
 
-    _http = requests.Session()
-
     API_BASE_URL = None
+    # 可重试的服务商错误码
+    RETRY_ERRCODES = ()
+    # 需要将 key 移入冷却期的服务商错误码
+    KEY_COOLDOWN_ERRCODES = ()
+    # 多 key 池，见 :class:`lbs.core.keypool.KeyPool`
+    key_pool = None
 
     def __new__(cls, *args, **kwargs):
         self = super(BaseClient, cls).__new__(cls)
@@ -54,8 +105,79 @@ class BaseClient(object):
             setattr(self, name, api)
         return self
 
-    def __init__(self, timeout=None):
+    def __init__(self, timeout=None, cache=None, session=None, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keep_alive=True, adapter=None, rate_limiter=None, retry=None, regeo_cache=None,
+                 single_flight=False, decoder='object'):
+        """
+        :param timeout: 请求过期时间
+        :param cache: 接口结果缓存，见 :mod:`lbs.core.cache`
+        :param session: 自定义 requests.Session，传入后以下连接池参数无效
+        :param pool_connections: 连接池缓存的 host 数量
+        :param pool_maxsize: 每个 host 的最大连接数
+        :param pool_block: 连接数达到上限时是否阻塞等待
+        :param keep_alive: 是否保持长连接
+        :param adapter: 自定义 HTTPAdapter，传入后 pool_* 参数无效
+        :param rate_limiter: 请求限流器，见 :mod:`lbs.core.ratelimit`
+        :param retry: 重试策略，见 :class:`lbs.core.retry.RetryPolicy`
+        :param regeo_cache: 单点逆地理编码的空间缓存，见 :class:`lbs.core.geocache.RegeoCache`
+        :param single_flight: 是否合并并发的相同 GET 请求，也可以传入 :class:`lbs.core.singleflight.SingleFlight`
+        :param decoder: 结果解码模式 dict/object/lazy，也可以传入 :class:`lbs.core.decoder.JsonDecoder`
+        """
         self.timeout = timeout
+        self.cache = cache
+        self.regeo_cache = regeo_cache
+        if single_flight is True:
+            single_flight = self._create_single_flight()
+        elif single_flight is False:
+            single_flight = None
+        self.single_flight = single_flight
+        if not isinstance(decoder, JsonDecoder):
+            decoder = JsonDecoder(decoder)
+        self.decoder = decoder
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        if adapter is None:
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self._adapter = adapter
+        self._http_session = session
+        self._local = threading.local()
+
+    @property
+    def _http(self):
+        """
+        当前线程使用的 requests.Session
+
+        未指定 session 时每个线程使用独立的 Session，所有线程共享同一个 HTTPAdapter 连接池
+        """
+        if self._http_session is not None:
+            return self._http_session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._create_session()
+            self._local.session = session
+        return session
+
+    @_http.setter
+    def _http(self, session):
+        self._http_session = session
+
+    def _create_session(self):
+        session = requests.Session()
+        session.mount('http://', self._adapter)
+        session.mount('https://', self._adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        """
+        关闭连接池
+        """
+        self._adapter.close()
+        if self._http_session is not None:
+            self._http_session.close()
 
     def get_logger(self):
         return logger
@@ -63,6 +185,7 @@ class BaseClient(object):
     def gen_get_url(self, url, **kwargs):
         url = self._real_url(url, kwargs)
         _, url, kwargs = self._handle_pre_request('get', url, kwargs)
+        self._release_pool_key(self._get_pool_key(kwargs))
         if "params" not in kwargs:
             return url
         if "?" not in url:
@@ -86,6 +209,13 @@ class BaseClient(object):
             kwargs['params'] = {}
         kwargs['timeout'] = kwargs.get('timeout', self.timeout)
         result_processor = kwargs.pop('result_processor', None)
+        cache_key, cache_ttl, result = self._cache_get(method, url, kwargs)
+        if result is not None:
+            if result_processor is not None:
+                result = result_processor(result)
+            return result
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(urlparse(url).path)
         res = self._http.request(
             method=method,
             url=url,
@@ -105,6 +235,7 @@ class BaseClient(object):
             )
 
         result = self._handle_result(res, method, url, **kwargs)
+        self._cache_set(cache_key, cache_ttl, result)
         if result_processor is not None:
             result = result_processor(result)
 
@@ -112,9 +243,23 @@ class BaseClient(object):
                                 url, kwargs.get('params', ''), kwargs.get('data', ''), result)
         return result
 
+    def _cache_get(self, method, url, kwargs):
+        if self.cache is None:
+            return None, None, None
+        cache_key, cache_ttl = self.cache.make_key(method, url, kwargs.get('params'))
+        if cache_key is None:
+            return None, None, None
+        return cache_key, cache_ttl, self.cache.get(cache_key, self.decoder)
+
+    def _cache_set(self, cache_key, cache_ttl, result):
+        # 只缓存解析成功的 JSON 结果，错误结果在 _handle_result 中已抛出异常；
+        # QQ地图等客户端会解出 result 字段，结果可能为列表
+        if cache_key is not None and isinstance(result, (dict, list)):
+            self.cache.set(cache_key, result, cache_ttl)
+
     def _decode_result(self, res):
         try:
-            result = json_loads(res.content.decode('utf-8', 'ignore'), strict=False)
+            result = self.decoder.loads(res.content)
         except (TypeError, ValueError):
             # Return origin response object if we can not decode it as JSON
             self.get_logger().debug('Can not decode response as JSON', exc_info=True)
@@ -145,7 +290,7 @@ class BaseClient(object):
 
     def _handle_result(self, res, method=None, url=None, **kwargs):
         if not isinstance(res, dict):
-            # Dirty hack around asyncio based AsyncWeChatClient
+            # Result may already be decoded
             result = self._decode_result(res)
         else:
             result = res
@@ -154,15 +299,126 @@ class BaseClient(object):
     def _handle_pre_request(self, method, uri, kwargs):
         return method, uri, kwargs
 
+    def _local_result(self, result):
+        """
+        包装本地计算的接口结果，异步客户端会将其转换为 awaitable
+        """
+        return result
+
+    def _paginate(self, func, items_field, **kwargs):
+        """
+        创建分页迭代器，异步客户端返回异步迭代器，参数见 :class:`lbs.client.paginator.Paginator`
+        """
+        return Paginator(func, items_field, **kwargs)
+
+    def _imap_chunks(self, func, iterable, chunk_size, max_workers=4):
+        """
+        分块并发请求，异步客户端返回异步迭代器，参数见 :func:`lbs.core.batch.imap_chunks`
+        """
+        return imap_chunks(func, iterable, chunk_size, max_workers)
+
+    def _imap_items(self, func, iterable, max_workers=4):
+        """
+        逐个元素并发请求，异步客户端返回异步迭代器，参数见 :func:`lbs.core.batch.imap_items`
+        """
+        return imap_items(func, iterable, max_workers)
+
+    def _collect_batch(self, batch, processor):
+        """
+        汇总 :meth:`_imap_chunks`、:meth:`_imap_items` 的全部结果，异步客户端迭代完成后汇总并返回 awaitable
+
+        :param batch: :meth:`_imap_chunks`、:meth:`_imap_items` 的返回值
+        :param processor: 汇总函数，接收 :class:`lbs.core.batch.BatchResult` 序列
+        """
+        return processor(batch)
+
     def _handle_request_except(self, e, func, *args, **kwargs):
         raise e
 
+    def _retry_delay(self, method, e, attempt, start, transport=False):
+        if self.retry is None:
+            return None
+        delay = self.retry.next_delay(method, e, attempt, time.time() - start, self.RETRY_ERRCODES, transport)
+        if delay is not None:
+            self.get_logger().warning("请求失败，%.2f秒后第%d次重试：%s", delay, attempt + 1, e)
+        return delay
+
+    def _get_pool_key(self, kwargs):
+        if self.key_pool is None:
+            return None
+        return kwargs.get('params', {}).get('key')
+
+    def _release_pool_key(self, pool_key):
+        if pool_key is not None:
+            self.key_pool.release(pool_key)
+
+    def _cooldown_pool_key(self, pool_key, e):
+        if pool_key is None or str(e.errcode) not in self.KEY_COOLDOWN_ERRCODES:
+            return False
+        self.get_logger().warning("key %s 进入冷却期：%s", pool_key, e)
+        self.key_pool.cooldown(pool_key)
+        return True
+
+    def _copy_request_kwargs(self, kwargs):
+        # 签名等参数会写入 params，复制一份以便切换 key 后重新签名
+        kwargs = dict(kwargs)
+        if kwargs.get('params') is not None:
+            kwargs['params'] = dict(kwargs['params'])
+        return kwargs
+
+    def _create_single_flight(self):
+        return SingleFlight()
+
+    def _single_flight_key(self, method, uri, kwargs):
+        """
+        合并请求的键，由请求方法、地址及排序后的参数组成，不合并的请求返回 None
+        """
+        if self.single_flight is None or method.upper() != 'GET':
+            return None
+        url = self._real_url(uri, dict(kwargs))
+        return "%s %s" % (method.upper(), normalize_request(url, kwargs.get('params')))
+
     def request(self, method, uri, **kwargs):
+        """
+        发送请求
+
+        开启 single_flight 时，并发的相同 GET 请求只发送一次，共享结果或异常
+        """
+        flight_key = self._single_flight_key(method, uri, kwargs)
+        if flight_key is None:
+            return self._do_request(method, uri, **kwargs)
+        result_processor = kwargs.pop('result_processor', None)
+        result = self.single_flight.do(flight_key, self._do_request, method, uri, **kwargs)
+        if result_processor is not None:
+            result = result_processor(result)
+        return result
+
+    def _do_request(self, method, uri, **kwargs):
+        origin_kwargs = self._copy_request_kwargs(kwargs)
         method, uri_with_key, kwargs = self._handle_pre_request(method, uri, kwargs)
+        pool_key = self._get_pool_key(kwargs)
+        start = time.time()
+        attempt = 0
         try:
-            return self._request(method, uri_with_key, **kwargs)
-        except LbsClientException as e:
-            return self._handle_request_except(e, self.request, method, uri, **kwargs)
+            while True:
+                try:
+                    return self._request(method, uri_with_key, **kwargs)
+                except LbsClientException as e:
+                    delay = self._retry_delay(method, e, attempt, start)
+                    if delay is None:
+                        if self._cooldown_pool_key(pool_key, e):
+                            break
+                        return self._handle_request_except(e, self._do_request, method, uri, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    delay = self._retry_delay(method, e, attempt, start, transport=True)
+                    if delay is None:
+                        raise
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            self._release_pool_key(pool_key)
+        # 切换 key 重新请求
+        return self._do_request(method, uri, **origin_kwargs)
 
     def get(self, uri, params=None, **kwargs):
         """
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PageState(object):
+    """
+    分页迭代状态
+    """
+    __slots__ = ('page', 'fetched', 'total', 'seen')
+
+    def __init__(self, page, dedup=True):
+        self.page = page
+        self.fetched = 0
+        self.total = None
+        self.seen = set() if dedup else None
+
+
+class Paginator(object):
+    """
+    分页接口迭代器，跨页逐个返回结果条目
+
+    返回当前页条目的同时在后台请求下一页；某页为空、已获取条目数达到接口返回的总数或达到 max_pages 时停止，
+    按 id 去重。除去重用的 id 集合外，内存占用与总条目数无关
+    """
+
+    def __init__(self, func, items_field, total_field='count', id_field='id', start_page=1, max_pages=None,
+                 prefetch=True, dedup=True):
+        """
+        :param func: 请求函数，参数为页码，返回一页结果
+        :param items_field: 结果中条目列表的字段名
+        :param total_field: 结果中总条目数的字段名，None 表示接口不返回总数
+        :param id_field: 条目 id 的字段名
+        :param start_page: 起始页码
+        :param max_pages: 最多请求的页数，None 表示不限制
+        :param prefetch: 是否预取下一页
+        :param dedup: 是否按 id 去重
+        """
+        self.func = func
+        self.items_field = items_field
+        self.total_field = total_field
+        self.id_field = id_field
+        self.start_page = start_page
+        self.max_pages = max_pages
+        self.prefetch = prefetch
+        self.dedup = dedup
+
+    def _handle_page(self, state, result):
+        """
+        处理一页结果，更新迭代状态
+
+        :return: (本页条目, 是否需要请求下一页)
+        """
+        items = (result.get(self.items_field) or []) if isinstance(result, dict) else []
+        if state.total is None and self.total_field and isinstance(result, dict):
+            try:
+                state.total = int(result.get(self.total_field)) or None
+            except (TypeError, ValueError):
+                pass
+        state.fetched += len(items)
+        state.page += 1
+        has_next = bool(items)
+        if state.total is not None and state.fetched >= state.total:
+            has_next = False
+        if self.max_pages is not None and state.page - self.start_page >= self.max_pages:
+            has_next = False
+        return items, has_next
+
+    def _is_duplicate(self, state, item):
+        if state.seen is None or not isinstance(item, dict):
+            return False
+        item_id = item.get(self.id_field)
+        if item_id is None:
+            return False
+        if item_id in state.seen:
+            return True
+        state.seen.add(item_id)
+        return False
+
+    def __iter__(self):
+        state = PageState(self.start_page, self.dedup)
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            future = executor.submit(self.func, state.page) if executor is not None else None
+            has_next = True
+            while has_next:
+                result = future.result() if future is not None else self.func(state.page)
+                items, has_next = self._handle_page(state, result)
+                if has_next and executor is not None:
+                    future = executor.submit(self.func, state.page)
+                for item in items:
+                    if not self._is_duplicate(state, item):
+                        yield item
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
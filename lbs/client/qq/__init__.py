@@ -3,6 +3,7 @@ from __future__ import absolute_import, unicode_literals
 
 from lbs.client.base import BaseClient
 from lbs.core import model, utils
+from lbs.core.keypool import KeyPool
 
 from . import api
 
@@ -10,37 +11,55 @@ from . import api
 class QQMapClient(BaseClient):
 
     API_BASE_URL = "https://apis.map.qq.com/"
+    # 每秒请求量已达到上限
+    RETRY_ERRCODES = ('120', )
+    # 配额用尽、key 无效或未授权等需要切换 key 的状态码
+    KEY_COOLDOWN_ERRCODES = ('110', '111', '112', '113', '121', '190', '199', '311')
     search = api.Search()
     tools = api.Tools()
     geocoder = api.Geocoder()
     direction = api.Direction()
 
-    def __init__(self, key, secret_key=None, timeout=None):
+    def __init__(self, key, secret_key=None, timeout=None, local_convert=False, **kwargs):
         """
         qq地图服务
 
-        :param key: qq地图 Key
+        :param key: qq地图 Key，传入 :class:`lbs.core.keypool.KeyPool` 或 (key, sk) 列表时使用多 key 轮换
         :param secret_key: qq地图 签名sk
         :param timeout: 请求过期时间
+        :param local_convert: 坐标转换接口优先使用本地计算
+        :param kwargs: 其它客户端配置，见 :class:`lbs.client.base.BaseClient`
         """
-        super(QQMapClient, self).__init__(timeout)
+        super(QQMapClient, self).__init__(timeout, **kwargs)
+        if isinstance(key, (list, tuple)):
+            key = KeyPool(key)
+        if isinstance(key, KeyPool):
+            self.key_pool = key
+            key = None
         self.key = key
         self.secret_key = secret_key
+        self.local_convert = local_convert
 
-    def get_sig(self, uri, params):
-        signer = utils.LbsMd5Signer(delimiter=b'&', end=self.secret_key, start=uri+"?")
+    def get_sig(self, uri, params, secret_key=None):
+        if secret_key is None:
+            secret_key = self.secret_key
+        signer = utils.LbsMd5Signer(delimiter=b'&', end=secret_key, start=uri+"?")
         for k, v in params.items():
             signer.add_data("%s=%s" % (k, v))
         return signer.signature
 
     def _handle_pre_request(self, method, uri, kwargs):
         params = kwargs.setdefault("params", dict())
-        params['key'] = self.key
-        if self.secret_key is not None:
+        if self.key_pool is not None:
+            key, secret_key = self.key_pool.acquire()
+        else:
+            key, secret_key = self.key, self.secret_key
+        params['key'] = key
+        if secret_key is not None:
             from six.moves.urllib.parse import urlparse, urljoin
             path = urlparse(urljoin(self.API_BASE_URL, uri)).path
             assert method.lower() == 'get', '暂未支持POST验签'
-            params['sig'] = self.get_sig(path, params)
+            params['sig'] = self.get_sig(path, params, secret_key)
         return method, uri, kwargs
 
     def _handle_result(self, res, method=None, url=None, **kwargs):
@@ -57,6 +76,11 @@ class QQMapClient(BaseClient):
             return location, 0
         if isinstance(location, model.LbsLocation):
             return "%s,%s" % (location.latitude, location.longitude), 1
+        elif isinstance(location, model.LocationArray):
+            locations = [
+                "%s,%s" % (latitude, longitude) for longitude, latitude in location.to_pairs()
+            ]
+            return join_str.join(locations), len(locations)
         elif isinstance(location, (list, tuple)):
             if len(location) == 2 and not isinstance(location[0], (list, tuple)):
                 return "%s,%s" % tuple(location), 1
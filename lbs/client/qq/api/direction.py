@@ -3,7 +3,7 @@ from __future__ import absolute_import, unicode_literals, division
 
 from optionaldict import optionaldict
 
-from lbs.core import model
+from lbs.core import polyline
 from . import base
 
 
@@ -13,7 +13,7 @@ class Direction(base.QQMapBaseApi):
     https://lbs.qq.com/webservice_v1/guide-road.html
     """
     def driving(self, _from, to, from_poi=None, heading=None, speed=None, accuracy=None, road_type=0, from_track=None,
-                to_poi=None, waypoints=None, policy=None, plate_number=None, cartype=0):
+                to_poi=None, waypoints=None, policy=None, plate_number=None, cartype=0, decode_polyline=False):
         """
         驾车路线规划
 
@@ -30,6 +30,7 @@ class Direction(base.QQMapBaseApi):
         :param policy: 策略参数
         :param plate_number: 车牌号
         :param cartype: 车辆类型
+        :param decode_polyline: 是否将结果中的 polyline 解压为 :class:`lbs.core.model.LocationArray`
         """
         _from, num = self._parse_location(_from, False)
         if num != 1:
@@ -53,14 +54,15 @@ class Direction(base.QQMapBaseApi):
             'plate_number': plate_number,
             'cartype': cartype,
         })
-        return self._get("/ws/direction/v1/driving/", data)
+        return self._get("/ws/direction/v1/driving/", data, **self._polyline_kwargs(decode_polyline))
 
-    def walking(self, _from, to):
+    def walking(self, _from, to, decode_polyline=False):
         """
         步行路线规划
 
         :param _from: 起点位置坐标
         :param to: 终点位置坐标
+        :param decode_polyline: 是否将结果中的 polyline 解压为 :class:`lbs.core.model.LocationArray`
         """
         _from, num = self._parse_location(_from, False)
         if num != 1:
@@ -68,14 +70,17 @@ class Direction(base.QQMapBaseApi):
         to, num = self._parse_location(to, False)
         if num != 1:
             raise ValueError("终点位置坐标解析失败")
-        return self._get("/ws/direction/v1/walking/", {'from': _from, 'to': to})
+        return self._get(
+            "/ws/direction/v1/walking/", {'from': _from, 'to': to}, **self._polyline_kwargs(decode_polyline)
+        )
 
-    def bicycling(self, _from, to):
+    def bicycling(self, _from, to, decode_polyline=False):
         """
         骑行路线规划
 
         :param _from: 起点位置坐标
         :param to: 终点位置坐标
+        :param decode_polyline: 是否将结果中的 polyline 解压为 :class:`lbs.core.model.LocationArray`
         """
         _from, num = self._parse_location(_from, False)
         if num != 1:
@@ -83,9 +88,11 @@ class Direction(base.QQMapBaseApi):
         to, num = self._parse_location(to, False)
         if num != 1:
             raise ValueError("终点位置坐标解析失败")
-        return self._get("/ws/direction/v1/bicycling/", {'from': _from, 'to': to})
+        return self._get(
+            "/ws/direction/v1/bicycling/", {'from': _from, 'to': to}, **self._polyline_kwargs(decode_polyline)
+        )
 
-    def transit(self, _from, to, departure_time=None, policy=None):
+    def transit(self, _from, to, departure_time=None, policy=None, decode_polyline=False):
         """
         公交路线规划
 
@@ -93,6 +100,7 @@ class Direction(base.QQMapBaseApi):
         :param to: 终点位置坐标
         :param departure_time: 出发时间
         :param policy: 路线规划优先条件
+        :param decode_polyline: 是否将结果中的 polyline 解压为 :class:`lbs.core.model.LocationArray`
         """
         _from, num = self._parse_location(_from, False)
         if num != 1:
@@ -106,23 +114,19 @@ class Direction(base.QQMapBaseApi):
             'departure_time': departure_time,
             'policy': policy,
         })
-        return self._get("/ws/direction/v1/transit/", data)
+        return self._get("/ws/direction/v1/transit/", data, **self._polyline_kwargs(decode_polyline))
+
+    @classmethod
+    def _polyline_kwargs(cls, decode_polyline):
+        if not decode_polyline:
+            return {}
+        return {'result_processor': polyline.decode_qq_route_polylines}
 
     def polyline_to_location(self, coors):
         """
         polyline 坐标解压
 
         :param coors: polyline的坐标串
+        :return: :class:`lbs.core.model.LocationArray`
         """
-        if len(coors) % 2 != 0:
-            raise ValueError("坐标串错误")
-        ret = list()
-        last = None
-        for i in range(0, len(coors) // 2):
-            if last is None:
-                last = model.LbsLocation(coors[i], coors[i + 1])
-            else:
-                last = model.LbsLocation(last.longitude + coors[i] / 1000000, last.latitude + coors[i + 1] / 1000000)
-            ret.append(last)
-
-        return ret
+        return polyline.decode_qq_polyline(coors)
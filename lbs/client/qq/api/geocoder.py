@@ -29,6 +29,8 @@ class Geocoder(base.QQMapBaseApi):
         逆地理编码
         https://lbs.qq.com/webservice_v1/guide-gcoder.html
 
+        客户端配置了 regeo_cache 时，优先返回附近坐标的缓存结果
+
         :param location: 位置坐标
         :param get_poi: 是否返回周边POI列表
         :param poi_options: 用于控制POI列表
@@ -41,4 +43,8 @@ class Geocoder(base.QQMapBaseApi):
             "get_poi": get_poi,
             "poi_options": poi_options
         })
-        return self._get("/ws/geocoder/v1/", data)
+        try:
+            latitude, longitude = (float(v) for v in location.split(','))
+        except ValueError:
+            return self._get("/ws/geocoder/v1/", data)
+        return self._get_regeo("/ws/geocoder/v1/", data, longitude, latitude)
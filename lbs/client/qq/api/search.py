@@ -106,3 +106,33 @@ class Search(base.QQMapBaseApi):
             'page_size': page_size,
         })
         return self._get("/ws/place/v1/suggestion/", data)
+
+    def iter_search(self, keyword, boundary, max_pages=None, prefetch=True, **kwargs):
+        """
+        逐个返回地点搜索的全部结果，自动翻页并按 id 去重，见 :class:`lbs.client.paginator.Paginator`
+
+        :param keyword: 关键字
+        :param boundary: 搜索地理范围（gen_xxx_boundary）
+        :param max_pages: 最多请求的页数
+        :param prefetch: 是否预取下一页
+        :param kwargs: 同 :meth:`search`（page_index 除外）
+        """
+        return self._paginate(
+            lambda page: self.search(keyword, boundary, page_index=page, **kwargs), 'data',
+            max_pages=max_pages, prefetch=prefetch
+        )
+
+    def iter_suggestion(self, keyword, region, max_pages=None, prefetch=True, **kwargs):
+        """
+        逐个返回关键词输入提示的全部结果，自动翻页并按 id 去重
+
+        :param keyword: 关键词
+        :param region: 限制城市范围
+        :param max_pages: 最多请求的页数
+        :param prefetch: 是否预取下一页
+        :param kwargs: 同 :meth:`suggestion`（page_index 除外）
+        """
+        return self._paginate(
+            lambda page: self.suggestion(keyword, region, page_index=page, **kwargs), 'data',
+            max_pages=max_pages, prefetch=prefetch
+        )
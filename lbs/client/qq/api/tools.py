@@ -3,6 +3,8 @@ from __future__ import absolute_import, unicode_literals
 
 from optionaldict import optionaldict
 
+from lbs.core.coord_convert import CoordConvert
+from lbs.core.model import DistanceMatrix
 from . import base
 
 
@@ -10,6 +12,16 @@ class Tools(base.QQMapBaseApi):
     """
     工具
     """
+
+    # 可在本地计算的坐标转换，key 为 type，value 为批量转换方法（None 表示无需转换）
+    LOCAL_CONVERTERS = {
+        1: CoordConvert.wgs84_to_gcj02_batch,
+        3: CoordConvert.bd09_to_gcj02_batch,
+        5: None,
+    }
+    # 批量距离矩阵每次请求的起点数、终点数
+    MATRIX_BLOCK_SIZE = (25, 25)
+
     def district_list(self):
         """
         获取全部行政区划数据
@@ -63,17 +75,107 @@ class Tools(base.QQMapBaseApi):
         to, _ = self._parse_location(to)
         return self._get("/ws/distance/v1/matrix", {"from": _from, 'to': to, 'mode': mode})
 
+    def bulk_distance_matrix(self, _from, to, mode='driving', block_size=None, max_workers=4):
+        """
+        大批量距离计算(多对多)
+
+        将起点×终点按接口限制分块并发请求（受客户端限流器约束），结果合并为 :class:`lbs.core.model.DistanceMatrix`，
+        请求失败的分块记录在 errors 中，对应元素为 nan，不影响其它分块。
+        异步客户端返回 awaitable
+
+        :param _from: 起点坐标
+        :param to: 终点坐标
+        :param mode: 计算方式
+        :param block_size: 每块的 (起点数, 终点数)，默认为 :attr:`MATRIX_BLOCK_SIZE`
+        :param max_workers: 最大并发请求数
+        :return: :class:`lbs.core.model.DistanceMatrix`
+        """
+        row_size, col_size = block_size or self.MATRIX_BLOCK_SIZE
+        _from, from_num = self._parse_location(_from)
+        to, to_num = self._parse_location(to)
+        if from_num == 0 or to_num == 0:
+            raise ValueError("坐标解析失败")
+        # 已拼接的坐标串解析结果数量为 1，按分割后的坐标数计算
+        from_locations = _from.split(";")
+        to_locations = to.split(";")
+        from_num, to_num = len(from_locations), len(to_locations)
+        blocks = [
+            (row, col)
+            for row in range(0, from_num, row_size)
+            for col in range(0, to_num, col_size)
+        ]
+
+        def _block(block):
+            row, col = block
+            from_chunk = from_locations[row:row + row_size]
+            to_chunk = to_locations[col:col + col_size]
+
+            def processor(result):
+                rows = result['rows']
+                if len(rows) != len(from_chunk) or any(len(x['elements']) != len(to_chunk) for x in rows):
+                    raise ValueError("返回结果数量与请求不一致")
+                return rows
+
+            return self._get(
+                "/ws/distance/v1/matrix",
+                {"from": ";".join(from_chunk), 'to': ";".join(to_chunk), 'mode': mode},
+                result_processor=processor
+            )
+
+        def _merge(batch):
+            matrix = DistanceMatrix(from_num, to_num)
+            for item in batch:
+                row, col = item.item
+                if not item.ok:
+                    matrix.errors.append((
+                        row, min(row + row_size, from_num), col, min(col + col_size, to_num), item.error
+                    ))
+                    continue
+                matrix.set_block(
+                    row, col,
+                    [[element.get('distance', float('nan')) for element in x['elements']] for x in item.result],
+                    [[element.get('duration', float('nan')) for element in x['elements']] for x in item.result],
+                )
+            return matrix
+
+        return self._collect_batch(self._imap_items(_block, blocks, max_workers), _merge)
+
     def translate(self, locations, _type=5):
         """
         坐标转换
         https://lbs.qq.com/webservice_v1/guide-convert.html
 
+        客户端开启 ``local_convert`` 时，GPS/百度/腾讯坐标在本地计算，
+        其余坐标类型（如 mapbar、搜狗）仍请求远程接口
+
         :param locations: 预转换的坐标
         :param _type: 输入的locations的坐标类型
         """
-        locations, _ = self._parse_location(locations)
+        locations, num = self._parse_location(locations)
+        if num > 0 and self._client.local_convert and _type in self.LOCAL_CONVERTERS:
+            return self._local_result(self._local_translate(locations, _type))
         return self._get("/ws/coord/v1/translate", {"locations": locations, 'type': _type})
 
+    def _local_translate(self, locations, _type):
+        longitudes = list()
+        latitudes = list()
+        for location in locations.split(";"):
+            latitude, longitude = location.split(",")
+            longitudes.append(float(longitude))
+            latitudes.append(float(latitude))
+        converter = self.LOCAL_CONVERTERS[_type]
+        if converter is not None:
+            longitudes, latitudes = converter(longitudes, latitudes)
+        # 结果类型与客户端解码模式一致
+        return self._client.decoder.wrap({
+            'status': 0,
+            'message': 'query ok',
+            'locations': [
+                {'lat': float(latitude), 'lng': float(longitude)}
+                for longitude, latitude in zip(longitudes, latitudes)
+            ]
+        })
+
     def ip(self, ip):
         """
         IP定位
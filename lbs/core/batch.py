@@ -0,0 +1,128 @@
+# encoding: utf-8
+from __future__ import absolute_import, unicode_literals
+
+import collections
+import itertools
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchResult(object):
+    """
+    批量请求中单个元素的结果
+    """
+    __slots__ = ('index', 'item', 'result', 'error')
+
+    def __init__(self, index, item, result=None, error=None):
+        """
+        :param index: 元素在输入中的序号
+        :param item: 输入元素
+        :param result: 请求结果
+        :param error: 请求失败时的异常
+        """
+        self.index = index
+        self.item = item
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return '%s(%r, %r, result=%r, error=%r)' % (
+            self.__class__.__name__, self.index, self.item, self.result, self.error
+        )
+
+
+def chunked(iterable, size):
+    """
+    将可迭代对象按指定大小分块
+
+    :param iterable: 可迭代对象
+    :param size: 每块大小
+    """
+    if size <= 0:
+        raise ValueError("size必须大于0")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def chunk_results(start, chunk, results=None, error=None):
+    """
+    将单个块的调用结果展开为 :class:`BatchResult` 列表
+
+    :param start: 块内第一个元素在输入中的序号
+    :param chunk: 块
+    :param results: 块的结果列表
+    :param error: 调用失败时的异常，块内每个元素的 error 均为该异常
+    """
+    if error is None:
+        try:
+            results = list(results or ())
+        except Exception as e:
+            error = e
+    if error is not None:
+        return [BatchResult(start + i, item, error=error) for i, item in enumerate(chunk)]
+    ret = []
+    for i, item in enumerate(chunk):
+        if i < len(results):
+            ret.append(BatchResult(start + i, item, results[i]))
+        else:
+            ret.append(BatchResult(start + i, item, error=ValueError("返回结果数量与请求不一致")))
+    return ret
+
+
+def imap_chunks(func, iterable, chunk_size, max_workers=4):
+    """
+    将可迭代对象分块后使用线程池并发调用 func，按输入顺序逐个返回 :class:`BatchResult`
+
+    同时进行中的块数不超过 ``max_workers * 2``，内存占用与输入总量无关。
+    func 接收一个块（list），返回与块等长的结果列表；某个块调用失败时，
+    该块内每个元素的 error 为对应异常，不影响其它块。
+
+    :param func: 处理单个块的函数
+    :param iterable: 输入元素
+    :param chunk_size: 每块大小
+    :param max_workers: 最大并发数
+    """
+    for chunk_index, chunk, results, error in _imap(func, chunked(iterable, chunk_size), max_workers):
+        for item in chunk_results(chunk_index * chunk_size, chunk, results, error):
+            yield item
+
+
+def imap_items(func, iterable, max_workers=4):
+    """
+    使用线程池对每个元素并发调用 func，按输入顺序逐个返回 :class:`BatchResult`
+
+    同时进行中的元素数不超过 ``max_workers * 2``，func 接收单个元素，返回其结果；
+    调用失败时该元素的 error 为对应异常
+
+    :param func: 处理单个元素的函数
+    :param iterable: 输入元素
+    :param max_workers: 最大并发数
+    """
+    for index, item, result, error in _imap(func, iterable, max_workers):
+        yield BatchResult(index, item, result, error)
+
+
+def _imap(func, iterable, max_workers):
+    # 并发调用 func，按输入顺序返回 (序号, 输入, 结果, 异常)
+    items = enumerate(iterable)
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, item in itertools.islice(items, max_workers * 2):
+            pending.append((index, item, executor.submit(func, item)))
+        while pending:
+            index, item, future = pending.popleft()
+            for next_index, next_item in itertools.islice(items, 1):
+                pending.append((next_index, next_item, executor.submit(func, next_item)))
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, e
+            yield index, item, result, error
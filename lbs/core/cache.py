@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import collections
+import json
+import sqlite3
+import threading
+import time
+
+from six.moves.urllib.parse import urlparse
+
+from lbs.core.utils import json_loads, normalize_request
+
+
+class BaseCache(object):
+    """
+    接口结果缓存
+
+    仅缓存 GET 请求的成功结果，缓存键由接口地址及排序后的参数组成，忽略 key/sig/sn/ak 等鉴权参数
+    """
+
+    IGNORED_PARAMS = ('key', 'sig', 'sn', 'ak')
+
+    def __init__(self, ttl=300, endpoint_ttls=None):
+        """
+        :param ttl: 默认缓存时间（秒），为 0 或 None 时仅缓存 endpoint_ttls 中指定的接口
+        :param endpoint_ttls: 各接口缓存时间，如 ``{'/v3/config/district': 86400}``，值为 0 表示不缓存该接口
+        """
+        self.ttl = ttl
+        self.endpoint_ttls = endpoint_ttls or {}
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, method, url, params=None):
+        """
+        生成缓存键
+
+        :param method: 请求方法
+        :param url: 请求地址
+        :param params: 请求参数
+        :return: (缓存键, 缓存时间)，不可缓存时返回 (None, None)
+        """
+        if method.upper() != 'GET':
+            return None, None
+        parsed = urlparse(url)
+        ttl = self.endpoint_ttls.get(parsed.path, self.ttl)
+        if not ttl:
+            return None, None
+        return normalize_request(url, params, self.IGNORED_PARAMS), ttl
+
+    def get(self, key, decoder=None):
+        """
+        获取缓存结果，未命中或已过期返回 None
+
+        :param key: 缓存键
+        :param decoder: 结果解码器，见 :class:`lbs.core.decoder.JsonDecoder`，默认返回 ObjectDict
+        """
+        value = self._get(key, time.time())
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            return None
+        if decoder is not None:
+            return decoder.loads(value)
+        return json_loads(value)
+
+    def set(self, key, value, ttl):
+        """
+        写入缓存
+
+        :param key: 缓存键
+        :param value: 接口结果
+        :param ttl: 缓存时间（秒）
+        """
+        self._set(key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        raise NotImplementedError()
+
+    def stats(self):
+        """
+        缓存命中统计
+
+        :return: hits/misses/hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / float(total) if total else 0.0,
+        }
+
+    def _get(self, key, now):
+        raise NotImplementedError()
+
+    def _set(self, key, value, expires):
+        raise NotImplementedError()
+
+
+class MemoryCache(BaseCache):
+    """
+    内存缓存，超过 maxsize 时淘汰最久未使用的结果
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, endpoint_ttls=None):
+        """
+        :param maxsize: 最大缓存条数
+        :param ttl: 默认缓存时间（秒）
+        :param endpoint_ttls: 各接口缓存时间
+        """
+        super(MemoryCache, self).__init__(ttl, endpoint_ttls)
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= now:
+                del self._data[key]
+                return None
+            # move to end
+            del self._data[key]
+            self._data[key] = item
+            return value
+
+    def _set(self, key, value, expires):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteCache(BaseCache):
+    """
+    sqlite 磁盘缓存，可在多个进程间共享，超过 maxsize 时淘汰最久未使用的结果
+
+    淘汰在每写入 EVICT_INTERVAL 次时执行，缓存条数可能短暂超过 maxsize
+    """
+
+    EVICT_INTERVAL = 64
+
+    def __init__(self, path, maxsize=100000, ttl=300, endpoint_ttls=None):
+        """
+        :param path: 数据库文件路径
+        :param maxsize: 最大缓存条数
+        :param ttl: 默认缓存时间（秒）
+        :param endpoint_ttls: 各接口缓存时间
+        """
+        super(SqliteCache, self).__init__(ttl, endpoint_ttls)
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lbs_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS lbs_cache_accessed ON lbs_cache (accessed)")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM lbs_cache").fetchone()[0]
+
+    def _get(self, key, now):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM lbs_cache WHERE key = ?", (key, )).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM lbs_cache WHERE key = ?", (key, ))
+                return None
+            self._conn.execute("UPDATE lbs_cache SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set(self, key, value, expires):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lbs_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, expires, time.time())
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM lbs_cache WHERE expires <= ?", (time.time(), ))
+        self._conn.execute(
+            "DELETE FROM lbs_cache WHERE key IN "
+            "(SELECT key FROM lbs_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize, )
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM lbs_cache")
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
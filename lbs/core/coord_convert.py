@@ -1,13 +1,29 @@
 # encoding: utf-8
 from __future__ import absolute_import, unicode_literals, division
 
+import array
+import functools
 import math
 
+from lbs.core import model, utils
+
+
+def _location_array_batch(func):
+    # 直接传入 LocationArray 时返回 LocationArray
+    @functools.wraps(func)
+    def wrapper(cls, longitudes, latitudes=None, *args, **kwargs):
+        if latitudes is None and isinstance(longitudes, model.LocationArray):
+            return model.LocationArray(*func(cls, longitudes.longitudes, longitudes.latitudes, *args, **kwargs))
+        return func(cls, longitudes, latitudes, *args, **kwargs)
+    return wrapper
+
 
 class CoordConvert(object):
     X_PI = math.pi * 3000 / 180
     A = 6378245
     EE = 0.00669342162296594323
+    # numpy 向量化计算与单点 math 计算结果之间允许的最大误差(度)
+    BATCH_TOLERANCE = 1e-9
 
     @classmethod
     def gcj02_to_bd09(cls, longitude, latitude):
@@ -76,6 +92,46 @@ class CoordConvert(object):
         longitude, latitude = cls.wgs84_to_gcj02(longitude, latitude)
         return cls.gcj02_to_bd09(longitude, latitude)
 
+    @classmethod
+    def gcj02_to_wgs84(cls, longitude, latitude, precision=1e-9, max_iterations=30):
+        """
+        GCJ02(火星坐标系)转WGS84
+
+        使用不动点迭代求解 :meth:`wgs84_to_gcj02` 的逆变换
+
+        :param longitude: GCJ02经度
+        :param latitude: GCJ02纬度
+        :param precision: 迭代精度(度)，正向转换结果与输入差值小于该值时停止迭代
+        :param max_iterations: 最大迭代次数
+        :return: WGS84经度, WGS84纬度
+        """
+        if not cls.in_china(longitude, latitude):
+            return longitude, latitude
+        wgs_longitude, wgs_latitude = longitude, latitude
+        for _ in range(max_iterations):
+            gcj_longitude, gcj_latitude = cls.wgs84_to_gcj02(wgs_longitude, wgs_latitude)
+            d_longitude = gcj_longitude - longitude
+            d_latitude = gcj_latitude - latitude
+            wgs_longitude -= d_longitude
+            wgs_latitude -= d_latitude
+            if abs(d_longitude) < precision and abs(d_latitude) < precision:
+                break
+        return wgs_longitude, wgs_latitude
+
+    @classmethod
+    def bd09_to_wgs84(cls, longitude, latitude, precision=1e-9, max_iterations=30):
+        """
+        BD09(百度坐标系)转WGS84
+
+        :param longitude: BD09经度
+        :param latitude: BD09纬度
+        :param precision: 迭代精度(度)
+        :param max_iterations: 最大迭代次数
+        :return: WGS84经度, WGS84纬度
+        """
+        longitude, latitude = cls.bd09_to_gcj02(longitude, latitude)
+        return cls.gcj02_to_wgs84(longitude, latitude, precision, max_iterations)
+
     @classmethod
     def _transform(cls, x, y):
         sqrt_x = math.sqrt(math.fabs(x))
@@ -99,4 +155,199 @@ class CoordConvert(object):
         :param latitude: 纬度
         :return: 坐标是否在中国
         """
-        return 72.004 > longitude > 137.8347 and 0.8293 > latitude > 55.8271
+        return 72.004 < longitude < 137.8347 and 0.8293 < latitude < 55.8271
+
+    @classmethod
+    def _to_arrays(cls, longitudes, latitudes):
+        if latitudes is None and isinstance(longitudes, model.LocationArray):
+            return longitudes.longitudes, longitudes.latitudes
+        longitudes = utils.to_float_array(longitudes)
+        latitudes = utils.to_float_array(latitudes)
+        if len(longitudes) != len(latitudes):
+            raise ValueError("经纬度数组长度不一致")
+        return longitudes, latitudes
+
+    @classmethod
+    def _map_batch(cls, func, longitudes, latitudes):
+        ret_longitudes = array.array('d')
+        ret_latitudes = array.array('d')
+        for longitude, latitude in zip(longitudes, latitudes):
+            longitude, latitude = func(longitude, latitude)
+            ret_longitudes.append(longitude)
+            ret_latitudes.append(latitude)
+        return ret_longitudes, ret_latitudes
+
+    @classmethod
+    @_location_array_batch
+    def gcj02_to_bd09_batch(cls, longitudes, latitudes=None):
+        """
+        批量GCJ02(火星坐标系)转BD09(百度坐标系)
+
+        经纬度可以是 list、array.array、numpy.ndarray 等序列或缓冲区。
+        安装了 numpy 时使用向量化计算，返回 numpy.ndarray，
+        与 :meth:`gcj02_to_bd09` 结果误差不超过 :attr:`BATCH_TOLERANCE`；
+        否则逐点计算，返回 array.array('d')，结果与单点转换完全一致。
+        也可以只传入一个 :class:`lbs.core.model.LocationArray`，此时返回 LocationArray。
+
+        :param longitudes: GCJ02经度数组
+        :param latitudes: GCJ02纬度数组
+        :return: BD09经度数组，BD09纬度数组
+        """
+        longitudes, latitudes = cls._to_arrays(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(cls.gcj02_to_bd09, longitudes, latitudes)
+        z = np.sqrt(longitudes * longitudes + latitudes * latitudes) + 0.00002 * np.sin(latitudes * cls.X_PI)
+        theta = np.arctan2(latitudes, longitudes) + 0.000003 * np.cos(longitudes * cls.X_PI)
+        return z * np.cos(theta) + 0.0065, z * np.sin(theta) + 0.006
+
+    @classmethod
+    @_location_array_batch
+    def bd09_to_gcj02_batch(cls, longitudes, latitudes=None):
+        """
+        批量BD-09(百度坐标系)转GCJ02(火星坐标系)
+
+        参数及返回值类型同 :meth:`gcj02_to_bd09_batch`
+
+        :param longitudes: BD09经度数组
+        :param latitudes: BD09纬度数组
+        :return: GCJ02经度数组, GCJ02纬度数组
+        """
+        longitudes, latitudes = cls._to_arrays(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(cls.bd09_to_gcj02, longitudes, latitudes)
+        x = longitudes - 0.0065
+        y = latitudes - 0.006
+        z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * cls.X_PI)
+        theta = np.arctan2(y, x) - 0.000003 * np.cos(x * cls.X_PI)
+        return z * np.cos(theta), z * np.sin(theta)
+
+    @classmethod
+    @_location_array_batch
+    def wgs84_to_gcj02_batch(cls, longitudes, latitudes=None):
+        """
+        批量WGS84转GCJ02(火星坐标系)
+
+        参数及返回值类型同 :meth:`gcj02_to_bd09_batch`
+
+        :param longitudes: WGS84经度数组
+        :param latitudes: WGS84纬度数组
+        :return: GCJ02经度数组, GCJ02纬度数组
+        """
+        longitudes, latitudes = cls._to_arrays(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(cls.wgs84_to_gcj02, longitudes, latitudes)
+        mask = cls.in_china_batch(longitudes, latitudes)
+        longitude_add, latitude_add = cls._transform_batch(longitudes - 105, latitudes - 35)
+
+        rad_latitude = latitudes / 180 * math.pi
+        magic = np.sin(rad_latitude)
+        magic = 1 - cls.EE * magic * magic
+        sqrt_magic = np.sqrt(magic)
+        latitude_add = (latitude_add * 180) / ((cls.A * (1 - cls.EE)) / (magic * sqrt_magic) * math.pi)
+        longitude_add = (longitude_add * 180) / (cls.A / sqrt_magic * np.cos(rad_latitude) * math.pi)
+        return (
+            np.where(mask, longitudes + longitude_add, longitudes),
+            np.where(mask, latitudes + latitude_add, latitudes)
+        )
+
+    @classmethod
+    @_location_array_batch
+    def wgs84_to_bd09_batch(cls, longitudes, latitudes=None):
+        """
+        批量WGS84转BD09(百度坐标系)
+
+        参数及返回值类型同 :meth:`gcj02_to_bd09_batch`
+
+        :param longitudes: WGS84经度数组
+        :param latitudes: WGS84纬度数组
+        :return: BD09经度数组，BD09纬度数组
+        """
+        longitudes, latitudes = cls.wgs84_to_gcj02_batch(longitudes, latitudes)
+        return cls.gcj02_to_bd09_batch(longitudes, latitudes)
+
+    @classmethod
+    @_location_array_batch
+    def gcj02_to_wgs84_batch(cls, longitudes, latitudes=None, precision=1e-9, max_iterations=30):
+        """
+        批量GCJ02(火星坐标系)转WGS84
+
+        参数及返回值类型同 :meth:`gcj02_to_bd09_batch`，迭代参数同 :meth:`gcj02_to_wgs84`，
+        已收敛的坐标不再参与后续迭代
+
+        :param longitudes: GCJ02经度数组
+        :param latitudes: GCJ02纬度数组
+        :param precision: 迭代精度(度)
+        :param max_iterations: 最大迭代次数
+        :return: WGS84经度数组, WGS84纬度数组
+        """
+        longitudes, latitudes = cls._to_arrays(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(
+                lambda longitude, latitude: cls.gcj02_to_wgs84(longitude, latitude, precision, max_iterations),
+                longitudes, latitudes
+            )
+        wgs_longitudes = longitudes.copy()
+        wgs_latitudes = latitudes.copy()
+        active = np.flatnonzero(cls.in_china_batch(longitudes, latitudes))
+        for _ in range(max_iterations):
+            if not len(active):
+                break
+            gcj_longitudes, gcj_latitudes = cls.wgs84_to_gcj02_batch(wgs_longitudes[active], wgs_latitudes[active])
+            d_longitudes = gcj_longitudes - longitudes[active]
+            d_latitudes = gcj_latitudes - latitudes[active]
+            wgs_longitudes[active] -= d_longitudes
+            wgs_latitudes[active] -= d_latitudes
+            converged = (np.fabs(d_longitudes) < precision) & (np.fabs(d_latitudes) < precision)
+            active = active[~converged]
+        return wgs_longitudes, wgs_latitudes
+
+    @classmethod
+    @_location_array_batch
+    def bd09_to_wgs84_batch(cls, longitudes, latitudes=None, precision=1e-9, max_iterations=30):
+        """
+        批量BD09(百度坐标系)转WGS84
+
+        :param longitudes: BD09经度数组
+        :param latitudes: BD09纬度数组
+        :param precision: 迭代精度(度)
+        :param max_iterations: 最大迭代次数
+        :return: WGS84经度数组, WGS84纬度数组
+        """
+        longitudes, latitudes = cls.bd09_to_gcj02_batch(longitudes, latitudes)
+        return cls.gcj02_to_wgs84_batch(longitudes, latitudes, precision, max_iterations)
+
+    @classmethod
+    def _transform_batch(cls, x, y):
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(cls._transform, x, y)
+        sqrt_x = np.sqrt(np.fabs(x))
+        x_add = 300 + 1 * x + 2 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * sqrt_x
+        y_add = -100 + 2 * x + 3 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * sqrt_x
+        t_x = (20 * np.sin(6 * x * math.pi) + 20 * np.sin(2 * x * math.pi)) * 2 / 3
+        x_add += t_x
+        y_add += t_x
+        x_add += (20 * np.sin(x * math.pi) + 40 * np.sin(x / 3 * math.pi)) * 2 / 3
+        y_add += (20 * np.sin(y * math.pi) + 40 * np.sin(y / 3 * math.pi)) * 2 / 3
+        x_add += (150 * np.sin(x / 12 * math.pi) + 300 * np.sin(x / 30 * math.pi)) * 2 / 3
+        y_add += (160 * np.sin(y / 12 * math.pi) + 320 * np.sin(y * math.pi / 30)) * 2 / 3
+        return x_add, y_add
+
+    @classmethod
+    def in_china_batch(cls, longitudes, latitudes=None):
+        """
+        批量判断是否在国内
+
+        :param longitudes: 经度数组
+        :param latitudes: 纬度数组
+        :return: 坐标是否在中国的布尔数组(numpy 不可用时为 list)
+        """
+        longitudes, latitudes = cls._to_arrays(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return [cls.in_china(longitude, latitude) for longitude, latitude in zip(longitudes, latitudes)]
+        return (72.004 < longitudes) & (longitudes < 137.8347) & (0.8293 < latitudes) & (latitudes < 55.8271)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+import sys
+
+import six
+
+from lbs.core.utils import ObjectDict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Python 3.6 起 json.loads 可直接解析 bytes，无需先复制为 str
+JSON_BYTES = sys.version_info >= (3, 6)
+
+
+def _to_object(value):
+    if isinstance(value, dict):
+        return ObjectDict((key, _to_object(item)) for key, item in six.iteritems(value))
+    if isinstance(value, list):
+        return [_to_object(item) for item in value]
+    return value
+
+
+def _wrap(value):
+    if type(value) is dict:
+        return LazyObjectDict(value)
+    if type(value) is list:
+        return LazyList(value)
+    return value
+
+
+class LazyObjectDict(dict):
+    """
+    支持属性访问的结果，与 :class:`lbs.core.utils.ObjectDict` 用法一致
+
+    解析时只生成普通 dict，嵌套的对象和列表在首次访问时才包装，未访问的部分不产生额外开销
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        wrapped = _wrap(value)
+        if wrapped is not value:
+            dict.__setitem__(self, key, wrapped)
+        return wrapped
+
+    def __getattr__(self, key):
+        if key in self:
+            return self[key]
+        return None
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    if six.PY2:  # pragma: no cover
+        itervalues = values
+        iteritems = items
+
+
+class LazyList(list):
+    """
+    元素在首次访问时才包装的列表
+    """
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in six.moves.range(*index.indices(len(self)))]
+        value = list.__getitem__(self, index)
+        wrapped = _wrap(value)
+        if wrapped is not value:
+            list.__setitem__(self, index, wrapped)
+        return wrapped
+
+    def __iter__(self):
+        for i in six.moves.range(len(self)):
+            yield self[i]
+
+
+class JsonDecoder(object):
+    """
+    接口结果 JSON 解码
+
+    - ``dict``：返回普通 dict，安装了 orjson 时直接由响应字节解析，速度最快
+    - ``object``：返回 :class:`lbs.core.utils.ObjectDict`，支持属性访问，每个对象都会调用一次 object_hook
+    - ``lazy``：按 ``dict`` 方式解析后包装为 :class:`LazyObjectDict`，支持属性访问，嵌套对象在访问时才包装
+
+    未使用 orjson 时由标准库直接解析响应字节，响应不是合法的 UTF-8 时才先忽略非法字节解码为 str；
+    含有控制字符时使用宽松解析
+    """
+
+    MODES = ('dict', 'object', 'lazy')
+
+    def __init__(self, mode='object', use_orjson=True):
+        """
+        :param mode: 解码模式，dict/object/lazy
+        :param use_orjson: 已安装 orjson 时是否使用
+        """
+        if mode not in self.MODES:
+            raise ValueError("mode必须为%s之一" % "/".join(self.MODES))
+        self.mode = mode
+        self.use_orjson = use_orjson and orjson is not None
+
+    def _loads_text(self, content, object_hook=None):
+        if isinstance(content, six.binary_type):
+            if JSON_BYTES:
+                try:
+                    return json.loads(content, object_hook=object_hook, strict=False)
+                except UnicodeDecodeError:
+                    pass
+            content = content.decode('utf-8', 'ignore')
+        return json.loads(content, object_hook=object_hook, strict=False)
+
+    def _loads_dict(self, content):
+        if self.use_orjson:
+            try:
+                return orjson.loads(content)
+            except ValueError:
+                pass
+        return self._loads_text(content)
+
+    def loads(self, content):
+        """
+        解码
+
+        :param content: 响应内容，bytes 或 str
+        """
+        if self.mode == 'object':
+            return self._loads_text(content, ObjectDict)
+        result = self._loads_dict(content)
+        if self.mode == 'lazy':
+            result = _wrap(result)
+        return result
+
+    def wrap(self, result):
+        """
+        将本地生成的结果（普通 dict/list）转换为与 :meth:`loads` 相同的类型
+
+        :param result: 结果
+        """
+        if self.mode == 'object':
+            return _to_object(result)
+        if self.mode == 'lazy':
+            return _wrap(result)
+        return result
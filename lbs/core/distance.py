@@ -0,0 +1,255 @@
+# encoding: utf-8
+from __future__ import absolute_import, unicode_literals, division
+
+import array
+import math
+
+import six
+
+from lbs.core import model, utils
+
+
+class Distance(object):
+    """
+    本地直线距离计算，单位为米
+
+    球面距离（Haversine）速度快，误差约 0.5%；椭球面距离（Vincenty）基于 WGS84 椭球，精确到毫米级。
+    坐标系需一致，不做坐标转换
+    """
+    # 地球平均半径(米)
+    EARTH_RADIUS = 6371008.8
+    # WGS84 椭球长半轴(米)
+    WGS84_A = 6378137.0
+    # WGS84 椭球扁率
+    WGS84_F = 1 / 298.257223563
+
+    @classmethod
+    def haversine(cls, longitude1, latitude1, longitude2, latitude2):
+        """
+        两点间球面距离
+
+        :param longitude1: 起点经度
+        :param latitude1: 起点纬度
+        :param longitude2: 终点经度
+        :param latitude2: 终点纬度
+        :return: 距离(米)
+        """
+        phi1 = math.radians(latitude1)
+        phi2 = math.radians(latitude2)
+        d_phi = phi2 - phi1
+        d_lambda = math.radians(longitude2 - longitude1)
+        a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+        return 2 * cls.EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+    @classmethod
+    def vincenty(cls, longitude1, latitude1, longitude2, latitude2, precision=1e-12, max_iterations=200):
+        """
+        两点间椭球面距离（Vincenty 反算公式）
+
+        :param longitude1: 起点经度
+        :param latitude1: 起点纬度
+        :param longitude2: 终点经度
+        :param latitude2: 终点纬度
+        :param precision: 迭代精度(弧度)
+        :param max_iterations: 最大迭代次数
+        :return: 距离(米)，近似对跖点不收敛时返回 nan
+        """
+        a = cls.WGS84_A
+        f = cls.WGS84_F
+        b = a * (1 - f)
+        u1 = math.atan((1 - f) * math.tan(math.radians(latitude1)))
+        u2 = math.atan((1 - f) * math.tan(math.radians(latitude2)))
+        sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+        sin_u2, cos_u2 = math.sin(u2), math.cos(u2)
+        big_l = math.radians(longitude2 - longitude1)
+        lam = big_l
+        for _ in six.moves.range(max_iterations):
+            sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+            sin_sigma = math.sqrt((cos_u2 * sin_lam) ** 2 + (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam) ** 2)
+            if sin_sigma == 0:
+                return 0.0
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = math.atan2(sin_sigma, cos_sigma)
+            sin_alpha = cos_u1 * cos_u2 * sin_lam / sin_sigma
+            cos2_alpha = 1 - sin_alpha ** 2
+            # 两点都在赤道上时 cos2_alpha 为 0
+            cos_2sigma_m = cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha if cos2_alpha else 0.0
+            c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = big_l + (1 - c) * f * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            if abs(lam - lam_prev) < precision:
+                break
+        else:
+            return float('nan')
+        u_sq = cos2_alpha * (a * a - b * b) / (b * b)
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+            big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        return b * big_a * (sigma - delta_sigma)
+
+    @classmethod
+    def _to_location_array(cls, longitudes, latitudes):
+        if latitudes is None:
+            return model.LocationArray.from_locations(longitudes)
+        return model.LocationArray(longitudes, latitudes)
+
+    @classmethod
+    def haversine_batch(cls, longitude, latitude, longitudes, latitudes=None):
+        """
+        一点到多点的球面距离
+
+        安装了 numpy 时使用向量化计算，返回 numpy.ndarray，否则返回 array.array('d')
+
+        :param longitude: 起点经度
+        :param latitude: 起点纬度
+        :param longitudes: 终点经度数组，也可以只传入 :class:`lbs.core.model.LocationArray`
+        :param latitudes: 终点纬度数组
+        :return: 距离数组(米)
+        """
+        locations = cls._to_location_array(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return array.array('d', (
+                cls.haversine(longitude, latitude, x, y) for x, y in zip(locations.longitudes, locations.latitudes)
+            ))
+        return cls._haversine_array(
+            np.float64(longitude), np.float64(latitude), locations.longitudes, locations.latitudes
+        )
+
+    @classmethod
+    def _haversine_array(cls, longitudes1, latitudes1, longitudes2, latitudes2):
+        # numpy 广播计算
+        np = utils.numpy
+        phi1 = np.radians(latitudes1)
+        phi2 = np.radians(latitudes2)
+        a = np.sin((phi2 - phi1) / 2) ** 2 + \
+            np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(longitudes2 - longitudes1) / 2) ** 2
+        return 2 * cls.EARTH_RADIUS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+    @classmethod
+    def vincenty_batch(cls, longitude, latitude, longitudes, latitudes=None, precision=1e-12, max_iterations=200):
+        """
+        一点到多点的椭球面距离
+
+        参数及返回值类型同 :meth:`haversine_batch`，迭代参数同 :meth:`vincenty`，已收敛的坐标不再参与后续迭代
+
+        :param longitude: 起点经度
+        :param latitude: 起点纬度
+        :param longitudes: 终点经度数组，也可以只传入 :class:`lbs.core.model.LocationArray`
+        :param latitudes: 终点纬度数组
+        :param precision: 迭代精度(弧度)
+        :param max_iterations: 最大迭代次数
+        :return: 距离数组(米)
+        """
+        locations = cls._to_location_array(longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return array.array('d', (
+                cls.vincenty(longitude, latitude, x, y, precision, max_iterations)
+                for x, y in zip(locations.longitudes, locations.latitudes)
+            ))
+        a = cls.WGS84_A
+        f = cls.WGS84_F
+        b = a * (1 - f)
+        u1 = math.atan((1 - f) * math.tan(math.radians(latitude)))
+        sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+        u2 = np.arctan((1 - f) * np.tan(np.radians(locations.latitudes)))
+        sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+        big_l = np.radians(locations.longitudes - longitude)
+        lam = big_l.copy()
+        count = len(locations)
+        sigma = np.zeros(count)
+        sin_sigma = np.zeros(count)
+        cos_sigma = np.ones(count)
+        cos2_alpha = np.ones(count)
+        cos_2sigma_m = np.zeros(count)
+        active = np.arange(count)
+        for _ in six.moves.range(max_iterations):
+            if not len(active):
+                break
+            sin_lam, cos_lam = np.sin(lam[active]), np.cos(lam[active])
+            s_u2, c_u2 = sin_u2[active], cos_u2[active]
+            s_sigma = np.sqrt((c_u2 * sin_lam) ** 2 + (cos_u1 * s_u2 - sin_u1 * c_u2 * cos_lam) ** 2)
+            c_sigma = sin_u1 * s_u2 + cos_u1 * c_u2 * cos_lam
+            sig = np.arctan2(s_sigma, c_sigma)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sin_alpha = np.where(s_sigma > 0, cos_u1 * c_u2 * sin_lam / s_sigma, 0.0)
+                c2_alpha = 1 - sin_alpha ** 2
+                c_2sigma_m = np.where(c2_alpha > 0, c_sigma - 2 * sin_u1 * s_u2 / c2_alpha, 0.0)
+            c = f / 16 * c2_alpha * (4 + f * (4 - 3 * c2_alpha))
+            lam_prev = lam[active]
+            lam_next = big_l[active] + (1 - c) * f * sin_alpha * (
+                sig + c * s_sigma * (c_2sigma_m + c * c_sigma * (-1 + 2 * c_2sigma_m ** 2))
+            )
+            lam[active] = lam_next
+            sigma[active] = sig
+            sin_sigma[active] = s_sigma
+            cos_sigma[active] = c_sigma
+            cos2_alpha[active] = c2_alpha
+            cos_2sigma_m[active] = c_2sigma_m
+            converged = (np.fabs(lam_next - lam_prev) < precision) | (s_sigma == 0)
+            active = active[~converged]
+        u_sq = cos2_alpha * (a * a - b * b) / (b * b)
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+            big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distances = b * big_a * (sigma - delta_sigma)
+        distances[active] = np.nan
+        return distances
+
+    @classmethod
+    def matrix(cls, origins, destinations, method='haversine', chunk_size=1000):
+        """
+        多点到多点的距离矩阵，按起点分块生成，内存占用与 chunk_size * 终点数成正比
+
+        :param origins: 起点，:class:`lbs.core.model.LocationArray` 或 [(经度, 纬度), ...]
+        :param destinations: 终点，格式同 origins
+        :param method: haversine 球面距离 / vincenty 椭球面距离
+        :param chunk_size: 每块的起点数
+        :return: (起点起始序号, 距离矩阵块) 的生成器，
+                 numpy 可用时距离矩阵块为 (行数, 终点数) 的 numpy.ndarray，否则为 array.array('d') 列表
+        """
+        if method not in ('haversine', 'vincenty'):
+            raise ValueError("method 错误")
+        origins = model.LocationArray.from_locations(origins)
+        destinations = model.LocationArray.from_locations(destinations)
+        np = utils.numpy
+        for start in six.moves.range(0, len(origins), chunk_size):
+            chunk = origins[start:start + chunk_size]
+            if np is not None and method == 'haversine':
+                block = cls._haversine_array(
+                    chunk.longitudes[:, None], chunk.latitudes[:, None],
+                    destinations.longitudes[None, :], destinations.latitudes[None, :]
+                )
+            else:
+                func = cls.haversine_batch if method == 'haversine' else cls.vincenty_batch
+                block = [func(x, y, destinations) for x, y in zip(chunk.longitudes, chunk.latitudes)]
+                if np is not None:
+                    block = np.array(block).reshape(len(chunk), len(destinations))
+            yield start, block
+
+    @classmethod
+    def within(cls, longitude, latitude, longitudes, latitudes=None, radius=1000):
+        """
+        筛选距离起点不超过 radius 的坐标，可在请求路线距离前过滤候选点
+
+        :param longitude: 起点经度
+        :param latitude: 起点纬度
+        :param longitudes: 候选点经度数组，也可以只传入 :class:`lbs.core.model.LocationArray`
+        :param latitudes: 候选点纬度数组
+        :param radius: 半径(米)
+        :return: 候选点序号列表
+        """
+        distances = cls.haversine_batch(longitude, latitude, longitudes, latitudes)
+        np = utils.numpy
+        if np is None:
+            return [i for i, distance in enumerate(distances) if distance <= radius]
+        return np.flatnonzero(distances <= radius).tolist()
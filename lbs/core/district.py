@@ -0,0 +1,567 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+
+import six
+
+from lbs.core.batch import imap_items
+from lbs.core.spatial import PolygonIndex, parse_polygon
+from lbs.core.utils import to_text
+
+LEVEL_COUNTRY = 0
+LEVEL_PROVINCE = 1
+LEVEL_CITY = 2
+LEVEL_DISTRICT = 3
+LEVEL_STREET = 4
+
+AMAP_LEVELS = {
+    'country': LEVEL_COUNTRY,
+    'province': LEVEL_PROVINCE,
+    'city': LEVEL_CITY,
+    'district': LEVEL_DISTRICT,
+    'street': LEVEL_STREET,
+}
+
+
+class District(object):
+    """
+    行政区划
+    """
+    __slots__ = ('adcode', 'parent', 'name', 'fullname', 'level', 'longitude', 'latitude', 'citycode')
+
+    def __init__(self, adcode, parent, name, fullname, level, longitude=None, latitude=None, citycode=None):
+        """
+        :param adcode: 行政区划代码
+        :param parent: 上级行政区划代码，顶级为 None
+        :param name: 简称
+        :param fullname: 全称
+        :param level: 级别，见 LEVEL_XXX
+        :param longitude: 中心点经度
+        :param latitude: 中心点纬度
+        :param citycode: 城市编码
+        """
+        self.adcode = adcode
+        self.parent = parent
+        self.name = name
+        self.fullname = fullname
+        self.level = level
+        self.longitude = longitude
+        self.latitude = latitude
+        self.citycode = citycode
+
+    def to_row(self):
+        return (
+            self.adcode, self.parent, self.name, self.fullname, self.level, self.longitude, self.latitude,
+            self.citycode
+        )
+
+    def __repr__(self):
+        return '%s(%r, %r, level=%r)' % (self.__class__.__name__, self.adcode, self.fullname, self.level)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _adcode_level(adcode, default):
+    # 直辖市的区县位于 QQ地图结果的第二级，级别按 adcode 判断
+    if len(adcode) != 6 or not adcode.isdigit():
+        return default
+    if adcode.endswith('0000'):
+        return LEVEL_PROVINCE
+    if adcode.endswith('00'):
+        return LEVEL_CITY
+    return LEVEL_DISTRICT
+
+
+def _check_sync_client(client):
+    request = getattr(client, 'request', None)
+    if request is not None and inspect.iscoroutinefunction(request):
+        raise TypeError("DistrictIndex 仅支持同步客户端")
+
+
+class _Snapshot(object):
+    """
+    一次下载得到的行政区划树
+    """
+
+    def __init__(self):
+        self.districts = {}
+        self.children = {}
+        self.roots = []
+        self.polylines = {}
+
+    def add(self, district, polyline=None):
+        if district.adcode in self.districts:
+            return False
+        self.districts[district.adcode] = district
+        self.children.setdefault(district.adcode, [])
+        if district.parent is None or district.parent not in self.districts:
+            self.roots.append(district.adcode)
+        if district.parent is not None:
+            self.children.setdefault(district.parent, []).append(district.adcode)
+        if polyline and isinstance(polyline, six.string_types):
+            self.polylines[district.adcode] = polyline
+        return True
+
+    def digests(self):
+        """
+        自底向上计算每个节点的子树摘要
+        """
+        result = {}
+
+        def visit(adcode):
+            children = self.children.get(adcode, ())
+            for child in children:
+                visit(child)
+            result[adcode] = _digest(self.districts[adcode], sorted(result[child] for child in children))
+
+        for root in self.roots:
+            visit(root)
+        return result
+
+
+def _digest(district, child_digests):
+    data = json.dumps([district.to_row(), child_digests], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class DistrictIndex(object):
+    """
+    离线行政区划索引
+
+    通过 QQ地图 ``district_list`` 或高德地图 ``district`` 接口一次下载完整行政区划树，保存在 sqlite 中，
+    之后的编码查询、上下级遍历、名称搜索及坐标所属行政区判断均在本地完成，不消耗接口配额。
+    坐标判断使用 :class:`lbs.core.spatial.PolygonIndex`，在首次查询时由已下载的边界构建。
+
+    每个节点保存子树摘要，重新同步时摘要未变化的子树直接跳过，仅写入发生变化的部分。
+    高德地图街道与所属区县共用 adcode，不写入索引。
+    同步及下载边界的方法仅支持同步客户端，使用异步客户端时可自行请求后调用 :meth:`load_qq` 或 :meth:`load_amap`
+    """
+
+    def __init__(self, path=':memory:', cell_size=0.05):
+        """
+        :param path: 数据库文件路径，默认仅保存在内存中
+        :param cell_size: 边界网格索引的网格大小(度)
+        """
+        self.path = path
+        self.cell_size = cell_size
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lbs_district "
+            "(adcode TEXT PRIMARY KEY, parent TEXT, name TEXT NOT NULL, fullname TEXT NOT NULL, "
+            "level INTEGER NOT NULL, longitude REAL, latitude REAL, citycode TEXT, digest TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS lbs_district_parent ON lbs_district (parent)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lbs_district_boundary "
+            "(adcode TEXT PRIMARY KEY, min_longitude REAL NOT NULL, min_latitude REAL NOT NULL, "
+            "max_longitude REAL NOT NULL, max_latitude REAL NOT NULL, polyline TEXT NOT NULL)"
+        )
+        self._districts = {}
+        self._polygon_index = None
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT adcode, parent, name, fullname, level, longitude, latitude, citycode FROM lbs_district"
+        )
+        self._districts = dict((row[0], District(*row)) for row in rows)
+        self._polygon_index = None
+
+    def __len__(self):
+        return len(self._districts)
+
+    def __contains__(self, adcode):
+        return to_text(adcode) in self._districts
+
+    def get(self, adcode):
+        """
+        按行政区划代码查询
+
+        :param adcode: 行政区划代码
+        :return: :class:`District`，不存在时返回 None
+        """
+        return self._districts.get(to_text(adcode))
+
+    def parent(self, adcode):
+        """
+        上级行政区划
+
+        :param adcode: 行政区划代码
+        """
+        district = self.get(adcode)
+        if district is None or district.parent is None:
+            return None
+        return self._districts.get(district.parent)
+
+    def ancestors(self, adcode):
+        """
+        全部上级行政区划，由近到远
+
+        :param adcode: 行政区划代码
+        """
+        result = []
+        district = self.parent(adcode)
+        while district is not None:
+            result.append(district)
+            district = self.parent(district.adcode)
+        return result
+
+    def _child_codes(self, adcode):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT adcode FROM lbs_district WHERE parent IS ? ORDER BY adcode", (adcode, )
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def children(self, adcode=None):
+        """
+        下级行政区划
+
+        :param adcode: 行政区划代码，为 None 时返回顶级行政区划
+        """
+        if adcode is not None:
+            adcode = to_text(adcode)
+        return [self._districts[code] for code in self._child_codes(adcode)]
+
+    def descendants(self, adcode, level=None):
+        """
+        全部下级行政区划（广度优先）
+
+        :param adcode: 行政区划代码
+        :param level: 仅返回指定级别
+        """
+        result = []
+        queue = self._child_codes(to_text(adcode))
+        while queue:
+            code = queue.pop(0)
+            district = self._districts[code]
+            if level is None or district.level == level:
+                result.append(district)
+            if level is None or district.level < level:
+                queue.extend(self._child_codes(code))
+        return result
+
+    def _query(self, where, args, level=None, limit=None):
+        sql = "SELECT adcode FROM lbs_district WHERE (%s)" % where
+        if level is not None:
+            sql += " AND level = ?"
+            args += (level, )
+        sql += " ORDER BY level, adcode"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args += (limit, )
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [self._districts[row[0]] for row in rows]
+
+    @staticmethod
+    def _escape_like(value):
+        return to_text(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def search(self, keyword, level=None, limit=None):
+        """
+        按名称关键词搜索
+
+        :param keyword: 关键词，匹配简称或全称中的任意位置
+        :param level: 仅返回指定级别
+        :param limit: 最多返回条数
+        """
+        pattern = '%' + self._escape_like(keyword) + '%'
+        return self._query(
+            "name LIKE ? ESCAPE '\\' OR fullname LIKE ? ESCAPE '\\'", (pattern, pattern), level, limit
+        )
+
+    def prefix(self, prefix, level=None, limit=None):
+        """
+        按名称或行政区划代码前缀搜索
+
+        :param prefix: 前缀，如 "广" 或 "4401"
+        :param level: 仅返回指定级别
+        :param limit: 最多返回条数
+        """
+        pattern = self._escape_like(prefix) + '%'
+        return self._query(
+            "adcode LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' OR fullname LIKE ? ESCAPE '\\'",
+            (pattern, pattern, pattern), level, limit
+        )
+
+    def boundary(self, adcode):
+        """
+        行政区边界坐标串，未下载边界时返回 None
+
+        :param adcode: 行政区划代码
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT polyline FROM lbs_district_boundary WHERE adcode = ?", (to_text(adcode), )
+            ).fetchone()
+        return row[0] if row else None
+
+    def _get_polygon_index(self):
+        with self._lock:
+            if self._polygon_index is None:
+                polygon_index = PolygonIndex(self.cell_size)
+                for adcode, polyline in self._conn.execute("SELECT adcode, polyline FROM lbs_district_boundary"):
+                    district = self._districts.get(adcode)
+                    if district is not None:
+                        polygon_index.add(adcode, polyline, district.level)
+                self._polygon_index = polygon_index
+            return self._polygon_index
+
+    def locate(self, longitude, latitude, level=None):
+        """
+        查询坐标所在的行政区，仅对已下载边界的行政区生效（见 :meth:`fetch_amap_boundaries`）
+
+        :param longitude: 经度，坐标系须与边界一致（高德地图为 gcj02）
+        :param latitude: 纬度
+        :param level: 指定级别，为 None 时返回最下级的行政区
+        :return: :class:`District`，不在任何已知边界内时返回 None
+        """
+        adcode = self._get_polygon_index().query(longitude, latitude, level)
+        return None if adcode is None else self._districts.get(adcode)
+
+    def locate_batch(self, longitudes, latitudes=None, level=None):
+        """
+        批量查询坐标所在的行政区
+
+        :param longitudes: 经度数组，也可以只传入 :class:`lbs.core.model.LocationArray` 或 [(经度, 纬度), ...]
+        :param latitudes: 纬度数组
+        :param level: 指定级别，为 None 时返回最下级的行政区
+        :return: :class:`District` 列表，不在任何已知边界内的坐标为 None
+        """
+        adcodes = self._get_polygon_index().query_batch(longitudes, latitudes, level)
+        return [None if adcode is None else self._districts.get(adcode) for adcode in adcodes]
+
+    def _set_boundary(self, adcode, polyline):
+        rings = parse_polygon(polyline)
+        if not rings:
+            return False
+        row = self._conn.execute("SELECT polyline FROM lbs_district_boundary WHERE adcode = ?", (adcode, )).fetchone()
+        if row is not None and row[0] == polyline:
+            return False
+        longitudes = [lng for ring in rings for lng, _ in ring]
+        latitudes = [lat for ring in rings for _, lat in ring]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO lbs_district_boundary "
+            "(adcode, min_longitude, min_latitude, max_longitude, max_latitude, polyline) VALUES (?, ?, ?, ?, ?, ?)",
+            (adcode, min(longitudes), min(latitudes), max(longitudes), max(latitudes), polyline)
+        )
+        self._polygon_index = None
+        return True
+
+    def set_boundary(self, adcode, polyline):
+        """
+        写入行政区边界
+
+        :param adcode: 行政区划代码
+        :param polyline: 高德地图边界坐标串
+        :return: 是否发生变化
+        """
+        with self._lock:
+            return self._set_boundary(to_text(adcode), polyline)
+
+    def _delete_subtree(self, adcode, keep):
+        deleted = 0
+        queue = [adcode]
+        while queue:
+            code = queue.pop()
+            queue.extend(self._child_codes(code))
+            if code in keep:
+                continue
+            self._conn.execute("DELETE FROM lbs_district WHERE adcode = ?", (code, ))
+            self._conn.execute("DELETE FROM lbs_district_boundary WHERE adcode = ?", (code, ))
+            self._districts.pop(code, None)
+            self._polygon_index = None
+            deleted += 1
+        return deleted
+
+    def _stored_digest(self, adcode):
+        row = self._conn.execute("SELECT digest FROM lbs_district WHERE adcode = ?", (adcode, )).fetchone()
+        return row[0] if row else None
+
+    def _update_ancestors(self, adcode):
+        while adcode is not None:
+            district = self._districts.get(adcode)
+            if district is None:
+                return
+            rows = self._conn.execute("SELECT digest FROM lbs_district WHERE parent = ?", (adcode, )).fetchall()
+            digest = _digest(district, sorted(row[0] for row in rows))
+            self._conn.execute("UPDATE lbs_district SET digest = ? WHERE adcode = ?", (digest, adcode))
+            adcode = district.parent
+
+    def _merge(self, snapshot, full):
+        """
+        合并快照，仅写入摘要变化的子树
+
+        :param snapshot: :class:`_Snapshot`
+        :param full: 快照是否包含全部顶级行政区划，为 True 时删除快照中不存在的顶级行政区划
+        :return: 写入及删除的行数
+        """
+        # 子树刷新时沿用已保存的上级
+        for root in snapshot.roots:
+            district = snapshot.districts[root]
+            stored = self._districts.get(root)
+            if district.parent is None and stored is not None and not full:
+                district.parent = stored.parent
+        digests = snapshot.digests()
+        changed = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                stack = list(snapshot.roots)
+                while stack:
+                    adcode = stack.pop()
+                    if self._stored_digest(adcode) == digests[adcode]:
+                        continue
+                    district = snapshot.districts[adcode]
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO lbs_district "
+                        "(adcode, parent, name, fullname, level, longitude, latitude, citycode, digest) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        district.to_row() + (digests[adcode], )
+                    )
+                    self._districts[adcode] = district
+                    self._polygon_index = None
+                    changed += 1
+                    children = snapshot.children.get(adcode, ())
+                    for code in self._child_codes(adcode):
+                        if code not in snapshot.districts:
+                            changed += self._delete_subtree(code, snapshot.districts)
+                    stack.extend(children)
+                if full:
+                    for code in self._child_codes(None):
+                        if code not in snapshot.districts:
+                            changed += self._delete_subtree(code, snapshot.districts)
+                for root in snapshot.roots:
+                    self._update_ancestors(snapshot.districts[root].parent)
+                for adcode, polyline in snapshot.polylines.items():
+                    if self._set_boundary(adcode, polyline):
+                        changed += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._load()
+                raise
+        return changed
+
+    def load_qq(self, result):
+        """
+        导入 QQ地图 ``district_list`` 接口结果（全量）
+
+        级别按 adcode 判断，直辖市的区县与其它城市的区县同为 :data:`LEVEL_DISTRICT`
+
+        :param result: 接口结果，完整响应或客户端返回的各级行政区列表
+        :return: 写入及删除的行数
+        """
+        snapshot = _Snapshot()
+        levels = (result.get('result') if isinstance(result, dict) else result) or []
+        parents = {}
+        for depth, items in enumerate(levels):
+            next_parents = {}
+            for index, item in enumerate(items):
+                adcode = to_text(item['id'])
+                location = item.get('location') or {}
+                fullname = item.get('fullname') or item.get('name')
+                snapshot.add(District(
+                    adcode, parents.get(index), item.get('name') or fullname, fullname,
+                    _adcode_level(adcode, depth + 1),
+                    _to_float(location.get('lng')), _to_float(location.get('lat'))
+                ))
+                cidx = item.get('cidx')
+                if cidx:
+                    for child in six.moves.range(cidx[0], cidx[1] + 1):
+                        next_parents[child] = adcode
+            parents = next_parents
+        return self._merge(snapshot, True)
+
+    def load_amap(self, result):
+        """
+        导入高德地图 ``district`` 接口结果，返回的各行政区及其下级整体替换索引中的对应子树
+
+        接口参数 extensions 为 all 时一并保存最外层行政区的边界
+
+        :param result: 接口结果
+        :return: 写入及删除的行数
+        """
+        snapshot = _Snapshot()
+        stack = [(item, None) for item in reversed(result.get('districts') or [])]
+        while stack:
+            item, parent = stack.pop()
+            level = AMAP_LEVELS.get(item.get('level'))
+            if level is None or level == LEVEL_STREET:
+                continue
+            adcode = to_text(item['adcode'])
+            center = item.get('center')
+            longitude = latitude = None
+            if center and isinstance(center, six.string_types):
+                longitude, latitude = (_to_float(v) for v in center.split(','))
+            citycode = item.get('citycode')
+            district = District(
+                adcode, parent, item.get('name'), item.get('name'), level, longitude, latitude,
+                citycode if citycode and isinstance(citycode, six.string_types) else None
+            )
+            if snapshot.add(district, item.get('polyline')):
+                stack.extend((child, adcode) for child in reversed(item.get('districts') or []))
+        return self._merge(snapshot, False)
+
+    def sync_qq(self, client):
+        """
+        通过 QQ地图 ``district_list`` 接口同步全部省/市/区县，仅需一次请求
+
+        :param client: :class:`lbs.client.qq.QQMapClient` 客户端
+        :return: 写入及删除的行数
+        """
+        _check_sync_client(client)
+        return self.load_qq(client.tools.district_list())
+
+    def sync_amap(self, client, keywords=None, subdistrict=3):
+        """
+        通过高德地图 ``district`` 接口同步行政区划
+
+        :param client: :class:`lbs.client.amap.AmapClient` 客户端
+        :param keywords: 查询关键字或 adcode，为 None 时同步全国
+        :param subdistrict: 下级行政区级数
+        :return: 写入及删除的行数
+        """
+        _check_sync_client(client)
+        return self.load_amap(client.tools.district(keywords=keywords, subdistrict=subdistrict))
+
+    def fetch_amap_boundaries(self, client, level=LEVEL_DISTRICT, max_workers=4):
+        """
+        通过高德地图 ``district`` 接口（extensions=all）下载指定级别全部行政区的边界
+
+        每个行政区请求一次，边界未变化时不写入
+
+        :param client: :class:`lbs.client.amap.AmapClient` 客户端
+        :param level: 行政区级别
+        :param max_workers: 最大并发数
+        :return: 边界发生变化的行政区数
+        """
+        _check_sync_client(client)
+        adcodes = sorted(code for code, district in self._districts.items() if district.level == level)
+
+        def fetch(adcode):
+            result = client.tools.district(keywords=adcode, subdistrict=0, extensions='all')
+            for item in result.get('districts') or []:
+                if to_text(item.get('adcode')) == adcode:
+                    return item.get('polyline')
+            return None
+
+        changed = 0
+        for item in imap_items(fetch, adcodes, max_workers):
+            if not item.ok:
+                raise item.error
+            if item.result and isinstance(item.result, six.string_types) and self.set_boundary(item.item, item.result):
+                changed += 1
+        return changed
@@ -47,3 +47,7 @@ class LbsClientException(LbsException):
         self.client = client
         self.request = request
         self.response = response
+
+
+class LbsRateLimitException(LbsClientException):
+    """Client side rate limit exception class"""
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals, division
+
+import collections
+import itertools
+import json
+import math
+import threading
+import time
+
+from lbs.core.distance import Distance
+from lbs.core.tile import Tile
+from lbs.core.utils import json_loads
+
+
+class RegeoCache(object):
+    """
+    逆地理编码空间缓存
+
+    结果按坐标所在的地图瓦片（见 :class:`lbs.core.tile.Tile`）分桶保存，查询时在所在瓦片及相邻瓦片中
+    查找距离不超过 tolerance 的最近一次结果，相距几米的 GPS 点可以共用同一次接口请求。
+    超过 maxsize 时淘汰最久未使用的结果
+    """
+
+    def __init__(self, tolerance=30, level=None, maxsize=100000, ttl=86400):
+        """
+        :param tolerance: 可复用结果的最大距离(米)
+        :param level: 分桶使用的瓦片级别，为 None 时按 tolerance 选择瓦片边长不小于 tolerance 的最大级别
+        :param maxsize: 最大缓存条数
+        :param ttl: 缓存时间（秒）
+        """
+        self.tolerance = tolerance
+        self.level = self.level_for_tolerance(tolerance) if level is None else level
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 编号 -> (分桶, 经度, 纬度, 结果, 过期时间)
+        self._entries = collections.OrderedDict()
+        # (命名空间, 瓦片X, 瓦片Y) -> 编号集合
+        self._cells = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def level_for_tolerance(cls, tolerance, latitude=0):
+        """
+        瓦片边长不小于 tolerance 的最大级别
+
+        :param tolerance: 距离(米)
+        :param latitude: 纬度，瓦片边长随纬度升高而减小
+        """
+        size = Tile.ground_resolution(latitude, 0) * Tile.map_size(0)
+        return max(0, min(23, int(math.floor(math.log(size / max(tolerance, 1e-3), 2)))))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _tile(self, longitude, latitude):
+        pixel_x, pixel_y = Tile.lat_long_to_pixel_xy(latitude, longitude, self.level)
+        return Tile.pixel_xy_to_tile_xy(pixel_x, pixel_y)
+
+    def _radius(self, latitude):
+        # 需要查找的相邻瓦片圈数
+        size = Tile.ground_resolution(latitude, self.level) * Tile.map_size(0)
+        return max(1, int(math.ceil(self.tolerance / size)))
+
+    def _remove(self, entry_id):
+        cell = self._entries.pop(entry_id)[0]
+        ids = self._cells.get(cell)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._cells[cell]
+
+    def get(self, longitude, latitude, namespace='', decoder=None):
+        """
+        获取 tolerance 范围内最近的缓存结果
+
+        :param longitude: 经度
+        :param latitude: 纬度
+        :param namespace: 命名空间，不同接口或参数的结果互不复用
+        :param decoder: 结果解码器，见 :class:`lbs.core.decoder.JsonDecoder`，默认返回 ObjectDict
+        :return: 缓存结果，未命中返回 None
+        """
+        tile_x, tile_y = self._tile(longitude, latitude)
+        radius = self._radius(latitude)
+        now = time.time()
+        with self._lock:
+            best_id, best_distance = None, None
+            for x in range(tile_x - radius, tile_x + radius + 1):
+                for y in range(tile_y - radius, tile_y + radius + 1):
+                    for entry_id in list(self._cells.get((namespace, x, y), ())):
+                        _, entry_longitude, entry_latitude, _, expires = self._entries[entry_id]
+                        if expires <= now:
+                            self._remove(entry_id)
+                            continue
+                        distance = Distance.haversine(longitude, latitude, entry_longitude, entry_latitude)
+                        if distance <= self.tolerance and (best_distance is None or distance < best_distance):
+                            best_id, best_distance = entry_id, distance
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # move to end
+            entry = self._entries.pop(best_id)
+            self._entries[best_id] = entry
+            value = entry[3]
+        if decoder is not None:
+            return decoder.loads(value)
+        return json_loads(value)
+
+    def set(self, longitude, latitude, value, namespace=''):
+        """
+        写入缓存
+
+        :param longitude: 经度
+        :param latitude: 纬度
+        :param value: 逆地理编码结果
+        :param namespace: 命名空间
+        """
+        tile_x, tile_y = self._tile(longitude, latitude)
+        cell = (namespace, tile_x, tile_y)
+        value = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (cell, longitude, latitude, value, time.time() + self.ttl)
+            self._cells.setdefault(cell, set()).add(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+            self._cells.clear()
+
+    def stats(self):
+        """
+        缓存命中统计
+
+        :return: hits/misses/hit_rate/evictions/size
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / float(total) if total else 0.0,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
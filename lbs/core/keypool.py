@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+import six
+
+from lbs.core.exceptions import LbsClientException
+
+
+class KeyPool(object):
+    """
+    多 key 池
+
+    按轮询或最少并发选择 key，配额用尽或 key 无效的 key 进入冷却期，冷却结束后重新启用
+    """
+
+    ROUND_ROBIN = 'round_robin'
+    LEAST_LOADED = 'least_loaded'
+
+    def __init__(self, keys, strategy=ROUND_ROBIN, cooldown=600):
+        """
+        :param keys: key 列表，元素为 key 或 (key, 私钥)
+        :param strategy: 选择策略，round_robin 轮询 / least_loaded 最少并发
+        :param cooldown: 默认冷却时间（秒）
+        """
+        if strategy not in (self.ROUND_ROBIN, self.LEAST_LOADED):
+            raise ValueError("strategy 错误")
+        self.strategy = strategy
+        self.cooldown_seconds = cooldown
+        self._secrets = dict()
+        self._keys = list()
+        for item in keys:
+            if isinstance(item, six.string_types):
+                key, secret = item, None
+            else:
+                key, secret = item
+            if key in self._secrets:
+                continue
+            self._keys.append(key)
+            self._secrets[key] = secret
+        if not self._keys:
+            raise ValueError("keys 不能为空")
+        self._in_flight = dict((key, 0) for key in self._keys)
+        self._used = dict((key, 0) for key in self._keys)
+        self._cooldown_until = dict()
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def keys(self):
+        return list(self._keys)
+
+    def get_secret(self, key):
+        """
+        获取 key 对应的私钥
+
+        :param key: key
+        """
+        return self._secrets[key]
+
+    def available_keys(self, now=None):
+        """
+        当前可用（不在冷却期）的 key
+
+        :param now: 当前时间戳
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return [key for key in self._keys if self._cooldown_until.get(key, 0) <= now]
+
+    def acquire(self):
+        """
+        选择一个 key，并发数加一，使用完毕后需调用 :meth:`release`
+
+        :return: (key, 私钥)
+        :raises LbsClientException: 所有 key 均在冷却期
+        """
+        now = time.time()
+        with self._lock:
+            available = [key for key in self._keys if self._cooldown_until.get(key, 0) <= now]
+            if not available:
+                raise LbsClientException('NO_AVAILABLE_KEY', "所有 key 均在冷却期")
+            if self.strategy == self.LEAST_LOADED:
+                key = min(available, key=lambda k: (self._in_flight[k], self._used[k]))
+            else:
+                key = available[self._index % len(available)]
+                self._index += 1
+            self._in_flight[key] += 1
+            self._used[key] += 1
+            return key, self._secrets[key]
+
+    def release(self, key):
+        """
+        释放 :meth:`acquire` 获取的 key
+
+        :param key: key
+        """
+        with self._lock:
+            if self._in_flight.get(key, 0) > 0:
+                self._in_flight[key] -= 1
+
+    def cooldown(self, key, seconds=None):
+        """
+        将 key 移入冷却期
+
+        :param key: key
+        :param seconds: 冷却时间（秒），默认为 cooldown
+        """
+        seconds = self.cooldown_seconds if seconds is None else seconds
+        with self._lock:
+            self._cooldown_until[key] = time.time() + seconds
+
+    def stats(self):
+        """
+        各 key 使用统计
+
+        :return: {key: {'in_flight': 并发数, 'used': 使用次数, 'cooldown_until': 冷却结束时间}}
+        """
+        with self._lock:
+            return dict(
+                (key, {
+                    'in_flight': self._in_flight[key],
+                    'used': self._used[key],
+                    'cooldown_until': self._cooldown_until.get(key, 0),
+                })
+                for key in self._keys
+            )
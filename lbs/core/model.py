@@ -1,8 +1,159 @@
 # encoding: utf-8
 from __future__ import absolute_import, unicode_literals
 
+import array
+
+from lbs.core import utils
+
 
 class LbsLocation(object):
+    __slots__ = ('longitude', 'latitude')
+
     def __init__(self, longitude, latitude):
         self.longitude = longitude
         self.latitude = latitude
+
+    def __repr__(self):
+        return "LbsLocation(%r, %r)" % (self.longitude, self.latitude)
+
+
+class LocationArray(object):
+    """
+    按列存储的坐标序列，经度、纬度各为一个 float64 数组
+
+    安装了 numpy 时为 ``numpy.ndarray``，否则为 ``array.array('d')``，每个坐标占用 16 字节。
+    迭代或按下标访问时返回 :class:`LbsLocation`，切片返回 :class:`LocationArray`
+    """
+    __slots__ = ('longitudes', 'latitudes')
+
+    def __init__(self, longitudes=(), latitudes=()):
+        """
+        :param longitudes: 经度数组
+        :param latitudes: 纬度数组
+        """
+        longitudes = utils.to_float_array(longitudes)
+        latitudes = utils.to_float_array(latitudes)
+        if len(longitudes) != len(latitudes):
+            raise ValueError("经纬度数组长度不一致")
+        self.longitudes = longitudes
+        self.latitudes = latitudes
+
+    @classmethod
+    def from_locations(cls, locations):
+        """
+        由 :class:`LbsLocation` 或 (经度, 纬度) 序列创建
+
+        :param locations: 坐标序列
+        """
+        if isinstance(locations, cls):
+            return locations
+        longitudes = list()
+        latitudes = list()
+        for location in locations:
+            if isinstance(location, LbsLocation):
+                longitudes.append(location.longitude)
+                latitudes.append(location.latitude)
+            else:
+                longitude, latitude = location
+                longitudes.append(longitude)
+                latitudes.append(latitude)
+        return cls(longitudes, latitudes)
+
+    def __len__(self):
+        return len(self.longitudes)
+
+    def __iter__(self):
+        for longitude, latitude in zip(self.longitudes, self.latitudes):
+            yield LbsLocation(float(longitude), float(latitude))
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return type(self)(self.longitudes[item], self.latitudes[item])
+        return LbsLocation(float(self.longitudes[item]), float(self.latitudes[item]))
+
+    def __repr__(self):
+        return "LocationArray(%d)" % len(self)
+
+    def to_pairs(self):
+        """
+        转换为 [(经度, 纬度), ...]
+        """
+        return [(float(longitude), float(latitude)) for longitude, latitude in zip(self.longitudes, self.latitudes)]
+
+
+class DistanceMatrix(object):
+    """
+    距离矩阵，未获取到的元素为 nan
+
+    安装了 numpy 时 distances、durations 为 (起点数, 终点数) 的 ``numpy.ndarray``，
+    否则为按行展开的 ``array.array('d')``，可使用 :meth:`distance`、:meth:`duration` 按下标访问。
+    errors 为请求失败的分块 [(起点起始序号, 起点结束序号, 终点起始序号, 终点结束序号, 异常), ...]
+    """
+    __slots__ = ('rows', 'cols', 'distances', 'durations', 'errors')
+
+    def __init__(self, rows, cols):
+        """
+        :param rows: 起点数
+        :param cols: 终点数
+        """
+        self.rows = rows
+        self.cols = cols
+        np = utils.numpy
+        if np is None:
+            self.distances = array.array('d', [float('nan')]) * (rows * cols)
+            self.durations = array.array('d', [float('nan')]) * (rows * cols)
+        else:
+            self.distances = np.full((rows, cols), np.nan)
+            self.durations = np.full((rows, cols), np.nan)
+        self.errors = list()
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return "DistanceMatrix(%d, %d, errors=%d)" % (self.rows, self.cols, len(self.errors))
+
+    def _get(self, values, row, col):
+        if isinstance(values, array.array):
+            return values[row * self.cols + col]
+        return float(values[row, col])
+
+    def distance(self, row, col):
+        """
+        起点 row 到终点 col 的距离
+
+        :param row: 起点序号
+        :param col: 终点序号
+        """
+        return self._get(self.distances, row, col)
+
+    def duration(self, row, col):
+        """
+        起点 row 到终点 col 的耗时
+
+        :param row: 起点序号
+        :param col: 终点序号
+        """
+        return self._get(self.durations, row, col)
+
+    def set_block(self, row, col, distances, durations):
+        """
+        填充分块结果
+
+        :param row: 分块起点起始序号
+        :param col: 分块终点起始序号
+        :param distances: 分块距离 [[...], ...]
+        :param durations: 分块耗时 [[...], ...]
+        """
+        if isinstance(self.distances, array.array):
+            for i, (distance_row, duration_row) in enumerate(zip(distances, durations)):
+                start = (row + i) * self.cols + col
+                self.distances[start:start + len(distance_row)] = array.array('d', distance_row)
+                self.durations[start:start + len(duration_row)] = array.array('d', duration_row)
+            return
+        np = utils.numpy
+        distances = np.asarray(distances, dtype=np.float64)
+        durations = np.asarray(durations, dtype=np.float64)
+        self.distances[row:row + distances.shape[0], col:col + distances.shape[1]] = distances
+        self.durations[row:row + durations.shape[0], col:col + durations.shape[1]] = durations
@@ -0,0 +1,313 @@
+# encoding: utf-8
+from __future__ import absolute_import, unicode_literals, division
+
+import array
+import bisect
+import math
+
+import six
+
+from lbs.core import model, utils
+
+# QQ地图 polyline 坐标增量的单位（百万分之一度）
+QQ_POLYLINE_PRECISION = 1000000
+
+
+def _check_qq_polyline(coors):
+    if len(coors) % 2 != 0:
+        raise ValueError("坐标串错误")
+
+
+def decode_qq_polyline(coors):
+    """
+    QQ地图 polyline 坐标解压
+
+    坐标串为 [纬度, 经度, 纬度增量, 经度增量, ...]，增量单位为百万分之一度。
+    安装了 numpy 时使用前缀和向量化计算
+
+    :param coors: polyline 的坐标串
+    :return: :class:`lbs.core.model.LocationArray`
+    """
+    _check_qq_polyline(coors)
+    np = utils.numpy
+    if np is None:
+        longitudes = array.array('d')
+        latitudes = array.array('d')
+        for location in iter_qq_polyline(coors):
+            longitudes.append(location.longitude)
+            latitudes.append(location.latitude)
+        return model.LocationArray(longitudes, latitudes)
+    coors = np.asarray(coors, dtype=np.float64)
+    if not len(coors):
+        return model.LocationArray()
+    # 增量为整数，先求和再换算，避免逐点累加的浮点误差
+    latitudes = np.cumsum(coors[0::2])
+    longitudes = np.cumsum(coors[1::2])
+    latitudes[1:] -= coors[0]
+    longitudes[1:] -= coors[1]
+    latitudes[1:] = coors[0] + latitudes[1:] / QQ_POLYLINE_PRECISION
+    longitudes[1:] = coors[1] + longitudes[1:] / QQ_POLYLINE_PRECISION
+    return model.LocationArray(longitudes, latitudes)
+
+
+def iter_qq_polyline(coors):
+    """
+    逐点解压 QQ地图 polyline 坐标，适用于超长坐标串
+
+    :param coors: polyline 的坐标串
+    :return: :class:`lbs.core.model.LbsLocation` 生成器
+    """
+    _check_qq_polyline(coors)
+    if not len(coors):
+        return
+    latitude, longitude = float(coors[0]), float(coors[1])
+    d_latitude, d_longitude = 0, 0
+    yield model.LbsLocation(longitude, latitude)
+    for i in six.moves.range(2, len(coors), 2):
+        d_latitude += coors[i]
+        d_longitude += coors[i + 1]
+        yield model.LbsLocation(
+            longitude + d_longitude / QQ_POLYLINE_PRECISION, latitude + d_latitude / QQ_POLYLINE_PRECISION
+        )
+
+
+def decode_qq_route_polylines(result):
+    """
+    解压 QQ地图路线规划结果中所有的 polyline 字段（包括公交线路中的 polyline），原地替换为
+    :class:`lbs.core.model.LocationArray`
+
+    :param result: 驾车、步行、骑行、公交路线规划结果
+    :return: result
+    """
+    if isinstance(result, dict):
+        for key, value in result.items():
+            if key == 'polyline' and isinstance(value, (list, tuple)):
+                result[key] = decode_qq_polyline(value)
+            else:
+                decode_qq_route_polylines(value)
+    elif isinstance(result, (list, tuple)):
+        for value in result:
+            decode_qq_route_polylines(value)
+    return result
+
+
+# 赤道上每度对应的米数，用于抽稀时将经纬度近似投影为平面坐标
+METERS_PER_DEGREE = 6378137 * math.pi / 180
+
+
+def parse_amap_polyline(polyline):
+    """
+    解析高德地图 "经度,纬度;经度,纬度" 格式的坐标串
+
+    :param polyline: 坐标串，也可以是高德地图无坐标时返回的空列表
+    :return: :class:`lbs.core.model.LocationArray`
+    """
+    if not polyline or not isinstance(polyline, six.string_types):
+        return model.LocationArray()
+    values = polyline.replace(';', ',').split(',')
+    if len(values) % 2 != 0:
+        raise ValueError("坐标串错误")
+    np = utils.numpy
+    if np is None:
+        values = array.array('d', map(float, values))
+    else:
+        values = np.array(values, dtype=np.float64)
+    return model.LocationArray(values[0::2], values[1::2])
+
+
+def _project(locations):
+    # 以平均纬度做等距圆柱投影，单位为米
+    latitudes = locations.latitudes
+    np = utils.numpy
+    if np is None:
+        scale = math.cos(math.radians(sum(latitudes) / len(latitudes))) * METERS_PER_DEGREE
+        return [x * scale for x in locations.longitudes], [y * METERS_PER_DEGREE for y in latitudes]
+    scale = math.cos(math.radians(float(latitudes.mean()))) * METERS_PER_DEGREE
+    return locations.longitudes * scale, latitudes * METERS_PER_DEGREE
+
+
+def _max_segment_distance(xs, ys, start, end):
+    # 返回 start、end 之间距线段 start-end 最远的点及其距离
+    np = utils.numpy
+    x0, y0, x1, y1 = xs[start], ys[start], xs[end], ys[end]
+    dx, dy = x1 - x0, y1 - y0
+    length = dx * dx + dy * dy
+    if np is not None:
+        px, py = xs[start + 1:end] - x0, ys[start + 1:end] - y0
+        if length > 0:
+            t = np.clip((px * dx + py * dy) / length, 0, 1)
+            px, py = px - t * dx, py - t * dy
+        distances = px * px + py * py
+        index = int(np.argmax(distances))
+        return start + 1 + index, math.sqrt(distances[index])
+    max_index, max_distance = start, -1.0
+    for i in six.moves.range(start + 1, end):
+        px, py = xs[i] - x0, ys[i] - y0
+        if length > 0:
+            t = min(max((px * dx + py * dy) / length, 0), 1)
+            px, py = px - t * dx, py - t * dy
+        distance = px * px + py * py
+        if distance > max_distance:
+            max_index, max_distance = i, distance
+    return max_index, math.sqrt(max_distance)
+
+
+def simplify_indices(locations, tolerance, keep=()):
+    """
+    Douglas–Peucker 抽稀，返回保留的坐标序号
+
+    :param locations: :class:`lbs.core.model.LocationArray`
+    :param tolerance: 允许偏差（米）
+    :param keep: 必须保留的坐标序号
+    :return: 升序排列的坐标序号列表
+    """
+    count = len(locations)
+    if count < 3:
+        return list(six.moves.range(count))
+    xs, ys = _project(locations)
+    fixed = sorted(set([0, count - 1]) | set(i for i in keep if 0 <= i < count))
+    kept = set(fixed)
+    stack = list(zip(fixed[:-1], fixed[1:]))
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        index, distance = _max_segment_distance(xs, ys, start, end)
+        if distance > tolerance:
+            kept.add(index)
+            stack.append((start, index))
+            stack.append((index, end))
+    return sorted(kept)
+
+
+def simplify(locations, tolerance):
+    """
+    Douglas–Peucker 抽稀
+
+    :param locations: :class:`lbs.core.model.LocationArray`
+    :param tolerance: 允许偏差（米）
+    :return: :class:`lbs.core.model.LocationArray`
+    """
+    return _take(locations, simplify_indices(locations, tolerance))
+
+
+def _take(locations, indices):
+    np = utils.numpy
+    if np is None:
+        return model.LocationArray(
+            array.array('d', (locations.longitudes[i] for i in indices)),
+            array.array('d', (locations.latitudes[i] for i in indices)),
+        )
+    indices = np.asarray(indices, dtype=np.int64)
+    return model.LocationArray(locations.longitudes[indices], locations.latitudes[indices])
+
+
+class RouteGeometry(object):
+    """
+    由多段坐标串拼接而成的路线，所有坐标保存在一个 :class:`lbs.core.model.LocationArray` 中，
+    第 i 段为 ``locations[offsets[i]:offsets[i + 1]]``
+    """
+    __slots__ = ('locations', 'offsets')
+
+    def __init__(self, locations, offsets):
+        """
+        :param locations: 全部坐标
+        :param offsets: 各段起始序号，最后一个元素为坐标总数
+        """
+        self.locations = locations
+        self.offsets = list(offsets)
+
+    @classmethod
+    def from_polylines(cls, polylines):
+        """
+        一次解析多段高德地图坐标串
+
+        :param polylines: 坐标串列表
+        """
+        offsets = [0]
+        parts = list()
+        for polyline in polylines:
+            if polyline and isinstance(polyline, six.string_types):
+                parts.append(polyline)
+                offsets.append(offsets[-1] + polyline.count(';') + 1)
+            else:
+                offsets.append(offsets[-1])
+        return cls(parse_amap_polyline(';'.join(parts)), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __repr__(self):
+        return "RouteGeometry(%d, %d)" % (len(self), len(self.locations))
+
+    def step(self, index):
+        """
+        第 index 段坐标
+
+        :param index: 段序号
+        :return: :class:`lbs.core.model.LocationArray`
+        """
+        return self.locations[self.offsets[index]:self.offsets[index + 1]]
+
+    def simplify(self, tolerance):
+        """
+        Douglas–Peucker 抽稀，各段首尾坐标均保留
+
+        :param tolerance: 允许偏差（米）
+        :return: :class:`RouteGeometry`
+        """
+        keep = set()
+        for start, end in zip(self.offsets[:-1], self.offsets[1:]):
+            if end > start:
+                keep.add(start)
+                keep.add(end - 1)
+        indices = simplify_indices(self.locations, tolerance, keep)
+        offsets = [bisect.bisect_left(indices, offset) for offset in self.offsets]
+        return type(self)(_take(self.locations, indices), offsets)
+
+
+def _attach_geometry(owner, containers, simplify_tolerance):
+    geometry = RouteGeometry.from_polylines([container.get('polyline') for container in containers])
+    if simplify_tolerance:
+        geometry = geometry.simplify(simplify_tolerance)
+    owner['geometry'] = geometry
+    for i, container in enumerate(containers):
+        container['polyline'] = geometry.step(i)
+
+
+def decode_amap_route_polylines(result, simplify_tolerance=None):
+    """
+    解析高德地图驾车、步行、公交、骑行、货车路径规划结果中的 polyline
+
+    每个方案增加 ``geometry`` 字段（:class:`RouteGeometry`），各段的 polyline 替换为其中对应的
+    :class:`lbs.core.model.LocationArray`。公交方案中只有每段的第一条公交线路参与拼接，其余备选线路单独解析
+
+    :param result: 路径规划结果
+    :param simplify_tolerance: 抽稀允许偏差（米），None 表示不抽稀
+    :return: result
+    """
+    if not isinstance(result, dict):
+        return result
+    # v4 接口（骑行、货车）的结果位于 data 中
+    route = result.get('data') if 'data' in result else result
+    if isinstance(route, dict) and 'route' in route:
+        route = route['route']
+    if not isinstance(route, dict):
+        return result
+    for path in route.get('paths') or []:
+        _attach_geometry(path, path.get('steps') or [], simplify_tolerance)
+    for transit in route.get('transits') or []:
+        containers = list()
+        for segment in transit.get('segments') or []:
+            walking = segment.get('walking') or {}
+            containers.extend(walking.get('steps') or [])
+            buslines = (segment.get('bus') or {}).get('buslines') or []
+            if buslines:
+                containers.append(buslines[0])
+                for busline in buslines[1:]:
+                    busline['polyline'] = parse_amap_polyline(busline.get('polyline'))
+            taxi = segment.get('taxi')
+            if isinstance(taxi, dict) and 'polyline' in taxi:
+                containers.append(taxi)
+        _attach_geometry(transit, containers, simplify_tolerance)
+    return result
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import sqlite3
+import threading
+import time
+
+from lbs.core.exceptions import LbsRateLimitException
+
+
+class MemoryBackend(object):
+    """
+    进程内令牌桶存储，可在多个线程及客户端间共享
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._daily = {}
+
+    def reserve(self, name, rate, burst, now, blocking=True):
+        """
+        预占一个令牌
+
+        :param name: 令牌桶名称
+        :param rate: 每秒生成令牌数
+        :param burst: 令牌桶容量
+        :param now: 当前时间戳
+        :param blocking: 无可用令牌时是否排队等待
+        :return: 需要等待的秒数，非阻塞且无可用令牌时返回 None
+        """
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (burst, now))
+            tokens, delay = _take_token(tokens, updated, rate, burst, now, blocking)
+            if delay is not None:
+                self._buckets[name] = (tokens, now)
+            return delay
+
+    def refund(self, name):
+        """
+        归还一个已预占的令牌
+
+        :param name: 令牌桶名称
+        """
+        with self._lock:
+            if name in self._buckets:
+                tokens, updated = self._buckets[name]
+                self._buckets[name] = (tokens + 1, updated)
+
+    def incr_daily(self, name, day, quota):
+        """
+        增加当日调用量
+
+        :param name: 配额名称
+        :param day: 日期
+        :param quota: 每日配额，None 表示只计数不限制
+        :return: 未超出配额返回 True，超出配额返回 False 且不计数
+        """
+        with self._lock:
+            key = (name, day)
+            if key not in self._daily:
+                for expired in [k for k in self._daily if k[0] == name]:
+                    del self._daily[expired]
+            count = self._daily.get(key, 0)
+            if quota is not None and count >= quota:
+                return False
+            self._daily[key] = count + 1
+            return True
+
+    def decr_daily(self, name, day):
+        """
+        撤销一次当日调用量计数
+
+        :param name: 配额名称
+        :param day: 日期
+        """
+        with self._lock:
+            key = (name, day)
+            if self._daily.get(key, 0) > 0:
+                self._daily[key] -= 1
+
+    def get_daily(self, name, day):
+        """
+        获取当日调用量
+
+        :param name: 配额名称
+        :param day: 日期
+        """
+        with self._lock:
+            return self._daily.get((name, day), 0)
+
+
+class SqliteBackend(object):
+    """
+    sqlite 令牌桶存储，通过数据库锁在多个进程间共享，接口同 :class:`MemoryBackend`
+    """
+
+    def __init__(self, path, timeout=30):
+        """
+        :param path: 数据库文件路径
+        :param timeout: 等待数据库锁的超时时间（秒）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lbs_ratelimit_bucket "
+            "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lbs_ratelimit_daily "
+            "(name TEXT NOT NULL, day TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (name, day))"
+        )
+
+    def _transaction(self, func):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ret = func(self._conn)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return ret
+
+    def reserve(self, name, rate, burst, now, blocking=True):
+        def _reserve(conn):
+            row = conn.execute(
+                "SELECT tokens, updated FROM lbs_ratelimit_bucket WHERE name = ?", (name, )
+            ).fetchone()
+            tokens, updated = row if row is not None else (burst, now)
+            tokens, delay = _take_token(tokens, updated, rate, burst, now, blocking)
+            if delay is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO lbs_ratelimit_bucket (name, tokens, updated) VALUES (?, ?, ?)",
+                    (name, tokens, now)
+                )
+            return delay
+        return self._transaction(_reserve)
+
+    def refund(self, name):
+        def _refund(conn):
+            conn.execute("UPDATE lbs_ratelimit_bucket SET tokens = tokens + 1 WHERE name = ?", (name, ))
+        self._transaction(_refund)
+
+    def incr_daily(self, name, day, quota):
+        def _incr(conn):
+            row = conn.execute(
+                "SELECT count FROM lbs_ratelimit_daily WHERE name = ? AND day = ?", (name, day)
+            ).fetchone()
+            count = row[0] if row is not None else 0
+            if quota is not None and count >= quota:
+                return False
+            conn.execute("DELETE FROM lbs_ratelimit_daily WHERE name = ? AND day != ?", (name, day))
+            conn.execute(
+                "INSERT OR REPLACE INTO lbs_ratelimit_daily (name, day, count) VALUES (?, ?, ?)",
+                (name, day, count + 1)
+            )
+            return True
+        return self._transaction(_incr)
+
+    def decr_daily(self, name, day):
+        def _decr(conn):
+            conn.execute(
+                "UPDATE lbs_ratelimit_daily SET count = count - 1 WHERE name = ? AND day = ? AND count > 0",
+                (name, day)
+            )
+        self._transaction(_decr)
+
+    def get_daily(self, name, day):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count FROM lbs_ratelimit_daily WHERE name = ? AND day = ?", (name, day)
+            ).fetchone()
+        return row[0] if row is not None else 0
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
+
+
+def _take_token(tokens, updated, rate, burst, now, blocking):
+    tokens = min(burst, tokens + max(now - updated, 0) * rate)
+    if tokens < 1 and not blocking:
+        return tokens, None
+    tokens -= 1
+    return tokens, 0.0 if tokens >= 0 else -tokens / rate
+
+
+class RateLimiter(object):
+    """
+    令牌桶限流器
+
+    按 QPS 平滑请求并统计每日调用量，超出每日配额时抛出 :class:`lbs.core.exceptions.LbsRateLimitException`。
+    同一个限流器可在多个线程、客户端间共享，使用 :class:`SqliteBackend` 时可在多个进程间共享。
+    """
+
+    def __init__(self, qps=None, burst=None, daily_quota=None, endpoint_limits=None, backend=None,
+                 name='default', blocking=True, utc_offset=8):
+        """
+        :param qps: 每秒请求数，None 表示不限制
+        :param burst: 允许的突发请求数，默认与 qps 相同
+        :param daily_quota: 每日配额，None 表示不限制
+        :param endpoint_limits: 各接口限制，如 ``{'/v3/geocode/regeo': {'qps': 50, 'daily_quota': 300000}}``
+        :param backend: 令牌桶存储，默认 :class:`MemoryBackend`
+        :param name: 限流器名称，共享存储时用于区分不同的 key
+        :param blocking: 超出 QPS 时是否等待，为 False 时直接抛出异常
+        :param utc_offset: 每日配额重置时间所在时区（小时），默认北京时间
+        """
+        self.qps = qps
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.endpoint_limits = endpoint_limits or {}
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.name = name
+        self.blocking = blocking
+        self.utc_offset = utc_offset
+
+    def _day(self, now):
+        return time.strftime('%Y-%m-%d', time.gmtime(now + self.utc_offset * 3600))
+
+    def _limits(self, endpoint):
+        yield self.name, self.qps, self.burst, self.daily_quota
+        limit = self.endpoint_limits.get(endpoint)
+        if limit:
+            yield "%s:%s" % (self.name, endpoint), limit.get('qps'), limit.get('burst'), limit.get('daily_quota')
+
+    def reserve(self, endpoint=None):
+        """
+        预占一次请求
+
+        任一限制未通过时抛出异常，已预占的令牌及已计数的调用量全部归还
+
+        :param endpoint: 接口地址
+        :return: 发出请求前需要等待的秒数
+        """
+        now = time.time()
+        limits = list(self._limits(endpoint))
+        day = self._day(now)
+        reserved = []
+        counted = []
+        try:
+            delay = 0.0
+            for name, qps, burst, _ in limits:
+                if qps is None:
+                    continue
+                wait = self.backend.reserve(name, qps, burst or qps, now, self.blocking)
+                if wait is None:
+                    raise LbsRateLimitException('QPS_EXCEEDED', "%s 超出QPS限制 %s" % (name, qps))
+                reserved.append(name)
+                delay = max(delay, wait)
+            for name, _, _, daily_quota in limits:
+                if not self.backend.incr_daily(name, day, daily_quota):
+                    raise LbsRateLimitException('DAILY_QUOTA_EXCEEDED', "%s 超出每日配额 %s" % (name, daily_quota))
+                counted.append(name)
+        except LbsRateLimitException:
+            for name in reserved:
+                self.backend.refund(name)
+            for name in counted:
+                self.backend.decr_daily(name, day)
+            raise
+        return delay
+
+    def acquire(self, endpoint=None):
+        """
+        获取请求许可，超出 QPS 时阻塞等待
+
+        :param endpoint: 接口地址
+        """
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    def daily_usage(self, endpoint=None):
+        """
+        当日调用量
+
+        :param endpoint: 接口地址，为 None 时返回总调用量，仅统计 endpoint_limits 中配置的接口
+        """
+        name = self.name if endpoint is None else "%s:%s" % (self.name, endpoint)
+        return self.backend.get_daily(name, self._day(time.time()))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import random
+import threading
+
+import requests
+
+
+class RetryPolicy(object):
+    """
+    请求重试策略
+
+    对连接错误、超时、5xx 响应及服务商返回的可重试错误码（如 QPS 超限）进行重试，
+    重试间隔按指数退避并加入随机抖动。连接错误、超时及 5xx 响应仅对幂等请求重试，
+    服务商错误码表示请求已被拒绝，任何请求方法均可重试。
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=10, jitter=True, deadline=None,
+                 retry_status=(500, 502, 503, 504), retry_errcodes=None,
+                 idempotent_methods=('GET', 'HEAD', 'OPTIONS')):
+        """
+        :param max_retries: 最大重试次数
+        :param backoff_factor: 退避基数（秒），第 n 次重试最多等待 backoff_factor * 2 ** n 秒
+        :param max_backoff: 单次最长等待时间（秒）
+        :param jitter: 是否在 [0, 退避时间] 内随机等待
+        :param deadline: 包括重试在内的总耗时上限（秒），None 表示不限制
+        :param retry_status: 可重试的 HTTP 状态码
+        :param retry_errcodes: 可重试的服务商错误码，None 表示使用客户端的 RETRY_ERRCODES
+        :param idempotent_methods: 幂等的请求方法
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_status = frozenset(retry_status)
+        self.retry_errcodes = None if retry_errcodes is None else frozenset(str(x) for x in retry_errcodes)
+        self.idempotent_methods = frozenset(m.upper() for m in idempotent_methods)
+        self.retries = 0
+        self.giveups = 0
+        self._lock = threading.Lock()
+
+    def is_retryable(self, method, exception, errcodes=(), transport=False):
+        """
+        判断异常是否可以重试
+
+        :param method: 请求方法
+        :param exception: 请求异常
+        :param errcodes: 客户端默认的可重试错误码
+        :param transport: 是否为连接错误或超时
+        """
+        idempotent = method.upper() in self.idempotent_methods
+        if transport:
+            # 连接未建立时请求一定没有发出
+            return idempotent or isinstance(exception, requests.ConnectTimeout)
+        errcode = getattr(exception, 'errcode', None)
+        if errcode is not None:
+            retry_errcodes = self.retry_errcodes if self.retry_errcodes is not None else errcodes
+            return str(errcode) in retry_errcodes
+        response = getattr(exception, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+        return idempotent and status_code in self.retry_status
+
+    def backoff(self, attempt):
+        """
+        第 attempt 次重试前的等待时间（秒）
+
+        :param attempt: 重试序号，从 0 开始
+        """
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        return backoff
+
+    def next_delay(self, method, exception, attempt, elapsed, errcodes=(), transport=False):
+        """
+        计算下次重试前的等待时间，并更新重试计数
+
+        :param method: 请求方法
+        :param exception: 请求异常
+        :param attempt: 已重试次数
+        :param elapsed: 已耗时（秒）
+        :param errcodes: 客户端默认的可重试错误码
+        :param transport: 是否为连接错误或超时
+        :return: 等待秒数，不再重试时返回 None
+        """
+        if not self.is_retryable(method, exception, errcodes, transport):
+            return None
+        delay = self.backoff(attempt)
+        if attempt >= self.max_retries or (self.deadline is not None and elapsed + delay > self.deadline):
+            with self._lock:
+                self.giveups += 1
+            return None
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def stats(self):
+        """
+        重试统计
+
+        :return: retries 为总重试次数，giveups 为达到重试上限后放弃的次数
+        """
+        return {'retries': self.retries, 'giveups': self.giveups}
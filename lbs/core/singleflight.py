@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import copy
+import threading
+
+
+class FlightCall(object):
+    """
+    进行中的请求
+    """
+    __slots__ = ('event', 'task', 'waiters', 'copies', 'error')
+
+    def __init__(self):
+        self.event = None
+        self.task = None
+        # 等待该请求结果的其它调用数
+        self.waiters = 0
+        # 为每个等待者准备的结果副本
+        self.copies = []
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    合并并发的相同请求
+
+    同一时刻相同 key 的调用只执行一次 func，其余调用等待并共享其结果或异常。
+    等待者得到结果的深拷贝，修改结果不会互相影响
+    """
+
+    def __init__(self, copy_result=copy.deepcopy):
+        """
+        :param copy_result: 为等待者复制结果的函数
+        """
+        self.copy_result = copy_result
+        # 共享了其它调用结果的次数
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        执行或等待相同 key 的进行中调用
+
+        :param key: 调用标识
+        :param func: 调用函数
+        :return: func 的返回值
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = FlightCall()
+                call.event = threading.Event()
+                leader = True
+            else:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.copies.pop()
+        ok = False
+        try:
+            result = func(*args, **kwargs)
+            ok = True
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # 移除后不会再有新的等待者
+                del self._calls[key]
+            if ok:
+                try:
+                    call.copies = [self.copy_result(result) for _ in range(call.waiters)]
+                except Exception as e:
+                    call.error = e
+            elif call.error is None:
+                call.error = RuntimeError("合并的请求被中断")
+            call.event.set()
+        return result
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals, division
+
+import bisect
+import math
+
+import six
+
+from lbs.core import model, utils
+
+
+def parse_polygon(polygon):
+    """
+    解析多边形
+
+    :param polygon: 高德地图边界坐标串 "经度,纬度;经度,纬度|经度,纬度;..."（| 分隔多个多边形），
+        或 [[(经度, 纬度), ...], ...]
+    :return: 多边形列表，每个多边形为 [(经度, 纬度), ...]，点数少于 3 的多边形被忽略
+    """
+    rings = []
+    if isinstance(polygon, six.string_types):
+        for part in polygon.split('|'):
+            ring = []
+            for point in part.split(';'):
+                if not point:
+                    continue
+                longitude, latitude = point.split(',')
+                ring.append((float(longitude), float(latitude)))
+            rings.append(ring)
+    else:
+        rings = [[(float(longitude), float(latitude)) for longitude, latitude in ring] for ring in polygon]
+    return [ring for ring in rings if len(ring) >= 3]
+
+
+class _Cell(object):
+    """
+    多边形在单个网格内的数据
+    """
+    __slots__ = ('key', 'level', 'center', 'inside', 'edges')
+
+    def __init__(self, key, level, center, inside, edges):
+        self.key = key
+        self.level = level
+        # 网格中心及其是否在多边形内部
+        self.center = center
+        self.inside = inside
+        # 与网格相交的边 [(x1, y1, x2, y2), ...]，为 None 时网格完全在多边形内部
+        self.edges = edges
+
+    def contains(self, longitude, latitude):
+        """
+        由网格中心先水平、再竖直走到坐标点，每穿过一条边内外状态翻转一次，只需检查与本网格相交的边
+
+        两段路径均按半开区间判断穿越，路径经过顶点时不会重复计数
+        """
+        if self.edges is None:
+            return True
+        center_x, center_y = self.center
+        inside = self.inside
+        for x1, y1, x2, y2 in self.edges:
+            if (y1 > center_y) != (y2 > center_y):
+                x = x1 + (x2 - x1) * (center_y - y1) / (y2 - y1)
+                if (x < center_x) != (x < longitude):
+                    inside = not inside
+            if (x1 > longitude) != (x2 > longitude):
+                y = y1 + (y2 - y1) * (longitude - x1) / (x2 - x1)
+                if (y < center_y) != (y < latitude):
+                    inside = not inside
+        return inside
+
+
+class PolygonIndex(object):
+    """
+    多边形网格索引，批量判断坐标所在的多边形
+
+    按 cell_size 将平面划分为网格，每个多边形登记其覆盖的网格：完全位于多边形内部的网格直接命中，
+    与边界相交的网格只检查与该网格相交的边，查询耗时与多边形总点数基本无关。
+
+    每个多边形带有级别（如行政区划级别），同一位置被多个多边形覆盖时返回级别最大的一个
+    """
+
+    # 边界网格判定容差(度)，避免浮点误差漏判
+    EPSILON = 1e-9
+
+    def __init__(self, cell_size=0.1):
+        """
+        :param cell_size: 网格大小(度)，越小查询越快、内存占用越大
+        """
+        self.cell_size = cell_size
+        self._count = 0
+        # (列号, 行号) -> [:class:`_Cell`, ...]，按级别从大到小排列
+        self._cells = {}
+
+    def __len__(self):
+        return self._count
+
+    def _cell(self, value):
+        return int(math.floor(value / self.cell_size))
+
+    def add(self, key, polygon, level=0):
+        """
+        添加多边形
+
+        :param key: 多边形标识，如 adcode
+        :param polygon: 见 :func:`parse_polygon`
+        :param level: 级别
+        :return: 是否添加成功，无有效多边形时返回 False
+        """
+        rings = parse_polygon(polygon)
+        if not rings:
+            return False
+        size = self.cell_size
+        eps = self.EPSILON
+        # 网格行号 -> 与该行相交的边
+        rows = {}
+        # 边界网格 -> 与该网格相交的边
+        boundary = {}
+        for ring in rings:
+            x1, y1 = ring[-1]
+            for x2, y2 in ring:
+                edge = (x1, y1, x2, y2)
+                for row in six.moves.range(self._cell(min(y1, y2) - eps), self._cell(max(y1, y2) + eps) + 1):
+                    rows.setdefault(row, []).append(edge)
+                    # 边在该行内的经度范围
+                    low = min(max(min(y1, y2), row * size), max(y1, y2))
+                    high = max(min(max(y1, y2), (row + 1) * size), min(y1, y2))
+                    if y1 == y2:
+                        xs = (x1, x2)
+                    else:
+                        xs = (x1 + (x2 - x1) * (low - y1) / (y2 - y1), x1 + (x2 - x1) * (high - y1) / (y2 - y1))
+                    for col in six.moves.range(self._cell(min(xs) - eps), self._cell(max(xs) + eps) + 1):
+                        boundary.setdefault((col, row), []).append(edge)
+                x1, y1 = x2, y2
+        min_col = self._cell(min(x for ring in rings for x, _ in ring))
+        max_col = self._cell(max(x for ring in rings for x, _ in ring))
+        for row, edges in rows.items():
+            # 网格中心所在水平线与边的交点，交点左侧奇数个时中心在内部
+            center_y = (row + 0.5) * size
+            crossings = sorted(
+                x1 + (x2 - x1) * (center_y - y1) / (y2 - y1)
+                for x1, y1, x2, y2 in edges if (y1 > center_y) != (y2 > center_y)
+            )
+            for col in six.moves.range(min_col, max_col + 1):
+                center_x = (col + 0.5) * size
+                inside = bisect.bisect_left(crossings, center_x) % 2 == 1
+                edges = boundary.get((col, row))
+                if edges is not None or inside:
+                    self._insert((col, row), _Cell(key, level, (center_x, center_y), inside, edges))
+        self._count += 1
+        return True
+
+    def _insert(self, cell, item):
+        items = self._cells.setdefault(cell, [])
+        i = len(items)
+        while i > 0 and items[i - 1].level < item.level:
+            i -= 1
+        items.insert(i, item)
+
+    def _candidates(self, cell, level):
+        items = self._cells.get(cell, ())
+        if level is None:
+            return items
+        return [item for item in items if item.level == level]
+
+    def query(self, longitude, latitude, level=None):
+        """
+        查询坐标所在的多边形
+
+        :param longitude: 经度
+        :param latitude: 纬度
+        :param level: 指定级别，为 None 时返回级别最大的多边形
+        :return: 多边形标识，不在任何多边形内时返回 None
+        """
+        for item in self._candidates((self._cell(longitude), self._cell(latitude)), level):
+            if item.contains(longitude, latitude):
+                return item.key
+        return None
+
+    def query_batch(self, longitudes, latitudes=None, level=None):
+        """
+        批量查询坐标所在的多边形
+
+        坐标按网格分组，同一网格只查找一次候选多边形，完全位于多边形内部的网格整组命中
+
+        :param longitudes: 经度数组，也可以只传入 :class:`lbs.core.model.LocationArray` 或 [(经度, 纬度), ...]
+        :param latitudes: 纬度数组
+        :param level: 指定级别，为 None 时返回级别最大的多边形
+        :return: 多边形标识列表，不在任何多边形内的坐标为 None
+        """
+        if latitudes is None:
+            locations = model.LocationArray.from_locations(longitudes)
+        else:
+            locations = model.LocationArray(longitudes, latitudes)
+        longitudes, latitudes = locations.longitudes, locations.latitudes
+        np = utils.numpy
+        if np is None:
+            cols = [self._cell(x) for x in longitudes]
+            rows = [self._cell(y) for y in latitudes]
+        else:
+            longitudes = np.asarray(longitudes)
+            latitudes = np.asarray(latitudes)
+            cols = np.floor(longitudes / self.cell_size).astype(np.int64).tolist()
+            rows = np.floor(latitudes / self.cell_size).astype(np.int64).tolist()
+            longitudes = longitudes.tolist()
+            latitudes = latitudes.tolist()
+        groups = {}
+        for i, cell in enumerate(zip(cols, rows)):
+            groups.setdefault(cell, []).append(i)
+        result = [None] * len(cols)
+        for cell, indexes in six.iteritems(groups):
+            for item in self._candidates(cell, level):
+                if item.edges is None:
+                    for i in indexes:
+                        result[i] = item.key
+                    break
+                remaining = []
+                for i in indexes:
+                    if item.contains(longitudes[i], latitudes[i]):
+                        result[i] = item.key
+                    else:
+                        remaining.append(i)
+                indexes = remaining
+                if not indexes:
+                    break
+        return result
@@ -1,8 +1,11 @@
 # encoding: utf-8
 from __future__ import absolute_import, unicode_literals, division
 
+import bisect
 import math
 
+from lbs.core import utils
+
 
 class Tile(object):
     EARTH_RADIUS = 6378137
@@ -10,6 +13,19 @@ class Tile(object):
     MAX_LATITUDE = 85.05112878
     MIN_LONGITUDE = -180
     MAX_LONGITUDE = 180
+    # 8位二进制（4个四叉树层级）对应的四叉树键值
+    _QUAD_KEY_TABLE = tuple(
+        "".join(str(((i >> (j * 2)) & 1) + ((i >> (j * 2 + 1)) & 1) * 2) for j in range(3, -1, -1))
+        for i in range(256)
+    )
+    # 4位四叉树键值对应的图块序号x、y低4位
+    _QUAD_KEY_DECODE_TABLE = dict(
+        (quad_key, (
+            sum(((i >> (j * 2)) & 1) << j for j in range(4)),
+            sum(((i >> (j * 2 + 1)) & 1) << j for j in range(4)),
+        ))
+        for i, quad_key in enumerate(_QUAD_KEY_TABLE)
+    )
 
     @classmethod
     def clip(cls, n, min_value, max_value):
@@ -130,19 +146,46 @@ class Tile(object):
         :param level_of_detail: 地图级别
         :return: 四叉树键值
         """
-        quad_key = []
-        i = level_of_detail
-        while i > 0:
-            digit = 0
-            mask = 1 << (i - 1)
-            if tile_x & mask:
-                digit += 1
-            if tile_y & mask:
-                digit += 2
-            quad_key.append(str(digit))
-            i -= 1
+        return cls.quad_int_to_quad_key(cls.tile_xy_to_quad_int(tile_x, tile_y), level_of_detail)
+
+    @classmethod
+    def _part1by1(cls, n):
+        n &= 0xFFFFFFFF
+        n = (n | (n << 16)) & 0x0000FFFF0000FFFF
+        n = (n | (n << 8)) & 0x00FF00FF00FF00FF
+        n = (n | (n << 4)) & 0x0F0F0F0F0F0F0F0F
+        n = (n | (n << 2)) & 0x3333333333333333
+        n = (n | (n << 1)) & 0x5555555555555555
+        return n
+
+    @classmethod
+    def tile_xy_to_quad_int(cls, tile_x, tile_y):
+        """
+        图块序号转换为整数形式的四叉树键值（Morton 编码）
+
+        整数键值的四进制表示即为四叉树键值，需要与地图级别一起使用
+
+        :param tile_x: 图块序号x
+        :param tile_y: 图块序号y
+        :return: 整数四叉树键值
+        """
+        return cls._part1by1(tile_x) | (cls._part1by1(tile_y) << 1)
+
+    @classmethod
+    def quad_int_to_quad_key(cls, quad_int, level_of_detail):
+        """
+        整数四叉树键值转换为四叉树键值
 
-        return "".join(quad_key)
+        :param quad_int: 整数四叉树键值
+        :param level_of_detail: 地图级别
+        :return: 四叉树键值
+        """
+        if level_of_detail <= 0:
+            return ""
+        table = cls._QUAD_KEY_TABLE
+        chunks = (level_of_detail + 3) // 4
+        quad_key = "".join(table[(quad_int >> (i * 8)) & 0xFF] for i in range(chunks - 1, -1, -1))
+        return quad_key[chunks * 4 - level_of_detail:]
 
     @classmethod
     def quad_key_to_tile_xy(cls, quad_key):
@@ -152,21 +195,410 @@ class Tile(object):
         :param quad_key: 四叉树键值
         :return: 图块序号x, 图块序号y, 地图级别
         """
+        table = cls._QUAD_KEY_DECODE_TABLE
+        level_of_detail = len(quad_key)
+        # 补齐为4的倍数后每次查表解码4级
+        padding = -level_of_detail % 4
+        if padding:
+            quad_key = "0" * padding + quad_key
         tile_x = 0
         tile_y = 0
-        i, level_of_detail = len(quad_key)
-        while i > 0:
-            mask = 1 << (i - 1)
-            if quad_key[level_of_detail - i] == '0':
-                pass
-            elif quad_key[level_of_detail - i] == '1':
-                tile_x |= mask
-            elif quad_key[level_of_detail - i] == '2':
-                tile_y |= mask
-            elif quad_key[level_of_detail - i] == '3':
-                tile_x |= mask
-                tile_y |= mask
-            else:
+        for i in range(0, len(quad_key), 4):
+            try:
+                x, y = table[quad_key[i:i + 4]]
+            except KeyError:
                 raise ValueError('Invalid QuadKey digit sequence')
+            tile_x = (tile_x << 4) | x
+            tile_y = (tile_y << 4) | y
+        return tile_x, tile_y, level_of_detail
+
+    @classmethod
+    def quad_key_to_tile_xy_batch(cls, quad_keys):
+        """
+        批量四叉树键值转换为图块序号
+
+        键值长度可以不同，安装了 numpy 时返回 int64 数组（最大支持 62 级），否则返回 list
+
+        :param quad_keys: 四叉树键值数组
+        :return: 图块序号x数组, 图块序号y数组, 地图级别数组
+        """
+        np = utils.numpy
+        if np is None:
+            tile_x, tile_y, levels = list(), list(), list()
+            for quad_key in quad_keys:
+                x, y, level_of_detail = cls.quad_key_to_tile_xy(quad_key)
+                tile_x.append(x)
+                tile_y.append(y)
+                levels.append(level_of_detail)
+            return tile_x, tile_y, levels
+        try:
+            quad_keys = np.asarray(quad_keys).astype(np.bytes_)
+        except UnicodeEncodeError:
+            raise ValueError('Invalid QuadKey digit sequence')
+        count = len(quad_keys)
+        width = quad_keys.dtype.itemsize
+        tile_x = np.zeros(count, dtype=np.int64)
+        tile_y = np.zeros(count, dtype=np.int64)
+        if not count or not width:
+            return tile_x, tile_y, np.zeros(count, dtype=np.int64)
+        # 长度不足的键值右侧以 0 字节填充
+        chars = np.ascontiguousarray(quad_keys).view(np.uint8).reshape(count, width)
+        valid = chars != 0
+        digits = chars - np.uint8(ord('0'))
+        if ((digits > 3) & valid).any() or (valid[:, 1:] & ~valid[:, :-1]).any():
+            raise ValueError('Invalid QuadKey digit sequence')
+        digits = digits.astype(np.int64)
+        for i in range(width):
+            column = valid[:, i]
+            tile_x = np.where(column, (tile_x << 1) | (digits[:, i] & 1), tile_x)
+            tile_y = np.where(column, (tile_y << 1) | (digits[:, i] >> 1), tile_y)
+        return tile_x, tile_y, valid.sum(axis=1).astype(np.int64)
+
+    @classmethod
+    def lat_long_to_pixel_xy_batch(cls, latitudes, longitudes, level_of_detail):
+        """
+        批量经纬度转换为像素坐标
+
+        安装了 numpy 时使用向量化计算，返回 int64 数组，
+        由于浮点运算误差，位于像素边界上的点可能与 :meth:`lat_long_to_pixel_xy` 相差 1 像素；
+        否则逐点计算，返回 list
+
+        :param latitudes: 纬度数组
+        :param longitudes: 经度数组
+        :param level_of_detail: 地图级别
+        :return: 像素坐标x数组, 像素坐标y数组
+        """
+        latitudes = utils.to_float_array(latitudes)
+        longitudes = utils.to_float_array(longitudes)
+        if len(latitudes) != len(longitudes):
+            raise ValueError("经纬度数组长度不一致")
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(
+                lambda latitude, longitude: cls.lat_long_to_pixel_xy(latitude, longitude, level_of_detail),
+                latitudes, longitudes
+            )
+        latitudes = np.clip(latitudes, cls.MIN_LATITUDE, cls.MAX_LATITUDE)
+        longitudes = np.clip(longitudes, cls.MIN_LONGITUDE, cls.MAX_LONGITUDE)
+        x = (longitudes + 180) / 360
+        sin_latitude = np.sin(latitudes * math.pi / 180)
+        y = 0.5 - np.log((1 + sin_latitude) / (1 - sin_latitude)) / (4 * math.pi)
+        map_size = cls.map_size(level_of_detail)
+        pixel_x = np.clip(x * map_size + 0.5, 0, map_size - 1).astype(np.int64)
+        pixel_y = np.clip(y * map_size + 0.5, 0, map_size - 1).astype(np.int64)
+        return pixel_x, pixel_y
+
+    @classmethod
+    def pixel_xy_to_tile_xy_batch(cls, pixel_x, pixel_y):
+        """
+        批量像素坐标转换为图块序号
+
+        :param pixel_x: 像素坐标x数组
+        :param pixel_y: 像素坐标y数组
+        :return: 图块序号x数组, 图块序号y数组
+        """
+        np = utils.numpy
+        if np is None:
+            return cls._map_batch(cls.pixel_xy_to_tile_xy, pixel_x, pixel_y)
+        return np.asarray(pixel_x, dtype=np.int64) >> 8, np.asarray(pixel_y, dtype=np.int64) >> 8
+
+    @classmethod
+    def lat_long_to_tile_xy_batch(cls, latitudes, longitudes, level_of_detail):
+        """
+        批量经纬度转换为图块序号
+
+        :param latitudes: 纬度数组
+        :param longitudes: 经度数组
+        :param level_of_detail: 地图级别
+        :return: 图块序号x数组, 图块序号y数组
+        """
+        pixel_x, pixel_y = cls.lat_long_to_pixel_xy_batch(latitudes, longitudes, level_of_detail)
+        return cls.pixel_xy_to_tile_xy_batch(pixel_x, pixel_y)
+
+    @classmethod
+    def _part1by1_batch(cls, n):
+        np = utils.numpy
+        n = np.asarray(n, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+        for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                            (2, 0x3333333333333333), (1, 0x5555555555555555)):
+            n = (n | (n << np.uint64(shift))) & np.uint64(mask)
+        return n
+
+    @classmethod
+    def tile_xy_to_quad_int_batch(cls, tile_x, tile_y):
+        """
+        批量图块序号转换为整数四叉树键值
+
+        :param tile_x: 图块序号x数组
+        :param tile_y: 图块序号y数组
+        :return: 整数四叉树键值数组（numpy 可用时为 uint64 数组）
+        """
+        np = utils.numpy
+        if np is None:
+            return [cls.tile_xy_to_quad_int(x, y) for x, y in zip(tile_x, tile_y)]
+        return cls._part1by1_batch(tile_x) | (cls._part1by1_batch(tile_y) << np.uint64(1))
 
+    @classmethod
+    def quad_int_to_quad_key_batch(cls, quad_ints, level_of_detail):
+        """
+        批量整数四叉树键值转换为四叉树键值
+
+        :param quad_ints: 整数四叉树键值数组
+        :param level_of_detail: 地图级别
+        :return: 四叉树键值数组（numpy 可用时为字符串数组）
+        """
+        np = utils.numpy
+        if np is None:
+            return [cls.quad_int_to_quad_key(quad_int, level_of_detail) for quad_int in quad_ints]
+        quad_ints = np.asarray(quad_ints, dtype=np.uint64)
+        if level_of_detail <= 0:
+            return np.full(quad_ints.shape, "", dtype='U1')
+        shifts = np.arange(level_of_detail - 1, -1, -1, dtype=np.uint64) * np.uint64(2)
+        digits = ((quad_ints[:, None] >> shifts) & np.uint64(3)).astype(np.uint8) + np.uint8(ord('0'))
+        return np.ascontiguousarray(digits).view('S%d' % level_of_detail).ravel().astype('U%d' % level_of_detail)
+
+    @classmethod
+    def tile_xy_to_quad_key_batch(cls, tile_x, tile_y, level_of_detail):
+        """
+        批量图块序号转换为四叉树键值
+
+        :param tile_x: 图块序号x数组
+        :param tile_y: 图块序号y数组
+        :param level_of_detail: 地图级别
+        :return: 四叉树键值数组
+        """
+        return cls.quad_int_to_quad_key_batch(cls.tile_xy_to_quad_int_batch(tile_x, tile_y), level_of_detail)
+
+    @classmethod
+    def _map_batch(cls, func, xs, ys):
+        ret_x = list()
+        ret_y = list()
+        for x, y in zip(xs, ys):
+            x, y = func(x, y)
+            ret_x.append(x)
+            ret_y.append(y)
+        return ret_x, ret_y
+
+    @classmethod
+    def _lat_long_to_tile_float(cls, latitude, longitude, level_of_detail):
+        # 与 lat_long_to_pixel_xy 一致的连续图块坐标，取整即为图块序号
+        latitude = cls.clip(latitude, cls.MIN_LATITUDE, cls.MAX_LATITUDE)
+        longitude = cls.clip(longitude, cls.MIN_LONGITUDE, cls.MAX_LONGITUDE)
+        x = (longitude + 180) / 360
+        sin_latitude = math.sin(latitude * math.pi / 180)
+        y = 0.5 - math.log((1 + sin_latitude) / (1 - sin_latitude)) / (4 * math.pi)
+        map_size = cls.map_size(level_of_detail)
+        return (
+            cls.clip(x * map_size + 0.5, 0, map_size - 1) / 256,
+            cls.clip(y * map_size + 0.5, 0, map_size - 1) / 256,
+        )
+
+    @classmethod
+    def _tile_result(cls, tile_x, tile_y, level_of_detail, quad_key):
+        if quad_key:
+            return cls.tile_xy_to_quad_key(tile_x, tile_y, level_of_detail)
         return tile_x, tile_y, level_of_detail
+
+    @classmethod
+    def bbox_tiles(cls, min_latitude, min_longitude, max_latitude, max_longitude, min_level, max_level=None,
+                   quad_key=False):
+        """
+        覆盖矩形范围的图块，按级别、行依次生成，不占用额外内存
+
+        :param min_latitude: 最小纬度
+        :param min_longitude: 最小经度
+        :param max_latitude: 最大纬度
+        :param max_longitude: 最大经度
+        :param min_level: 最小地图级别
+        :param max_level: 最大地图级别，默认与 min_level 相同
+        :param quad_key: 是否生成四叉树键值
+        :return: (图块序号x, 图块序号y, 地图级别) 或四叉树键值的生成器
+        """
+        max_level = min_level if max_level is None else max_level
+        for level_of_detail in range(min_level, max_level + 1):
+            min_x, min_y = cls.pixel_xy_to_tile_xy(
+                *cls.lat_long_to_pixel_xy(max_latitude, min_longitude, level_of_detail)
+            )
+            max_x, max_y = cls.pixel_xy_to_tile_xy(
+                *cls.lat_long_to_pixel_xy(min_latitude, max_longitude, level_of_detail)
+            )
+            for tile_y in range(min_y, max_y + 1):
+                for tile_x in range(min_x, max_x + 1):
+                    yield cls._tile_result(tile_x, tile_y, level_of_detail, quad_key)
+
+    @classmethod
+    def _polygon_edges(cls, polygon, level_of_detail):
+        points = [cls._lat_long_to_tile_float(latitude, longitude, level_of_detail) for latitude, longitude in polygon]
+        if len(points) < 3:
+            raise ValueError("多边形至少需要3个顶点")
+        if points[0] != points[-1]:
+            points.append(points[0])
+        return [points[i] + points[i + 1] for i in range(len(points) - 1)]
+
+    @classmethod
+    def _crossings(cls, edges, y):
+        # 水平线 y 与各边交点的 x 坐标（半开区间规则，顶点不重复计数）
+        crossings = list()
+        for x0, y0, x1, y1 in edges:
+            if (y0 <= y < y1) or (y1 <= y < y0):
+                crossings.append(x0 + (y - y0) * (x1 - x0) / (y1 - y0))
+        crossings.sort()
+        return crossings
+
+    @classmethod
+    def polygon_tiles(cls, polygon, min_level, max_level=None, quad_key=False):
+        """
+        覆盖多边形的图块，包括与边界相交的图块及多边形内部的图块
+
+        按行扫描，每行只计算与该行相交的边，内存占用与边界长度成正比，与面积无关
+
+        :param polygon: 多边形顶点 [(纬度, 经度), ...]，首尾可以不重复
+        :param min_level: 最小地图级别
+        :param max_level: 最大地图级别，默认与 min_level 相同
+        :param quad_key: 是否生成四叉树键值
+        :return: (图块序号x, 图块序号y, 地图级别) 或四叉树键值的生成器
+        """
+        max_level = min_level if max_level is None else max_level
+        for level_of_detail in range(min_level, max_level + 1):
+            for tile in cls._polygon_level_tiles(polygon, level_of_detail, quad_key):
+                yield tile
+
+    @classmethod
+    def _polygon_level_tiles(cls, polygon, level_of_detail, quad_key):
+        max_tile = (1 << level_of_detail) - 1
+        edges = list()
+        for edge in cls._polygon_edges(polygon, level_of_detail):
+            min_y, max_y = min(edge[1], edge[3]), max(edge[1], edge[3])
+            first_row = int(math.floor(min_y))
+            last_row = min(max(first_row, int(math.ceil(max_y)) - 1), max_tile)
+            edges.append((first_row, last_row, edge))
+        edges.sort(key=lambda item: item[0])
+        active = list()
+        index = 0
+        for row in range(edges[0][0], max(item[1] for item in edges) + 1):
+            while index < len(edges) and edges[index][0] <= row:
+                active.append(edges[index])
+                index += 1
+            active = [item for item in active if item[1] >= row]
+            # 本行与边界相交的图块区间
+            spans = list()
+            for _, _, (x0, y0, x1, y1) in active:
+                if y0 == y1:
+                    xa, xb = x0, x1
+                else:
+                    ya = cls.clip(row, min(y0, y1), max(y0, y1))
+                    yb = cls.clip(row + 1, min(y0, y1), max(y0, y1))
+                    xa = x0 + (ya - y0) * (x1 - x0) / (y1 - y0)
+                    xb = x0 + (yb - y0) * (x1 - x0) / (y1 - y0)
+                left = int(math.floor(min(xa, xb)))
+                right = min(max(left, int(math.ceil(max(xa, xb))) - 1), max_tile)
+                spans.append((left, right))
+            spans.sort()
+            crossings = cls._crossings([item[2] for item in active], row + 0.5)
+            last = None
+            for left, right in spans:
+                if last is not None and left <= last + 1:
+                    if right > last:
+                        for tile_x in range(last + 1, right + 1):
+                            yield cls._tile_result(tile_x, row, level_of_detail, quad_key)
+                        last = right
+                    continue
+                # 两段边界之间的图块不与边界相交，整段位于多边形内部或外部
+                if last is not None and bisect.bisect_right(crossings, last + 1.5) % 2 == 1:
+                    for tile_x in range(last + 1, left):
+                        yield cls._tile_result(tile_x, row, level_of_detail, quad_key)
+                for tile_x in range(left, right + 1):
+                    yield cls._tile_result(tile_x, row, level_of_detail, quad_key)
+                last = right
+
+    @classmethod
+    def _segment_intersects_box(cls, edge, min_x, min_y, max_x, max_y):
+        # Liang-Barsky 线段裁剪
+        x0, y0, x1, y1 = edge
+        dx, dy = x1 - x0, y1 - y0
+        t0, t1 = 0.0, 1.0
+        for p, q in ((-dx, x0 - min_x), (dx, max_x - x0), (-dy, y0 - min_y), (dy, max_y - y0)):
+            if p == 0:
+                if q < 0:
+                    return False
+            elif p < 0:
+                t0 = max(t0, q / p)
+            else:
+                t1 = min(t1, q / p)
+            if t0 > t1:
+                return False
+        return True
+
+    @classmethod
+    def polygon_quad_keys(cls, polygon, min_level, max_level):
+        """
+        以最少的四叉树键值覆盖多边形（混合级别）
+
+        完全位于多边形内部的图块使用尽量低的级别，与边界相交的图块细分到 max_level，
+        四个子图块均被覆盖时合并为父图块。按四叉树深度优先顺序生成
+
+        :param polygon: 多边形顶点 [(纬度, 经度), ...]，首尾可以不重复
+        :param min_level: 最小地图级别
+        :param max_level: 最大地图级别
+        :return: 四叉树键值生成器
+        """
+        if max_level < min_level:
+            raise ValueError("max_level 不能小于 min_level")
+        # 统一使用 max_level 的图块坐标
+        edges = cls._polygon_edges(polygon, max_level)
+        crossings_cache = dict()
+
+        def is_inside(x, y):
+            if y not in crossings_cache:
+                crossings_cache[y] = cls._crossings(edges, y)
+            return bisect.bisect_right(crossings_cache[y], x) % 2 == 1
+
+        def classify(tile_x, tile_y, level_of_detail, parent_edges):
+            # 返回 (是否整块覆盖, 相交的边)，不相交返回 (False, None)
+            size = 1 << (max_level - level_of_detail)
+            min_x, min_y = tile_x * size, tile_y * size
+            tile_edges = [
+                edge for edge in parent_edges
+                if cls._segment_intersects_box(edge, min_x, min_y, min_x + size, min_y + size)
+            ]
+            if tile_edges:
+                return level_of_detail == max_level, tile_edges
+            if is_inside(min_x + size / 2, min_y + size / 2):
+                return True, tile_edges
+            return False, None
+
+        stack = list()
+        start_size = 1 << (max_level - min_level)
+        min_x = min(edge[0] for edge in edges) // start_size
+        max_x = max(edge[0] for edge in edges) // start_size
+        min_y = min(edge[1] for edge in edges) // start_size
+        max_y = max(edge[1] for edge in edges) // start_size
+        for tile_y in range(int(max_y), int(min_y) - 1, -1):
+            for tile_x in range(int(max_x), int(min_x) - 1, -1):
+                stack.append((tile_x, tile_y, min_level, edges))
+        while stack:
+            tile_x, tile_y, level_of_detail, parent_edges = stack.pop()
+            covered, tile_edges = classify(tile_x, tile_y, level_of_detail, parent_edges)
+            if covered:
+                yield cls.tile_xy_to_quad_key(tile_x, tile_y, level_of_detail)
+                continue
+            if tile_edges is None:
+                continue
+            children = [
+                (child_x, child_y, level_of_detail + 1)
+                for child_y in (tile_y * 2, tile_y * 2 + 1) for child_x in (tile_x * 2, tile_x * 2 + 1)
+            ]
+            if level_of_detail + 1 == max_level:
+                # 最细一级直接判断，四个子图块均被覆盖时使用父图块
+                keys = [
+                    cls.tile_xy_to_quad_key(*child) for child in children
+                    if classify(child[0], child[1], child[2], tile_edges)[0]
+                ]
+                if len(keys) == 4:
+                    yield cls.tile_xy_to_quad_key(tile_x, tile_y, level_of_detail)
+                else:
+                    for key in keys:
+                        yield key
+                continue
+            for child_x, child_y, child_level in reversed(children):
+                stack.append((child_x, child_y, child_level, tile_edges))
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
+import array
 import copy
 import hashlib
 import json
@@ -8,6 +9,12 @@ import random
 import string
 
 import six
+from six.moves.urllib.parse import urlparse, parse_qsl
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
 
 
 class ObjectDict(dict):
@@ -95,5 +102,37 @@ def byte2int(c):
     return c
 
 
+def normalize_request(url, params=None, ignored_params=('key', 'sig', 'sn', 'ak')):
+    """
+    规范化请求地址及参数，合并 url 中的查询参数并排序，忽略鉴权参数，用于生成缓存键、合并相同请求
+
+    :param url: 请求地址
+    :param params: 请求参数
+    :param ignored_params: 忽略的参数
+    """
+    parsed = urlparse(url)
+    items = parse_qsl(parsed.query, keep_blank_values=True)
+    if params:
+        items.extend(params.items())
+    items = sorted(
+        (to_text(k), to_text(v)) for k, v in items if k not in ignored_params
+    )
+    return "%s://%s%s?%s" % (parsed.scheme, parsed.netloc, parsed.path, "&".join("%s=%s" % kv for kv in items))
+
+
 def json_loads(s, object_hook=ObjectDict, **kwargs):
     return json.loads(s, object_hook=object_hook, **kwargs)
+
+
+def to_float_array(values):
+    """Convert sequence or buffer to float64 array
+
+    安装了 numpy 时返回 ``numpy.ndarray``，否则返回 ``array.array('d')``
+
+    :param values: 序列、缓冲区或数组
+    """
+    if numpy is not None:
+        return numpy.asarray(values, dtype=numpy.float64)
+    if isinstance(values, array.array) and values.typecode == 'd':
+        return values
+    return array.array('d', values)
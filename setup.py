@@ -75,6 +75,11 @@ setup(
     ],
     packages=find_packages(exclude=('tests', )),
     install_requires=requirements,
+    extras_require={
+        'numpy': ['numpy'],
+        'async': ['aiohttp>=3.3'],
+        'orjson': ['orjson'],
+    },
     zip_safe=False,
     include_package_data=True,
     tests_require=[
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import asyncio
+import json
+import unittest
+
+from lbs.client.aio import AsyncAmapClient, AsyncQQMapClient, AsyncSingleFlight
+from lbs.core.exceptions import LbsClientException
+from lbs.core.geocache import RegeoCache
+from lbs.core.retry import RetryPolicy
+
+
+class FakeResponse(object):
+
+    def __init__(self, status, body):
+        self.status = status
+        self.headers = {}
+        self.url = None
+        self.request_info = None
+        self._body = body
+
+    async def read(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class FakeSession(object):
+
+    def __init__(self, *results, **kwargs):
+        self.results = list(results)
+        self.responder = kwargs.get('responder')
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        if self.responder is not None:
+            status, result = 200, self.responder(method, url, dict(kwargs['params']))
+        else:
+            status, result = self.results.pop(0)
+        return FakeResponse(status, json.dumps(result).encode('utf-8'))
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class AsyncClientTestCase(unittest.TestCase):
+
+    def test_amap(self):
+        session = FakeSession(
+            (200, {'status': '1', 'geocodes': [{'formatted_address': '北京市'}]}),
+            (200, {'status': '0', 'info': 'INVALID_USER_KEY', 'infocode': '10001'}),
+        )
+        client = AsyncAmapClient('key', session=session)
+        result = run(client.geocode.geo(['北京']))
+        self.assertEqual('北京市', result[0].formatted_address)
+        method, url, kwargs = session.calls[0]
+        self.assertEqual('GET', method)
+        self.assertEqual('https://restapi.amap.com/v3/geocode/geo', url)
+        self.assertIn(('key', 'key'), kwargs['params'])
+        with self.assertRaises(LbsClientException) as cm:
+            run(client.geocode.geo('北京'))
+        self.assertEqual('10001', cm.exception.errcode)
+
+    def test_http_error(self):
+        client = AsyncQQMapClient('key', session=FakeSession((500, {})))
+        with self.assertRaises(LbsClientException) as cm:
+            run(client.geocoder.geocoder('北京'))
+        self.assertEqual(500, cm.exception.response.status_code)
+
+    def test_local_result(self):
+        client = AsyncQQMapClient('key', session=FakeSession(), local_convert=True)
+        result = run(client.tools.translate([(39.908, 116.397)], 5))
+        self.assertEqual(116.397, result.locations[0].lng)
+
+    def test_retry(self):
+        session = FakeSession((503, {}), (200, {'status': 0, 'message': 'ok', 'result': {'title': '北京'}}))
+        client = AsyncQQMapClient('key', session=session, retry=RetryPolicy(backoff_factor=0))
+        self.assertEqual('北京', run(client.geocoder.geocoder('北京')).title)
+        self.assertEqual(2, len(session.calls))
+
+    def test_regeo_cache(self):
+        session = FakeSession((200, {'status': '1', 'regeocode': {'formatted_address': '北京市'}}))
+        client = AsyncAmapClient('key', session=session, regeo_cache=RegeoCache())
+        self.assertEqual('北京市', run(client.geocode.regeo((116.397, 39.908))).formatted_address)
+        self.assertEqual('北京市', run(client.geocode.regeo((116.39701, 39.908))).formatted_address)
+        self.assertEqual(1, len(session.calls))
+
+    def test_bulk_geo(self):
+        def responder(method, url, params):
+            addresses = params['address'].split('|')
+            if 'bad' in addresses:
+                return {'status': '0', 'info': 'INVALID_PARAMS', 'infocode': '20000'}
+            return {'status': '1', 'geocodes': [{'formatted_address': address} for address in addresses]}
+
+        session = FakeSession(responder=responder)
+        client = AsyncAmapClient('key', session=session)
+        addresses = ['address%d' % i for i in range(25)]
+        addresses[12] = 'bad'
+
+        async def collect():
+            return [item async for item in client.geocode.bulk_geo(iter(addresses), max_workers=2)]
+
+        results = run(collect())
+        self.assertEqual(3, len(session.calls))
+        self.assertEqual(list(range(25)), [r.index for r in results])
+        self.assertEqual([10 <= i < 20 for i in range(25)], [not r.ok for r in results])
+        self.assertEqual('address24', results[24].result.formatted_address)
+        self.assertRaises(TypeError, iter, client.geocode.bulk_geo(addresses))
+
+    def test_distance(self):
+        def responder(method, url, params):
+            origins = params['origins'].split('|')
+            return {'status': '1', 'results': [
+                {'origin_id': str(i + 1), 'dest_id': '1', 'distance': origin.split(',')[0], 'duration': '0'}
+                for i, origin in enumerate(origins)
+            ]}
+
+        session = FakeSession(responder=responder)
+        client = AsyncAmapClient('key', session=session)
+        origins = [(i, 39.9) for i in range(250)]
+        results = run(client.direction.distance(origins, (116.4, 39.9)))
+        self.assertEqual(3, len(session.calls))
+        self.assertEqual([str(i + 1) for i in range(250)], [result.origin_id for result in results])
+        self.assertEqual([str(i) for i in range(250)], [result.distance for result in results])
+        results = run(client.direction.distance(origins[:2], (116.4, 39.9)))
+        self.assertEqual(['1', '2'], [result.origin_id for result in results])
+
+    def test_bulk_distance_matrix(self):
+        def responder(method, url, params):
+            froms, tos = params['from'].split(';'), params['to'].split(';')
+            if froms[0] == '2,0':
+                return {'status': 121, 'message': '此key每日调用量已达到上限'}
+            return {'status': 0, 'message': 'query ok', 'result': {'rows': [
+                {'elements': [{'distance': int(f.split(',')[0]) * 10 + int(t.split(',')[0])} for t in tos]}
+                for f in froms
+            ]}}
+
+        session = FakeSession(responder=responder)
+        client = AsyncQQMapClient('key', session=session)
+        matrix = run(client.tools.bulk_distance_matrix(
+            [(i, 0) for i in range(4)], [(j, 1) for j in range(3)], block_size=(2, 2), max_workers=2
+        ))
+        self.assertEqual(4, len(session.calls))
+        self.assertEqual((4, 3), (matrix.rows, matrix.cols))
+        self.assertEqual([(2, 4, 0, 2), (2, 4, 2, 3)], [error[:4] for error in matrix.errors])
+        self.assertEqual(12, matrix.distance(1, 2))
+
+    def test_single_flight(self):
+        session = FakeSession(
+            (200, {'status': '1', 'geocodes': [{'formatted_address': '北京市'}]}),
+            (200, {'status': '1', 'geocodes': [{'formatted_address': '北京市'}]}),
+        )
+        client = AsyncAmapClient('key', session=session, single_flight=True)
+
+        async def gather():
+            return await asyncio.gather(*[client.geocode.geo(['北京']) for _ in range(5)])
+
+        results = run(gather())
+        self.assertEqual(['北京市'] * 5, [result[0].formatted_address for result in results])
+        self.assertEqual(1, len(session.calls))
+        self.assertEqual(4, client.single_flight.shared)
+        self.assertEqual(0, len(client.single_flight))
+        run(client.geocode.geo(['北京']))
+        self.assertEqual(2, len(session.calls))
+
+    def test_single_flight_late_joiner(self):
+        flight = AsyncSingleFlight()
+
+        async def main():
+            loop = asyncio.get_event_loop()
+            future, gate = loop.create_future(), loop.create_future()
+
+            async def leader():
+                return await future
+
+            async def func():
+                return {'a': 2}
+
+            async def late():
+                loop.call_soon(resolve)
+                await gate
+                # 共享调用已完成但尚未移除
+                return await flight.do('k', func)
+
+            def resolve():
+                future.set_result({'a': 1})
+                gate.set_result(None)
+
+            return await asyncio.gather(flight.do('k', leader), late())
+
+        self.assertEqual([{'a': 1}, {'a': 2}], run(main()))
+        self.assertEqual(0, len(flight))
+        self.assertEqual(0, flight.shared)
+
+    def test_paginator(self):
+        session = FakeSession(
+            (200, {'status': '1', 'count': '3', 'pois': [{'id': '1'}, {'id': '2'}]}),
+            (200, {'status': '1', 'count': '3', 'pois': [{'id': '2'}, {'id': '3'}]}),
+        )
+        client = AsyncAmapClient('key', session=session)
+
+        async def collect():
+            ids = []
+            async for poi in client.search.iter_text(keywords='kfc', offset=2):
+                ids.append(poi.id)
+            return ids
+
+        self.assertEqual(['1', '2', '3'], run(collect()))
+        self.assertEqual(2, len(session.calls))
+        self.assertRaises(TypeError, iter, client.search.iter_text(keywords='kfc'))
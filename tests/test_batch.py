@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+from lbs.core.batch import chunked, imap_chunks, imap_items
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_chunked(self):
+        self.assertEqual([[0, 1], [2, 3], [4]], list(chunked(range(5), 2)))
+        self.assertRaises(ValueError, list, chunked(range(5), 0))
+
+    def test_imap_chunks(self):
+        def func(chunk):
+            if chunk[0] == 2:
+                raise ValueError('error')
+            if chunk[0] == 4:
+                # 无法转换为列表的返回值
+                return 1
+            if chunk[0] == 6:
+                return chunk[:1]
+            return [item * 10 for item in chunk]
+
+        results = list(imap_chunks(func, range(9), 2, max_workers=2))
+        self.assertEqual(list(range(9)), [r.index for r in results])
+        self.assertEqual([0, 10, None, None, None, None, 6, None, 80], [r.result for r in results])
+        self.assertEqual([True, True, False, False, False, False, True, False, True], [r.ok for r in results])
+        self.assertIsInstance(results[2].error, ValueError)
+        self.assertIsInstance(results[4].error, TypeError)
+
+    def test_imap_items(self):
+        def func(item):
+            if item == 3:
+                raise ValueError('error')
+            return item * 10
+
+        results = list(imap_items(func, iter(range(5)), max_workers=2))
+        self.assertEqual([0, 10, 20, None, 40], [r.result for r in results])
+        self.assertEqual([3], [r.item for r in results if not r.ok])
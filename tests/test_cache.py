@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from lbs.core.cache import MemoryCache, SqliteCache
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def test_make_key(self):
+        cache = MemoryCache(endpoint_ttls={'/v3/ip': 0, '/v3/config/district': 86400})
+        key1, ttl = cache.make_key('GET', 'https://restapi.amap.com/v3/geocode/geo', {
+            'address': '北京', 'city': 10, 'key': 'k1', 'sig': 'xxx'
+        })
+        key2, _ = cache.make_key('GET', 'https://restapi.amap.com/v3/geocode/geo?city=10', {
+            'key': 'k2', 'address': '北京'
+        })
+        self.assertEqual(key1, key2)
+        self.assertEqual(300, ttl)
+        self.assertEqual(86400, cache.make_key('GET', 'https://restapi.amap.com/v3/config/district')[1])
+        self.assertEqual((None, None), cache.make_key('GET', 'https://restapi.amap.com/v3/ip', {'ip': '1.1.1.1'}))
+        self.assertEqual((None, None), cache.make_key('POST', 'https://restapi.amap.com/v3/geocode/geo'))
+
+    def test_memory_cache(self):
+        cache = MemoryCache(maxsize=2)
+        cache.set('a', {'v': 1}, 100)
+        cache.set('b', {'v': 2}, 100)
+        self.assertEqual(1, cache.get('a').v)
+        cache.set('c', {'v': 3}, 100)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(2, len(cache))
+        cache.set('d', {'v': 4}, -1)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual({'hits': 1, 'misses': 2, 'hit_rate': 1 / 3.0}, cache.stats())
+
+    def test_sqlite_cache(self):
+        path = tempfile.mkdtemp()
+        try:
+            cache = SqliteCache(os.path.join(path, 'cache.db'), maxsize=10)
+            cache.EVICT_INTERVAL = 1
+            for i in range(20):
+                cache.set('key%d' % i, {'v': i}, 100)
+                time.sleep(0.001)
+            self.assertEqual(10, len(cache))
+            self.assertIsNone(cache.get('key0'))
+            self.assertEqual(19, cache.get('key19').v)
+            cache.close()
+            cache = SqliteCache(os.path.join(path, 'cache.db'))
+            self.assertEqual(19, cache.get('key19').v)
+            cache.clear()
+            self.assertEqual(0, len(cache))
+            cache.close()
+        finally:
+            shutil.rmtree(path)
@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import json
+import math
+import threading
+import time
+import unittest
+
+import requests
+
+from lbs import AmapClient, QQMapClient
+from lbs.core.cache import MemoryCache
+from lbs.core.coord_convert import CoordConvert
+from lbs.core.decoder import LazyObjectDict
+from lbs.core.exceptions import LbsClientException
+from lbs.core.geocache import RegeoCache
+from lbs.core.ratelimit import RateLimiter
+from lbs.core.retry import RetryPolicy
+from lbs.core.utils import ObjectDict
+
+
+class FakeSession(object):
+
+    def __init__(self, *results, **kwargs):
+        self.results = list(results)
+        self.responder = kwargs.get('responder')
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        if self.responder is not None:
+            result = self.responder(method, url, **kwargs)
+        else:
+            result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res._content = json.dumps(result).encode('utf-8')
+        return res
+
+
+class LocalConvertTestCase(unittest.TestCase):
+
+    def test_amap_convert(self):
+        client = AmapClient('key', local_convert=True)
+        client._http = FakeSession({'status': '1', 'locations': '116.1,39.1'})
+        longitude, latitude = CoordConvert.wgs84_to_gcj02(116.397, 39.908)
+        self.assertEqual(
+            ["%s,%s" % (longitude, latitude)] * 50,
+            client.tools.convert([(116.397, 39.908)] * 50, coordsys='gps')
+        )
+        self.assertEqual(["116.397,39.908"], client.tools.convert([(116.397, 39.908)]))
+        self.assertEqual([], client._http.calls)
+        self.assertEqual(["116.1,39.1"], client.tools.convert([(116.397, 39.908)], coordsys='mapbar'))
+        self.assertEqual(1, len(client._http.calls))
+
+    def test_qq_translate(self):
+        client = QQMapClient('key', local_convert=True)
+        client._http = FakeSession({'status': 0, 'message': 'query ok', 'locations': []})
+        longitude, latitude = CoordConvert.bd09_to_gcj02(116.397, 39.908)
+        result = client.tools.translate([(39.908, 116.397), (39.908, 116.397)], 3)
+        self.assertEqual(0, result.status)
+        self.assertEqual(2, len(result.locations))
+        self.assertEqual(longitude, result.locations[0].lng)
+        self.assertEqual(latitude, result.locations[0].lat)
+        self.assertEqual([], client._http.calls)
+        client.tools.translate([(39.908, 116.397)], 4)
+        self.assertEqual(1, len(client._http.calls))
+
+    def test_qq_translate_decoder(self):
+        for mode, cls in (('dict', dict), ('object', ObjectDict), ('lazy', LazyObjectDict)):
+            client = QQMapClient('key', local_convert=True, decoder=mode)
+            client._http = FakeSession({'status': 0, 'message': 'query ok', 'locations': [{'lat': 1, 'lng': 2}]})
+            local = client.tools.translate([(39.908, 116.397)], 5)
+            remote = client.tools.translate([(39.908, 116.397)], 4)
+            self.assertIs(cls, type(local))
+            self.assertIs(type(remote), type(local))
+            self.assertIs(type(remote['locations'][0]), type(local['locations'][0]))
+            self.assertEqual(116.397, local['locations'][0]['lng'])
+
+
+class BulkGeocodeTestCase(unittest.TestCase):
+
+    def test_bulk_geo(self):
+        def responder(method, url, params, **kwargs):
+            addresses = params['address'].split('|')
+            if 'bad' in addresses:
+                return {'status': '0', 'info': 'INVALID_PARAMS', 'infocode': '20000'}
+            return {'status': '1', 'geocodes': [{'formatted_address': address} for address in addresses]}
+
+        client = AmapClient('key')
+        client._http = FakeSession(responder=responder)
+        addresses = ['address%d' % i for i in range(35)]
+        addresses[12] = 'bad'
+        results = list(client.geocode.bulk_geo(iter(addresses), max_workers=3))
+        self.assertEqual(4, len(client._http.calls))
+        self.assertEqual(list(range(35)), [r.index for r in results])
+        for i, r in enumerate(results):
+            self.assertEqual(addresses[i], r.item)
+            if 10 <= i < 20:
+                self.assertFalse(r.ok)
+                self.assertEqual('20000', r.error.errcode)
+            else:
+                self.assertTrue(r.ok)
+                self.assertEqual(addresses[i], r.result.formatted_address)
+
+    def test_bulk_regeo(self):
+        def responder(method, url, params, **kwargs):
+            locations = params['location'].split('|')
+            return {'status': '1', 'regeocodes': [{'location': location} for location in locations]}
+
+        client = AmapClient('key')
+        client._http = FakeSession(responder=responder)
+        locations = [(116 + i / 100.0, 39) for i in range(45)]
+        results = list(client.geocode.bulk_regeo(locations))
+        self.assertEqual(3, len(client._http.calls))
+        self.assertEqual(["%s,%s" % location for location in locations], [r.result.location for r in results])
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def test_cache(self):
+        client = AmapClient('key', sig_key='sig', cache=MemoryCache())
+        client._http = FakeSession(
+            {'status': '0', 'info': 'INVALID_PARAMS', 'infocode': '20000'},
+            {'status': '1', 'pois': [{'id': '1'}]},
+        )
+        self.assertRaises(LbsClientException, client.search.detail, '1')
+        self.assertEqual('1', client.search.detail('1').pois[0].id)
+        self.assertEqual('1', client.search.detail('1').pois[0].id)
+        self.assertEqual(2, len(client._http.calls))
+        self.assertEqual(1, client.cache.hits)
+
+    def test_qq_district(self):
+        client = QQMapClient('key', cache=MemoryCache())
+        client._http = FakeSession(
+            {'status': 0, 'message': 'query ok', 'result': [[{'id': '110000', 'fullname': '北京市'}]]},
+            {'status': 0, 'message': 'query ok', 'result': [[{'id': '110101', 'fullname': '东城区'}]]},
+        )
+        self.assertEqual('北京市', client.tools.district_list()[0][0].fullname)
+        self.assertEqual('北京市', client.tools.district_list()[0][0].fullname)
+        self.assertEqual('东城区', client.tools.district_getchildren('110000')[0][0].fullname)
+        self.assertEqual('东城区', client.tools.district_getchildren('110000')[0][0].fullname)
+        self.assertEqual(2, len(client._http.calls))
+        self.assertEqual(2, client.cache.hits)
+
+
+class SessionTestCase(unittest.TestCase):
+
+    def test_session_per_thread(self):
+        client = AmapClient('key', pool_maxsize=50, keep_alive=False)
+        other = AmapClient('key')
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(client._http))
+        thread.start()
+        thread.join()
+        self.assertIs(client._http, client._http)
+        self.assertIsNot(client._http, sessions[0])
+        self.assertIsNot(client._http, other._http)
+        self.assertIs(client._http.get_adapter('https://restapi.amap.com/'),
+                      sessions[0].get_adapter('https://restapi.amap.com/'))
+        self.assertEqual(50, client._http.get_adapter('https://restapi.amap.com/')._pool_maxsize)
+        self.assertEqual('close', client._http.headers['Connection'])
+        client.close()
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(endpoint_limits={'/v3/place/detail': {'daily_quota': 1}})
+        client = AmapClient('key', rate_limiter=limiter, cache=MemoryCache())
+        client._http = FakeSession({'status': '1', 'pois': []})
+        client.search.detail('1')
+        client.search.detail('1')
+        self.assertEqual(1, limiter.daily_usage('/v3/place/detail'))
+        self.assertRaises(LbsClientException, client.search.detail, '2')
+
+
+class RetryTestCase(unittest.TestCase):
+
+    def test_retry(self):
+        policy = RetryPolicy(backoff_factor=0)
+        client = AmapClient('key', retry=policy)
+        client._http = FakeSession(
+            requests.ConnectionError(),
+            {'status': '0', 'info': 'CUQPS_HAS_EXCEEDED_THE_LIMIT', 'infocode': '10021'},
+            {'status': '1', 'pois': [{'id': '1'}]},
+            {'status': '0', 'info': 'INVALID_USER_KEY', 'infocode': '10001'},
+        )
+        self.assertEqual('1', client.search.detail('1').pois[0].id)
+        self.assertRaises(LbsClientException, client.search.detail, '1')
+        self.assertEqual(4, len(client._http.calls))
+        self.assertEqual({'retries': 2, 'giveups': 0}, policy.stats())
+
+    def test_retry_giveup(self):
+        client = QQMapClient('key', retry=RetryPolicy(max_retries=1, backoff_factor=0))
+        client._http = FakeSession(requests.ConnectionError(), requests.ConnectionError())
+        self.assertRaises(requests.ConnectionError, client.geocoder.geocoder, '北京')
+        self.assertEqual(2, len(client._http.calls))
+
+
+class KeyPoolTestCase(unittest.TestCase):
+
+    def test_key_rotation(self):
+        client = AmapClient([('k1', 's1'), ('k2', 's2')])
+        client._http = FakeSession(
+            {'status': '0', 'info': 'USER_DAILY_QUERY_OVER_LIMIT', 'infocode': '10044'},
+            {'status': '1', 'pois': [{'id': '1'}]},
+            {'status': '1', 'pois': [{'id': '2'}]},
+        )
+        self.assertEqual('1', client.search.detail('1').pois[0].id)
+        self.assertEqual('2', client.search.detail('2').pois[0].id)
+        keys = [kwargs['params']['key'] for _, _, kwargs in client._http.calls]
+        self.assertEqual(['k1', 'k2', 'k2'], keys)
+        params = client._http.calls[1][2]['params']
+        self.assertEqual(client._get_sig(dict((k, v) for k, v in params.items() if k != 'sig'), 's2'), params['sig'])
+        self.assertEqual(['k2'], client.key_pool.available_keys())
+        self.assertEqual(0, client.key_pool.stats()['k2']['in_flight'])
+
+    def test_all_keys_exhausted(self):
+        client = QQMapClient(['k1', 'k2'])
+        client._http = FakeSession(
+            {'status': 121, 'message': '此key每日调用量已达到上限'},
+            {'status': 121, 'message': '此key每日调用量已达到上限'},
+        )
+        with self.assertRaises(LbsClientException) as cm:
+            client.geocoder.geocoder('北京')
+        self.assertEqual('NO_AVAILABLE_KEY', cm.exception.errcode)
+
+
+class PolylineTestCase(unittest.TestCase):
+
+    def test_qq_decode_polyline(self):
+        route = {'status': 0, 'message': 'query ok', 'result': {'routes': [{'polyline': [39.9, 116.3, 1000, -1000]}]}}
+        client = QQMapClient('key')
+        client._http = FakeSession(route, route)
+        result = client.direction.driving((39.9, 116.3), (39.901, 116.299), decode_polyline=True)
+        polyline = result.routes[0].polyline
+        self.assertEqual(2, len(polyline))
+        self.assertAlmostEqual(116.299, polyline[1].longitude, delta=1e-9)
+        self.assertAlmostEqual(39.901, polyline[1].latitude, delta=1e-9)
+        result = client.direction.walking((39.9, 116.3), (39.901, 116.299))
+        self.assertEqual([39.9, 116.3, 1000, -1000], result.routes[0].polyline)
+
+    def test_amap_decode_polyline(self):
+        route = {'status': '1', 'route': {'paths': [{'steps': [
+            {'polyline': "116.1,39.1;116.2,39.2"}, {'polyline': "116.2,39.2;116.3,39.3"}
+        ]}]}}
+        client = AmapClient('key')
+        client._http = FakeSession(route, route)
+        result = client.direction.driving((116.1, 39.1), (116.3, 39.3), decode_polyline=True, simplify_tolerance=1)
+        self.assertEqual([0, 2, 4], result.route.paths[0].geometry.offsets)
+        self.assertEqual([(116.1, 39.1), (116.2, 39.2)], result.route.paths[0].steps[0].polyline.to_pairs())
+        result = client.direction.driving((116.1, 39.1), (116.3, 39.3))
+        self.assertEqual("116.1,39.1;116.2,39.2", result.route.paths[0].steps[0].polyline)
+
+
+class AmapDirectionTestCase(unittest.TestCase):
+
+    @staticmethod
+    def _distance_responder(method, url, **kwargs):
+        origins = kwargs['params']['origins'].split('|')
+        return {'status': '1', 'results': [
+            {'origin_id': str(i + 1), 'dest_id': '1', 'distance': origin.split(',')[0], 'duration': '0'}
+            for i, origin in enumerate(origins)
+        ]}
+
+    def test_distance(self):
+        client = AmapClient('key')
+        client._http = FakeSession(responder=self._distance_responder)
+        origins = [(i, 39.9) for i in range(250)]
+        results = client.direction.distance(origins, (116.4, 39.9))
+        self.assertEqual(3, len(client._http.calls))
+        self.assertEqual([str(i + 1) for i in range(250)], [result.origin_id for result in results])
+        self.assertEqual([str(i) for i in range(250)], [result.distance for result in results])
+        results = client.direction.distance(origins[:2], (116.4, 39.9), _type=0)
+        self.assertEqual(['1', '2'], [result.origin_id for result in results])
+        self.assertEqual(0, client._http.calls[-1][2]['params']['type'])
+        self.assertRaises(ValueError, client.direction.distance, [], (116.4, 39.9))
+
+    def test_distance_error(self):
+        def responder(method, url, **kwargs):
+            if kwargs['params']['origins'].startswith('100,'):
+                return {'status': '0', 'info': 'SERVICE_NOT_AVAILABLE', 'infocode': '10012'}
+            return self._distance_responder(method, url, **kwargs)
+
+        client = AmapClient('key')
+        client._http = FakeSession(responder=responder)
+        with self.assertRaises(LbsClientException) as cm:
+            client.direction.distance([(i, 39.9) for i in range(250)], (116.4, 39.9))
+        self.assertEqual('10012', cm.exception.errcode)
+
+    def test_v4(self):
+        client = AmapClient('key')
+        client._http = FakeSession(
+            {'errcode': 0, 'errmsg': 'OK', 'data': {'paths': [{'steps': [{'polyline': "116.1,39.1;116.2,39.2"}]}]}},
+            {'errcode': 30001, 'errmsg': 'ENGINE_RESPONSE_DATA_ERROR', 'data': {}},
+        )
+        result = client.direction.bicycling((116.1, 39.1), (116.2, 39.2), decode_polyline=True)
+        self.assertEqual(2, len(result.data.paths[0].geometry.locations))
+        self.assertEqual('/v4/direction/bicycling', client._http.calls[0][1][-len('/v4/direction/bicycling'):])
+        with self.assertRaises(LbsClientException) as cm:
+            client.direction.truck((116.1, 39.1), (116.2, 39.2), size=2)
+        self.assertEqual(30001, cm.exception.errcode)
+
+    def test_walking(self):
+        client = AmapClient('key')
+        client._http = FakeSession({'status': '1', 'route': {'paths': []}})
+        self.assertEqual([], client.direction.walking((116.1, 39.1), (116.2, 39.2)).route.paths)
+
+
+class QQDistanceMatrixTestCase(unittest.TestCase):
+
+    @staticmethod
+    def _responder(method, url, **kwargs):
+        froms = kwargs['params']['from'].split(';')
+        tos = kwargs['params']['to'].split(';')
+        if froms[0] == '4,0':
+            return {'status': 121, 'message': '此key每日调用量已达到上限'}
+        return {'status': 0, 'message': 'query ok', 'result': {'rows': [
+            {'elements': [
+                {'distance': int(f.split(',')[0]) * 1000 + int(t.split(',')[0]), 'duration': 1} for t in tos
+            ]} for f in froms
+        ]}}
+
+    def test_bulk_distance_matrix(self):
+        client = QQMapClient('key')
+        client._http = FakeSession(responder=self._responder)
+        froms = [(i, 0) for i in range(10)]
+        tos = [(j, 1) for j in range(23)]
+        matrix = client.tools.bulk_distance_matrix(froms, tos, block_size=(4, 10))
+        self.assertEqual(9, len(client._http.calls))
+        self.assertEqual((10, 23), (matrix.rows, matrix.cols))
+        self.assertFalse(matrix.ok)
+        self.assertEqual([(4, 8, 0, 10), (4, 8, 10, 20), (4, 8, 20, 23)], [error[:4] for error in matrix.errors])
+        self.assertEqual(121, matrix.errors[0][4].errcode)
+        for i in range(len(froms)):
+            for j in range(len(tos)):
+                if 4 <= i < 8:
+                    self.assertTrue(math.isnan(matrix.distance(i, j)))
+                else:
+                    self.assertEqual(i * 1000 + j, matrix.distance(i, j))
+                    self.assertEqual(1, matrix.duration(i, j))
+
+    def test_joined_locations(self):
+        client = QQMapClient('key')
+        client._http = FakeSession(responder=self._responder)
+        matrix = client.tools.bulk_distance_matrix('0,0;1,0;2,0', '5,1;6,1', block_size=(2, 1))
+        self.assertEqual((3, 2), (matrix.rows, matrix.cols))
+        self.assertEqual(4, len(client._http.calls))
+        self.assertTrue(matrix.ok)
+        self.assertEqual(2006, matrix.distance(2, 1))
+
+
+class RegeoCacheTestCase(unittest.TestCase):
+
+    def test_amap_regeo(self):
+        client = AmapClient('key', regeo_cache=RegeoCache(tolerance=30))
+        client._http = FakeSession(responder=lambda method, url, **kwargs: {
+            'status': '1', 'regeocode': {'formatted_address': kwargs['params']['location']}, 'regeocodes': []
+        })
+        self.assertEqual('116.397,39.908', client.geocode.regeo((116.397, 39.908)).formatted_address)
+        self.assertEqual('116.397,39.908', client.geocode.regeo('116.39701,39.90801').formatted_address)
+        self.assertEqual(1, len(client._http.calls))
+        client.geocode.regeo((116.397, 39.908), extensions='all')
+        client.geocode.regeo((116.4, 39.908))
+        client.geocode.regeo([(116.397, 39.908), (116.4, 39.908)])
+        self.assertEqual(4, len(client._http.calls))
+        self.assertEqual(1, client.regeo_cache.stats()['hits'])
+
+    def test_qq_regeocoder(self):
+        client = QQMapClient('key', regeo_cache=RegeoCache(tolerance=30))
+        client._http = FakeSession(responder=lambda method, url, **kwargs: {
+            'status': 0, 'message': 'query ok', 'result': {'address': kwargs['params']['location']}
+        })
+        self.assertEqual('39.908,116.397', client.geocoder.regeocoder((39.908, 116.397)).address)
+        self.assertEqual('39.908,116.397', client.geocoder.regeocoder((39.90801, 116.39701)).address)
+        self.assertEqual(1, len(client._http.calls))
+        self.assertEqual('39.908,116.4', client.geocoder.regeocoder((39.908, 116.4)).address)
+        self.assertEqual(2, len(client._http.calls))
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def test_single_flight(self):
+        client = AmapClient('key', single_flight=True)
+
+        def responder(method, url, **kwargs):
+            deadline = time.time() + 5
+            while client.single_flight.shared < 4 and time.time() < deadline:
+                time.sleep(0.001)
+            return {'status': '1', 'geocodes': [{'formatted_address': kwargs['params']['address']}]}
+
+        client._http = FakeSession(responder=responder)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.geocode.geo(['北京']))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(client._http.calls))
+        self.assertEqual(['北京'] * 5, [result[0].formatted_address for result in results])
+        # 参数不同时不合并
+        client.geocode.geo(['上海'])
+        client.geocode.geo(['北京'], city='010')
+        self.assertEqual(3, len(client._http.calls))
+
+    def test_disabled(self):
+        client = QQMapClient('key')
+        self.assertIsNone(client.single_flight)
+        self.assertIsNone(client._single_flight_key('GET', '/ws/geocoder/v1/', {}))
+        client = QQMapClient('key', single_flight=True)
+        self.assertIsNone(client._single_flight_key('POST', '/ws/geocoder/v1/', {}))
+        self.assertEqual(
+            client._single_flight_key('GET', '/ws/geocoder/v1/', {'params': {'b': 1, 'a': 2}}),
+            client._single_flight_key('GET', 'https://apis.map.qq.com/ws/geocoder/v1/?a=2', {'params': {'b': 1}})
+        )
+
+
+class PaginatorTestCase(unittest.TestCase):
+
+    def test_amap_iter_text(self):
+        def responder(method, url, **kwargs):
+            page = kwargs['params']['page']
+            return {'status': '1', 'count': '3', 'pois': [{'id': str(page)}, {'id': str(page + 1)}]}
+
+        client = AmapClient('key')
+        client._http = FakeSession(responder=responder)
+        self.assertEqual(['1', '2', '3'], [poi.id for poi in client.search.iter_text(keywords='kfc', offset=2)])
+        self.assertEqual(2, len(client._http.calls))
+        self.assertEqual('kfc', client._http.calls[0][2]['params']['keywords'])
+
+    def test_qq_iter_search(self):
+        def responder(method, url, **kwargs):
+            page = kwargs['params']['page_index']
+            return {'status': 0, 'message': 'query ok', 'count': 30, 'data': [{'id': str(page)}] if page < 3 else []}
+
+        client = QQMapClient('key')
+        client._http = FakeSession(responder=responder)
+        boundary = client.search.gen_region_boundary('北京')
+        self.assertEqual(['1', '2'], [poi.id for poi in client.search.iter_search('kfc', boundary, page_size=1)])
+        self.assertEqual(3, len(client._http.calls))
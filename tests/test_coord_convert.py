@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import array
+import random
+import unittest
+
+from lbs.core import utils
+from lbs.core.coord_convert import CoordConvert
+from lbs.core.model import LocationArray
+
+
+class CoordConvertTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.longitudes = [rand.uniform(60, 150) for _ in range(500)]
+        self.latitudes = [rand.uniform(-5, 60) for _ in range(500)]
+
+    def assertBatchEqual(self, name, longitudes, latitudes, delta=0):
+        func = getattr(CoordConvert, name)
+        ret_longitudes, ret_latitudes = getattr(CoordConvert, name + '_batch')(longitudes, latitudes)
+        self.assertEqual(len(longitudes), len(ret_longitudes))
+        for i, (longitude, latitude) in enumerate(zip(longitudes, latitudes)):
+            expected_longitude, expected_latitude = func(longitude, latitude)
+            self.assertAlmostEqual(expected_longitude, ret_longitudes[i], delta=delta)
+            self.assertAlmostEqual(expected_latitude, ret_latitudes[i], delta=delta)
+
+    def test_in_china(self):
+        self.assertTrue(CoordConvert.in_china(116.397, 39.908))
+        self.assertFalse(CoordConvert.in_china(-0.1276, 51.5072))
+        self.assertEqual(
+            CoordConvert.wgs84_to_gcj02(-0.1276, 51.5072),
+            (-0.1276, 51.5072)
+        )
+        self.assertNotEqual(
+            CoordConvert.wgs84_to_gcj02(116.397, 39.908),
+            (116.397, 39.908)
+        )
+
+    def test_batch(self):
+        for name in ('wgs84_to_gcj02', 'gcj02_to_bd09', 'bd09_to_gcj02', 'wgs84_to_bd09'):
+            self.assertBatchEqual(name, self.longitudes, self.latitudes, delta=CoordConvert.BATCH_TOLERANCE)
+
+    def test_batch_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            for name in ('wgs84_to_gcj02', 'gcj02_to_bd09', 'bd09_to_gcj02', 'wgs84_to_bd09'):
+                self.assertBatchEqual(name, array.array('d', self.longitudes), self.latitudes)
+            mask = CoordConvert.in_china_batch(self.longitudes, self.latitudes)
+        finally:
+            utils.numpy = origin
+        self.assertEqual([CoordConvert.in_china(*x) for x in zip(self.longitudes, self.latitudes)], list(mask))
+
+    def test_inverse(self):
+        for longitude, latitude in zip(self.longitudes, self.latitudes):
+            gcj_longitude, gcj_latitude = CoordConvert.wgs84_to_gcj02(longitude, latitude)
+            ret = CoordConvert.gcj02_to_wgs84(gcj_longitude, gcj_latitude)
+            self.assertAlmostEqual(longitude, ret[0], delta=1e-8)
+            self.assertAlmostEqual(latitude, ret[1], delta=1e-8)
+            bd_longitude, bd_latitude = CoordConvert.wgs84_to_bd09(longitude, latitude)
+            ret = CoordConvert.bd09_to_wgs84(bd_longitude, bd_latitude)
+            self.assertAlmostEqual(longitude, ret[0], delta=1e-5)
+            self.assertAlmostEqual(latitude, ret[1], delta=1e-5)
+
+    def test_inverse_max_iterations(self):
+        gcj_longitude, gcj_latitude = CoordConvert.wgs84_to_gcj02(116.397, 39.908)
+        self.assertEqual((gcj_longitude, gcj_latitude), CoordConvert.gcj02_to_wgs84(
+            gcj_longitude, gcj_latitude, max_iterations=0
+        ))
+
+    def test_inverse_batch(self):
+        for name in ('gcj02_to_wgs84', 'bd09_to_wgs84'):
+            self.assertBatchEqual(name, self.longitudes, self.latitudes, delta=CoordConvert.BATCH_TOLERANCE)
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            for name in ('gcj02_to_wgs84', 'bd09_to_wgs84'):
+                self.assertBatchEqual(name, self.longitudes, self.latitudes)
+        finally:
+            utils.numpy = origin
+
+    def test_batch_length_mismatch(self):
+        self.assertRaises(ValueError, CoordConvert.wgs84_to_gcj02_batch, [1, 2], [1])
+
+    def test_location_array(self):
+        locations = LocationArray(self.longitudes, self.latitudes)
+        for name in ('wgs84_to_gcj02', 'gcj02_to_wgs84', 'bd09_to_wgs84'):
+            ret = getattr(CoordConvert, name + '_batch')(locations)
+            self.assertIsInstance(ret, LocationArray)
+            expected = getattr(CoordConvert, name + '_batch')(self.longitudes, self.latitudes)
+            self.assertEqual(list(expected[0]), list(ret.longitudes))
+            self.assertEqual(list(expected[1]), list(ret.latitudes))
+        self.assertEqual(
+            list(CoordConvert.in_china_batch(self.longitudes, self.latitudes)),
+            list(CoordConvert.in_china_batch(locations))
+        )
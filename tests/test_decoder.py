@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import copy
+import json
+import unittest
+
+import requests
+
+from lbs import AmapClient
+from lbs.core.cache import MemoryCache
+from lbs.core.decoder import JsonDecoder, LazyList, LazyObjectDict
+from lbs.core.utils import ObjectDict
+
+CONTENT = json.dumps({
+    'status': '1', 'districts': [{'adcode': '440100', 'name': '广州市', 'districts': [{'adcode': '440103'}]}]
+}, ensure_ascii=False).encode('utf-8')
+
+
+class JsonDecoderTestCase(unittest.TestCase):
+
+    def test_modes(self):
+        for use_orjson in (True, False):
+            result = JsonDecoder('dict', use_orjson=use_orjson).loads(CONTENT)
+            self.assertIs(dict, type(result))
+            self.assertIs(dict, type(result['districts'][0]))
+            self.assertEqual(json.loads(CONTENT.decode('utf-8')), result)
+
+            result = JsonDecoder('object', use_orjson=use_orjson).loads(CONTENT)
+            self.assertIsInstance(result.districts[0], ObjectDict)
+            self.assertEqual('440103', result.districts[0].districts[0].adcode)
+
+            result = JsonDecoder('lazy', use_orjson=use_orjson).loads(CONTENT)
+            self.assertIsInstance(result, LazyObjectDict)
+            self.assertEqual('440103', result.districts[0].districts[0].adcode)
+            self.assertIsNone(result.missing)
+            self.assertEqual(json.loads(CONTENT.decode('utf-8')), result)
+        self.assertRaises(ValueError, JsonDecoder, 'xml')
+
+    def test_lazy(self):
+        result = JsonDecoder('lazy').loads(CONTENT)
+        # 未访问的嵌套对象保持为普通 dict
+        self.assertIs(list, type(dict.__getitem__(result, 'districts')))
+        districts = result.districts
+        self.assertIsInstance(districts, LazyList)
+        self.assertIs(dict, type(list.__getitem__(districts, 0)))
+        self.assertEqual('广州市', districts[0].name)
+        self.assertIs(districts[0], result['districts'][0])
+        self.assertEqual(['广州市'], [d.name for d in result.get('districts')])
+        self.assertEqual(['广州市'], [d.name for d in districts[:1]])
+        self.assertEqual('440103', dict(result.items())['districts'][0].districts[0].adcode)
+        result.status = 1
+        self.assertEqual(1, result['status'])
+        self.assertEqual(result, copy.deepcopy(result))
+        self.assertEqual(json.loads(CONTENT.decode('utf-8'))['districts'], json.loads(json.dumps(result))['districts'])
+
+    def test_wrap(self):
+        value = {'locations': [{'lat': 1, 'lng': 2}]}
+        self.assertIs(value, JsonDecoder('dict').wrap(value))
+        result = JsonDecoder('object').wrap(value)
+        self.assertIsInstance(result.locations[0], ObjectDict)
+        self.assertEqual(2, result.locations[0].lng)
+        self.assertEqual(2, JsonDecoder('lazy').wrap(value).locations[0].lng)
+
+    def test_bytes(self):
+        # 不经过 str 直接解析响应字节
+        decoder = JsonDecoder('dict', use_orjson=False)
+        content = json.dumps({'name': '广州'}).encode('utf-16')
+        self.assertEqual({'name': '广州'}, decoder.loads(content))
+
+    def test_fallback(self):
+        content = b'{"name": "\xe5\xb9\xbf\xff\xe5\xb7\x9e", "info": "a\tb"}'
+        for mode in JsonDecoder.MODES:
+            result = JsonDecoder(mode).loads(content)
+            self.assertEqual('广州', result['name'])
+            self.assertEqual('a\tb', result['info'])
+        self.assertRaises(ValueError, JsonDecoder('dict').loads, b'<html>')
+
+    def test_client(self):
+        client = AmapClient('key', decoder='dict', cache=MemoryCache())
+        result = client.decoder.loads(CONTENT)
+        self.assertIs(dict, type(result))
+        client.cache.set('k', result, 100)
+        self.assertIs(dict, type(client.cache.get('k', client.decoder)))
+        self.assertIsInstance(client.cache.get('k'), ObjectDict)
+        decoder = JsonDecoder('lazy')
+        client = AmapClient('key', decoder=decoder)
+        self.assertIs(decoder, client.decoder)
+        res = requests.Response()
+        res._content = CONTENT
+        result = client._handle_result(res, 'GET', 'https://restapi.amap.com/v3/config/district')
+        self.assertIsInstance(result, LazyObjectDict)
+        self.assertEqual(1, result.status)
+        self.assertEqual('广州市', result.districts[0].name)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import math
+import random
+import unittest
+
+from lbs.core import utils
+from lbs.core.distance import Distance
+from lbs.core.model import LocationArray
+
+
+class DistanceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.longitudes = [rand.uniform(-180, 180) for _ in range(200)]
+        self.latitudes = [rand.uniform(-89, 89) for _ in range(200)]
+
+    def test_scalar(self):
+        # Vincenty 论文中的 Flinders Peak - Buninyong 算例
+        self.assertAlmostEqual(54972.271, Distance.vincenty(
+            144.42486788888888, -37.95103341666667, 143.92649552777777, -37.65282113888889
+        ), delta=1e-3)
+        self.assertAlmostEqual(1113194.908, Distance.vincenty(0, 0, 10, 0), delta=1e-3)
+        self.assertEqual(0, Distance.vincenty(116.4, 39.9, 116.4, 39.9))
+        self.assertEqual(0, Distance.haversine(116.4, 39.9, 116.4, 39.9))
+        self.assertTrue(math.isnan(Distance.vincenty(0, 0, 179.7, 0.5)))
+        haversine = Distance.haversine(116.397, 39.908, 121.47, 31.23)
+        vincenty = Distance.vincenty(116.397, 39.908, 121.47, 31.23)
+        self.assertAlmostEqual(haversine, vincenty, delta=vincenty * 0.005)
+
+    def assertBatch(self):
+        for name in ('haversine', 'vincenty'):
+            func = getattr(Distance, name)
+            distances = getattr(Distance, name + '_batch')(116.4, 39.9, self.longitudes, self.latitudes)
+            self.assertEqual(len(self.longitudes), len(distances))
+            for i, (longitude, latitude) in enumerate(zip(self.longitudes, self.latitudes)):
+                self.assertAlmostEqual(func(116.4, 39.9, longitude, latitude), distances[i], delta=1e-6)
+        locations = LocationArray(self.longitudes, self.latitudes)
+        self.assertEqual(
+            list(Distance.haversine_batch(116.4, 39.9, self.longitudes, self.latitudes)),
+            list(Distance.haversine_batch(116.4, 39.9, locations))
+        )
+        within = Distance.within(116.4, 39.9, locations, radius=5000000)
+        self.assertTrue(within)
+        self.assertEqual(
+            [i for i, x in enumerate(Distance.haversine_batch(116.4, 39.9, locations)) if x <= 5000000], within
+        )
+
+    def test_batch(self):
+        self.assertBatch()
+
+    def test_batch_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertBatch()
+            self.assertMatrix()
+        finally:
+            utils.numpy = origin
+
+    def assertMatrix(self):
+        origins = list(zip(self.longitudes[:50], self.latitudes[:50]))
+        destinations = LocationArray(self.longitudes[50:80], self.latitudes[50:80])
+        for method in ('haversine', 'vincenty'):
+            func = getattr(Distance, method)
+            rows = 0
+            for start, block in Distance.matrix(origins, destinations, method=method, chunk_size=16):
+                self.assertEqual(rows, start)
+                self.assertTrue(len(block) <= 16)
+                for i, row in enumerate(block):
+                    self.assertEqual(len(destinations), len(row))
+                    for j, destination in enumerate(destinations):
+                        expected = func(origins[start + i][0], origins[start + i][1], destination.longitude,
+                                        destination.latitude)
+                        self.assertAlmostEqual(expected, row[j], delta=1e-6)
+                rows += len(block)
+            self.assertEqual(len(origins), rows)
+        self.assertRaises(ValueError, list, Distance.matrix(origins, destinations, method='euclid'))
+
+    def test_matrix(self):
+        self.assertMatrix()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import copy
+import os
+import shutil
+import tempfile
+import json
+import unittest
+
+import requests
+
+from lbs import QQMapClient
+from lbs.core.district import DistrictIndex, LEVEL_CITY, LEVEL_DISTRICT, LEVEL_PROVINCE
+
+QQ_DISTRICT_LIST = {'status': 0, 'result': [
+    [
+        {'id': '110000', 'name': '北京', 'fullname': '北京市', 'location': {'lat': 39.9, 'lng': 116.4}, 'cidx': [0, 1]},
+        {'id': '440000', 'name': '广东', 'fullname': '广东省', 'location': {'lat': 23.1, 'lng': 113.2}, 'cidx': [2, 3]},
+    ],
+    [
+        {'id': '110101', 'name': '东城', 'fullname': '东城区', 'location': {'lat': 39.9, 'lng': 116.4}},
+        {'id': '110102', 'name': '西城', 'fullname': '西城区', 'location': {'lat': 39.9, 'lng': 116.3}},
+        {'id': '440100', 'name': '广州', 'fullname': '广州市', 'location': {'lat': 23.1, 'lng': 113.2}, 'cidx': [0, 1]},
+        {'id': '440300', 'name': '深圳', 'fullname': '深圳市', 'location': {'lat': 22.5, 'lng': 114.0}, 'cidx': [2, 2]},
+    ],
+    [
+        {'id': '440103', 'fullname': '荔湾区', 'location': {'lat': 23.1, 'lng': 113.2}},
+        {'id': '440104', 'fullname': '越秀区', 'location': {'lat': 23.1, 'lng': 113.2}},
+        {'id': '440303', 'fullname': '罗湖区', 'location': {'lat': 22.5, 'lng': 114.1}},
+    ],
+]}
+
+AMAP_DISTRICT = {'status': '1', 'districts': [{
+    'adcode': '440300', 'name': '深圳市', 'center': '114.057868,22.543099', 'citycode': '0755', 'level': 'city',
+    'polyline': '113,22;115,22;115,23;113,23', 'districts': [
+        {'adcode': '440303', 'name': '罗湖区', 'center': '114.1,22.5', 'citycode': '0755', 'level': 'district',
+         'districts': [{'adcode': '440303', 'name': '东门街道', 'center': '114.1,22.5', 'level': 'street'}]},
+        {'adcode': '440304', 'name': '福田区', 'center': '114.0,22.5', 'citycode': '0755', 'level': 'district',
+         'districts': []},
+    ]
+}]}
+
+
+class FakeTools(object):
+
+    def __init__(self, boundaries):
+        self.boundaries = boundaries
+        self.calls = []
+
+    def district(self, keywords=None, subdistrict=1, extensions='base', **kwargs):
+        self.calls.append(keywords)
+        return {'status': '1', 'districts': [{'adcode': keywords, 'polyline': self.boundaries.get(keywords, [])}]}
+
+
+class FakeClient(object):
+
+    def __init__(self, boundaries):
+        self.tools = FakeTools(boundaries)
+
+
+class FakeSession(object):
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(url)
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res._content = json.dumps(self.result).encode('utf-8')
+        return res
+
+
+class DistrictIndexTestCase(unittest.TestCase):
+
+    def test_qq(self):
+        index = DistrictIndex()
+        self.assertEqual(9, index.load_qq(QQ_DISTRICT_LIST))
+        self.assertEqual(9, len(index))
+        self.assertIn(440100, index)
+        guangzhou = index.get('440100')
+        self.assertEqual(('广州', '广州市', LEVEL_CITY, '440000'), (
+            guangzhou.name, guangzhou.fullname, guangzhou.level, guangzhou.parent
+        ))
+        self.assertEqual('荔湾区', index.get('440103').name)
+        # 直辖市的区县位于第二级
+        self.assertEqual([('110101', LEVEL_DISTRICT), ('110102', LEVEL_DISTRICT)], [
+            (d.adcode, d.level) for d in index.descendants('110000')
+        ])
+        self.assertEqual(['110000', '440000'], [d.adcode for d in index.children()])
+        self.assertEqual(['440103', '440104'], [d.adcode for d in index.children('440100')])
+        self.assertEqual(['440100', '440000'], [d.adcode for d in index.ancestors('440103')])
+        self.assertEqual(['440103', '440104', '440303'], [
+            d.adcode for d in index.descendants('440000', level=LEVEL_DISTRICT)
+        ])
+        self.assertEqual(['440000', '440100'], [d.adcode for d in index.prefix('广')])
+        self.assertEqual(['440300', '440303'], [d.adcode for d in index.prefix('4403')])
+        self.assertEqual(['110101', '110102'], [d.adcode for d in index.search('城')])
+        self.assertEqual(['440000'], [d.adcode for d in index.search('广', level=LEVEL_PROVINCE)])
+        self.assertEqual([], index.search('%'))
+
+    def test_sync_qq(self):
+        client = QQMapClient('key')
+        client._http = FakeSession(QQ_DISTRICT_LIST)
+        index = DistrictIndex()
+        self.assertEqual(9, index.sync_qq(client))
+        self.assertEqual(1, len(client._http.calls))
+        self.assertEqual('440000', index.get('440100').parent)
+        self.assertEqual(0, index.sync_qq(client))
+
+    def test_async_client(self):
+        from lbs.client.aio import AsyncQQMapClient
+        self.assertRaises(TypeError, DistrictIndex().sync_qq, AsyncQQMapClient('key'))
+
+    def test_incremental(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'district.db')
+            index = DistrictIndex(path)
+            index.load_qq(QQ_DISTRICT_LIST)
+            self.assertEqual(0, index.load_qq(QQ_DISTRICT_LIST))
+
+            data = copy.deepcopy(QQ_DISTRICT_LIST)
+            # 罗湖区改名、删除西城区
+            data['result'][2][2]['fullname'] = '罗湖新区'
+            data['result'][0][0]['cidx'] = [0, 0]
+            del data['result'][1][1]
+            for item in data['result'][0][1:]:
+                item['cidx'] = [item['cidx'][0] - 1, item['cidx'][1] - 1]
+            # 广东省、深圳市、罗湖区写入，西城区删除
+            self.assertEqual(5, index.load_qq(data))
+            self.assertEqual('罗湖新区', index.get('440303').fullname)
+            self.assertIsNone(index.get('110102'))
+            self.assertEqual('越秀区', index.get('440104').fullname)
+
+            index = DistrictIndex(path)
+            self.assertEqual(8, len(index))
+            self.assertEqual('罗湖新区', index.get('440303').fullname)
+            self.assertEqual(0, index.load_qq(data))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_amap(self):
+        index = DistrictIndex()
+        index.load_qq(QQ_DISTRICT_LIST)
+        # 深圳市、新增福田区、罗湖区中心点变化、深圳市边界
+        self.assertEqual(4, index.load_amap(AMAP_DISTRICT))
+        shenzhen = index.get('440300')
+        self.assertEqual(('440000', '0755', 114.057868), (shenzhen.parent, shenzhen.citycode, shenzhen.longitude))
+        self.assertEqual(['440303', '440304'], [d.adcode for d in index.children('440300')])
+        self.assertEqual(0, index.load_amap(AMAP_DISTRICT))
+        self.assertEqual('440300', index.locate(114.0, 22.5).adcode)
+        self.assertIsNone(index.locate(116.4, 39.9))
+
+        client = FakeClient({
+            '440303': '114,22;114.5,22;114.5,23;114,23',
+            '440304': '113,22;114,22;114,23;113,23|113.2,22.2;113.4,22.2;113.4,22.4;113.2,22.4',
+        })
+        self.assertEqual(2, index.fetch_amap_boundaries(client, level=LEVEL_DISTRICT))
+        self.assertEqual(['110101', '110102', '440103', '440104', '440303', '440304'], sorted(client.tools.calls))
+        self.assertEqual('440303', index.locate(114.2, 22.5).adcode)
+        self.assertEqual('440304', index.locate(113.5, 22.5).adcode)
+        # 福田区内环
+        self.assertEqual('440300', index.locate(113.3, 22.3).adcode)
+        self.assertEqual('440300', index.locate(114.2, 22.5, level=LEVEL_CITY).adcode)
+        self.assertEqual(['440303', '440304', '440300', None], [
+            district and district.adcode
+            for district in index.locate_batch([114.2, 113.5, 113.3, 116.4], [22.5, 22.5, 22.3, 39.9])
+        ])
+        self.assertEqual(0, index.fetch_amap_boundaries(client, level=LEVEL_DISTRICT))
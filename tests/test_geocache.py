@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+from lbs.core.distance import Distance
+from lbs.core.geocache import RegeoCache
+from lbs.core.tile import Tile
+
+
+class RegeoCacheTestCase(unittest.TestCase):
+
+    def test_level_for_tolerance(self):
+        for tolerance in (5, 30, 500, 5000):
+            level = RegeoCache.level_for_tolerance(tolerance)
+            size = Tile.ground_resolution(0, level) * 256
+            self.assertGreaterEqual(size, tolerance)
+            self.assertLess(size / 2, tolerance)
+
+    def test_get_set(self):
+        cache = RegeoCache(tolerance=30)
+        self.assertIsNone(cache.get(116.397, 39.908))
+        cache.set(116.397, 39.908, {'formatted_address': 'a'})
+        cache.set(116.3975, 39.908, {'formatted_address': 'b'})
+        self.assertEqual('a', cache.get(116.39701, 39.90801).formatted_address)
+        self.assertEqual('b', cache.get(116.39749, 39.908).formatted_address)
+        # 约 27 米
+        self.assertEqual('b', cache.get(116.3978, 39.908).formatted_address)
+        self.assertIsNone(cache.get(116.3985, 39.908))
+        self.assertIsNone(cache.get(116.397, 39.908, namespace='other'))
+        self.assertEqual(
+            {'hits': 3, 'misses': 3, 'hit_rate': 0.5, 'evictions': 0, 'size': 2}, cache.stats()
+        )
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertIsNone(cache.get(116.397, 39.908))
+
+    def test_neighbour_tiles(self):
+        # 任意位置 tolerance 内的结果都可命中，包括跨越多个瓦片的情况
+        for level in (None, 22):
+            cache = RegeoCache(tolerance=50, level=level)
+            cache.set(121.47, 31.23, {'v': 1})
+            for i in range(-20, 21):
+                longitude = 121.47 + i * 0.00003
+                latitude = 31.23 - i * 0.00002
+                distance = Distance.haversine(121.47, 31.23, longitude, latitude)
+                result = cache.get(longitude, latitude)
+                if distance <= 50:
+                    self.assertEqual(1, result.v)
+                else:
+                    self.assertIsNone(result)
+
+    def test_eviction(self):
+        cache = RegeoCache(tolerance=10, maxsize=2, ttl=100)
+        cache.set(116.0, 39.0, {'v': 1})
+        cache.set(117.0, 39.0, {'v': 2})
+        self.assertEqual(1, cache.get(116.0, 39.0).v)
+        cache.set(118.0, 39.0, {'v': 3})
+        self.assertIsNone(cache.get(117.0, 39.0))
+        self.assertEqual(1, cache.get(116.0, 39.0).v)
+        self.assertEqual(1, cache.stats()['evictions'])
+        cache.ttl = -1
+        cache.set(119.0, 39.0, {'v': 4})
+        self.assertIsNone(cache.get(119.0, 39.0))
+        self.assertEqual(1, len(cache))
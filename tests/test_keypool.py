@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+from lbs.core.exceptions import LbsClientException
+from lbs.core.keypool import KeyPool
+
+
+class KeyPoolTestCase(unittest.TestCase):
+
+    def test_round_robin(self):
+        pool = KeyPool(['k1', ('k2', 's2'), ('k3', 's3')])
+        self.assertEqual(
+            [('k1', None), ('k2', 's2'), ('k3', 's3'), ('k1', None)],
+            [pool.acquire() for _ in range(4)]
+        )
+        self.assertEqual(2, pool.stats()['k1']['in_flight'])
+        pool.release('k1')
+        self.assertEqual(1, pool.stats()['k1']['in_flight'])
+
+    def test_least_loaded(self):
+        pool = KeyPool(['k1', 'k2', 'k3'], strategy=KeyPool.LEAST_LOADED)
+        self.assertEqual(['k1', 'k2', 'k3'], [pool.acquire()[0] for _ in range(3)])
+        pool.release('k2')
+        self.assertEqual('k2', pool.acquire()[0])
+        pool.release('k3')
+        self.assertEqual('k3', pool.acquire()[0])
+
+    def test_cooldown(self):
+        pool = KeyPool(['k1', 'k2'])
+        pool.cooldown('k1')
+        self.assertEqual(['k2'], pool.available_keys())
+        self.assertEqual(['k2', 'k2'], [pool.acquire()[0] for _ in range(2)])
+        pool.cooldown('k2')
+        self.assertRaises(LbsClientException, pool.acquire)
+        pool.cooldown('k1', 0)
+        self.assertEqual('k1', pool.acquire()[0])
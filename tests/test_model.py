@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import math
+import unittest
+
+from lbs import AmapClient, QQMapClient
+from lbs.core import utils
+from lbs.core.model import DistanceMatrix, LbsLocation, LocationArray
+
+
+class LocationArrayTestCase(unittest.TestCase):
+
+    def test_slots(self):
+        location = LbsLocation(116.397, 39.908)
+        self.assertFalse(hasattr(location, '__dict__'))
+        self.assertRaises(AttributeError, setattr, location, 'altitude', 0)
+
+    def assertLocationArray(self):
+        locations = LocationArray.from_locations([LbsLocation(116.397, 39.908), (121.47, 31.23), (113.26, 23.13)])
+        self.assertEqual(3, len(locations))
+        self.assertEqual([(116.397, 39.908), (121.47, 31.23), (113.26, 23.13)], locations.to_pairs())
+        self.assertEqual(
+            [(116.397, 39.908), (121.47, 31.23), (113.26, 23.13)],
+            [(location.longitude, location.latitude) for location in locations]
+        )
+        self.assertEqual(121.47, locations[1].longitude)
+        self.assertEqual(23.13, locations[-1].latitude)
+        self.assertEqual([(121.47, 31.23)], locations[1:2].to_pairs())
+        self.assertIs(locations, LocationArray.from_locations(locations))
+        self.assertRaises(ValueError, LocationArray, [1, 2], [1])
+
+    def test_location_array(self):
+        self.assertLocationArray()
+
+    def test_location_array_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertLocationArray()
+        finally:
+            utils.numpy = origin
+
+    def test_parse_location(self):
+        locations = LocationArray([116.397, 121.47], [39.908, 31.23])
+        self.assertEqual(("116.397,39.908|121.47,31.23", 2), AmapClient.parse_location(locations))
+        self.assertEqual(("39.908,116.397;31.23,121.47", 2), QQMapClient.parse_location(locations, join_str=";"))
+        self.assertEqual(("116.397,39.908", 1), AmapClient.parse_location(locations[:1], False))
+        self.assertEqual(0, AmapClient.parse_location(locations[:0])[1])
+
+    def assertDistanceMatrix(self):
+        matrix = DistanceMatrix(3, 4)
+        self.assertTrue(matrix.ok)
+        self.assertTrue(math.isnan(matrix.distance(2, 3)))
+        matrix.set_block(1, 2, [[1, 2], [3, 4]], [[5, 6], [7, 8]])
+        self.assertEqual(4, matrix.distance(2, 3))
+        self.assertEqual(6, matrix.duration(1, 3))
+        self.assertTrue(math.isnan(matrix.distance(0, 3)))
+
+    def test_distance_matrix(self):
+        self.assertDistanceMatrix()
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertDistanceMatrix()
+        finally:
+            utils.numpy = origin
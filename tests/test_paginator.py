@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import threading
+import unittest
+
+from lbs.client.paginator import Paginator
+
+
+class PaginatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pages = {
+            1: {'count': '7', 'pois': [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]},
+            2: {'count': '0', 'pois': [{'id': 'c'}, {'id': 'd'}, {'id': 'e'}]},
+            3: {'count': '0', 'pois': [{'id': 'f'}]},
+            4: {'count': '0', 'pois': [{'id': 'g'}]},
+        }
+        self.calls = []
+
+    def fetch(self, page):
+        self.calls.append(page)
+        return self.pages.get(page, {'count': '0', 'pois': []})
+
+    def test_total(self):
+        # 共 7 条，第 3 页后已获取 7 条，不再请求第 4 页
+        paginator = Paginator(self.fetch, 'pois')
+        self.assertEqual(['a', 'b', 'c', 'd', 'e', 'f'], [poi['id'] for poi in paginator])
+        self.assertEqual([1, 2, 3], self.calls)
+
+    def test_empty_page(self):
+        paginator = Paginator(self.fetch, 'pois', total_field=None, dedup=False, prefetch=False)
+        self.assertEqual(['a', 'b', 'c', 'c', 'd', 'e', 'f', 'g'], [poi['id'] for poi in paginator])
+        self.assertEqual([1, 2, 3, 4, 5], self.calls)
+
+    def test_max_pages(self):
+        paginator = Paginator(self.fetch, 'pois', start_page=2, max_pages=2)
+        self.assertEqual(['c', 'd', 'e', 'f'], [poi['id'] for poi in paginator])
+        self.assertEqual([2, 3], self.calls)
+
+    def test_prefetch(self):
+        # 消费第 1 页时第 2 页已在后台请求
+        fetched = threading.Event()
+
+        def fetch(page):
+            if page == 2:
+                fetched.set()
+            return self.fetch(page)
+
+        iterator = iter(Paginator(fetch, 'pois'))
+        self.assertEqual('a', next(iterator)['id'])
+        self.assertTrue(fetched.wait(5))
+
+    def test_error(self):
+        def fetch(page):
+            if page == 2:
+                raise ValueError(page)
+            return self.fetch(page)
+
+        iterator = iter(Paginator(fetch, 'pois'))
+        self.assertEqual(['a', 'b', 'c'], [next(iterator)['id'] for _ in range(3)])
+        self.assertRaises(ValueError, next, iterator)
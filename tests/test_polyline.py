@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import random
+import unittest
+
+from lbs.core import utils
+from lbs.core.model import LocationArray
+from lbs.core.polyline import (
+    RouteGeometry, decode_amap_route_polylines, decode_qq_polyline, decode_qq_route_polylines, iter_qq_polyline,
+    parse_amap_polyline, simplify, simplify_indices
+)
+
+
+class QQPolylineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.coors = [39.984154, 116.30749] + [rand.randint(-500, 500) for _ in range(2000)]
+        # 官方文档中的解压方法
+        self.expected = list(self.coors)
+        for i in range(2, len(self.expected)):
+            self.expected[i] = self.expected[i - 2] + self.expected[i] / 1000000
+
+    def assertDecoded(self, locations):
+        self.assertEqual(len(self.coors) // 2, len(locations))
+        for i, location in enumerate(locations):
+            self.assertAlmostEqual(self.expected[i * 2], location.latitude, delta=1e-9)
+            self.assertAlmostEqual(self.expected[i * 2 + 1], location.longitude, delta=1e-9)
+
+    def test_decode(self):
+        locations = decode_qq_polyline(self.coors)
+        self.assertIsInstance(locations, LocationArray)
+        self.assertDecoded(locations)
+        self.assertEqual((116.30749, 39.984154), locations.to_pairs()[0])
+        self.assertEqual(0, len(decode_qq_polyline([])))
+        self.assertRaises(ValueError, decode_qq_polyline, [39.9, 116.3, 1])
+
+    def test_decode_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertDecoded(decode_qq_polyline(self.coors))
+        finally:
+            utils.numpy = origin
+
+    def test_iter(self):
+        locations = iter_qq_polyline(self.coors)
+        self.assertFalse(isinstance(locations, list))
+        self.assertDecoded(list(locations))
+
+    def test_route_polylines(self):
+        result = {'routes': [
+            {'mode': 'DRIVING', 'polyline': [39.9, 116.3, 1000, -1000]},
+            {'mode': 'TRANSIT', 'steps': [
+                {'mode': 'WALKING', 'polyline': [39.9, 116.3]},
+                {'mode': 'TRANSIT', 'lines': [{'polyline': [39.9, 116.3, 0, 1000]}]},
+            ]},
+        ]}
+        decode_qq_route_polylines(result)
+        routes = result['routes']
+        self.assertEqual([(116.3, 39.9), (116.299, 39.901)], [
+            (round(longitude, 6), round(latitude, 6)) for longitude, latitude in routes[0]['polyline'].to_pairs()
+        ])
+        self.assertEqual(1, len(routes[1]['steps'][0]['polyline']))
+        self.assertAlmostEqual(116.301, routes[1]['steps'][1]['lines'][0]['polyline'][1].longitude, delta=1e-9)
+
+
+class AmapPolylineTestCase(unittest.TestCase):
+
+    def assertParse(self):
+        locations = parse_amap_polyline("116.481028,39.989643;116.481137,39.989592;116.4813,39.9895")
+        self.assertEqual([(116.481028, 39.989643), (116.481137, 39.989592), (116.4813, 39.9895)], locations.to_pairs())
+        self.assertEqual(0, len(parse_amap_polyline([])))
+        self.assertRaises(ValueError, parse_amap_polyline, "116.48,39.98;116.49")
+        geometry = RouteGeometry.from_polylines(["116.1,39.1;116.2,39.2", [], "116.2,39.2;116.3,39.3;116.4,39.4"])
+        self.assertEqual(3, len(geometry))
+        self.assertEqual([0, 2, 2, 5], geometry.offsets)
+        self.assertEqual(0, len(geometry.step(1)))
+        self.assertEqual([(116.2, 39.2), (116.3, 39.3), (116.4, 39.4)], geometry.step(2).to_pairs())
+
+    def test_parse(self):
+        self.assertParse()
+
+    def test_parse_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertParse()
+            self.assertSimplify()
+        finally:
+            utils.numpy = origin
+
+    def assertSimplify(self):
+        # 沿经线每 0.0001 度（约 11 米）一个点，中间有一个偏离约 50 米的点
+        longitudes = [116.4] * 21
+        longitudes[10] = 116.4006
+        locations = LocationArray(longitudes, [39.9 + i * 0.0001 for i in range(21)])
+        self.assertEqual([0, 9, 10, 11, 20], simplify_indices(locations, 10))
+        self.assertEqual([0, 20], simplify_indices(locations, 100))
+        self.assertEqual(5, len(simplify(locations, 10)))
+        geometry = RouteGeometry(locations, [0, 5, 21]).simplify(100)
+        self.assertEqual([0, 2, 4], geometry.offsets)
+        self.assertEqual([(116.4, 39.9), (116.4, 39.9004)], [
+            (round(longitude, 6), round(latitude, 6)) for longitude, latitude in geometry.step(0).to_pairs()
+        ])
+
+    def test_simplify(self):
+        self.assertSimplify()
+
+    def test_route_polylines(self):
+        result = {'route': {
+            'paths': [{'steps': [{'polyline': "116.1,39.1;116.2,39.2"}, {'polyline': "116.2,39.2;116.3,39.3"}]}],
+            'transits': [{'segments': [
+                {'walking': {'steps': [{'polyline': "116.1,39.1;116.2,39.2"}]},
+                 'bus': {'buslines': [{'polyline': "116.2,39.2;116.3,39.3"}, {'polyline': "116.2,39.2"}]}},
+                {'walking': [], 'bus': {'buslines': []}},
+            ]}],
+        }}
+        decode_amap_route_polylines(result)
+        path = result['route']['paths'][0]
+        self.assertEqual(4, len(path['geometry'].locations))
+        self.assertEqual([(116.2, 39.2), (116.3, 39.3)], path['steps'][1]['polyline'].to_pairs())
+        transit = result['route']['transits'][0]
+        self.assertEqual([0, 2, 4], transit['geometry'].offsets)
+        self.assertEqual(1, len(transit['segments'][0]['bus']['buslines'][1]['polyline']))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+import unittest
+
+from lbs.core.exceptions import LbsRateLimitException
+from lbs.core.ratelimit import MemoryBackend, RateLimiter, SqliteBackend
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def assertBackend(self, backend):
+        self.assertEqual(0, backend.reserve('a', 10, 2, 100.0))
+        self.assertEqual(0, backend.reserve('a', 10, 2, 100.0))
+        self.assertAlmostEqual(0.1, backend.reserve('a', 10, 2, 100.0))
+        self.assertAlmostEqual(0.2, backend.reserve('a', 10, 2, 100.0))
+        self.assertIsNone(backend.reserve('a', 10, 2, 100.0, blocking=False))
+        self.assertAlmostEqual(0.05, backend.reserve('a', 10, 2, 100.25))
+        backend.refund('a')
+        self.assertAlmostEqual(0.05, backend.reserve('a', 10, 2, 100.25))
+        self.assertTrue(backend.incr_daily('a', '2020-01-01', 2))
+        self.assertTrue(backend.incr_daily('a', '2020-01-01', 2))
+        self.assertFalse(backend.incr_daily('a', '2020-01-01', 2))
+        self.assertEqual(2, backend.get_daily('a', '2020-01-01'))
+        backend.decr_daily('a', '2020-01-01')
+        self.assertEqual(1, backend.get_daily('a', '2020-01-01'))
+        self.assertTrue(backend.incr_daily('a', '2020-01-01', 2))
+        self.assertTrue(backend.incr_daily('a', '2020-01-02', 2))
+        self.assertEqual(0, backend.get_daily('a', '2020-01-01'))
+
+    def test_memory_backend(self):
+        self.assertBackend(MemoryBackend())
+
+    def test_sqlite_backend(self):
+        path = tempfile.mkdtemp()
+        try:
+            backend = SqliteBackend(os.path.join(path, 'ratelimit.db'))
+            self.assertBackend(backend)
+            backend.close()
+        finally:
+            shutil.rmtree(path)
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(qps=100, daily_quota=5, endpoint_limits={'/v3/geocode/regeo': {'qps': 1}})
+        self.assertEqual(0, limiter.reserve('/v3/geocode/regeo'))
+        self.assertGreater(limiter.reserve('/v3/geocode/regeo'), 0.9)
+        self.assertEqual(0, limiter.reserve('/v3/geocode/geo'))
+        limiter.acquire()
+        self.assertEqual(4, limiter.daily_usage())
+        self.assertEqual(2, limiter.daily_usage('/v3/geocode/regeo'))
+        limiter.reserve()
+        self.assertRaises(LbsRateLimitException, limiter.reserve)
+
+    def test_non_blocking(self):
+        limiter = RateLimiter(qps=1, blocking=False)
+        limiter.acquire()
+        with self.assertRaises(LbsRateLimitException) as cm:
+            limiter.acquire()
+        self.assertEqual('QPS_EXCEEDED', cm.exception.errcode)
+        # 被拒绝的请求不计入每日调用量
+        self.assertEqual(1, limiter.daily_usage())
+
+    def test_rejected_reserve(self):
+        limiter = RateLimiter(qps=2, blocking=False, endpoint_limits={'/v3/geocode/regeo': {'qps': 1}})
+        limiter.reserve('/v3/geocode/regeo')
+        with self.assertRaises(LbsRateLimitException) as cm:
+            limiter.reserve('/v3/geocode/regeo')
+        self.assertEqual('QPS_EXCEEDED', cm.exception.errcode)
+        self.assertEqual(1, limiter.daily_usage())
+        self.assertEqual(1, limiter.daily_usage('/v3/geocode/regeo'))
+        # 接口限制拒绝时全局令牌已归还
+        limiter.reserve('/v3/geocode/geo')
+        self.assertRaises(LbsRateLimitException, limiter.reserve)
+
+        limiter = RateLimiter(qps=1, blocking=False, endpoint_limits={'/v3/geocode/regeo': {'daily_quota': 1}})
+        limiter.reserve('/v3/geocode/regeo')
+        with self.assertRaises(LbsRateLimitException) as cm:
+            limiter.reserve('/v3/geocode/regeo')
+        self.assertEqual('QPS_EXCEEDED', cm.exception.errcode)
+        with self.assertRaises(LbsRateLimitException) as cm:
+            limiter.backend.refund('default')
+            limiter.reserve('/v3/geocode/regeo')
+        self.assertEqual('DAILY_QUOTA_EXCEEDED', cm.exception.errcode)
+        # 超出每日配额时令牌及全局调用量已归还
+        self.assertEqual(1, limiter.daily_usage())
+        self.assertEqual(0, limiter.reserve())
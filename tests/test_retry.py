@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+import requests
+
+from lbs.core.exceptions import LbsClientException
+from lbs.core.retry import RetryPolicy
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        response = requests.Response()
+        response.status_code = 503
+        http_error = LbsClientException(None, None, response=response)
+        self.assertTrue(policy.is_retryable('GET', http_error))
+        self.assertFalse(policy.is_retryable('POST', http_error))
+        response.status_code = 404
+        self.assertFalse(policy.is_retryable('GET', http_error))
+        self.assertTrue(policy.is_retryable('POST', LbsClientException('10021', 'CUQPS'), ('10021', )))
+        self.assertFalse(policy.is_retryable('GET', LbsClientException('10001', 'INVALID_USER_KEY'), ('10021', )))
+        self.assertTrue(policy.is_retryable('GET', requests.ConnectionError(), transport=True))
+        self.assertFalse(policy.is_retryable('POST', requests.ReadTimeout(), transport=True))
+        self.assertTrue(policy.is_retryable('POST', requests.ConnectTimeout(), transport=True))
+        policy = RetryPolicy(retry_errcodes=[120])
+        self.assertTrue(policy.is_retryable('GET', LbsClientException(120, 'qps'), ('10021', )))
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        self.assertEqual([1, 2, 4, 5], [policy.backoff(i) for i in range(4)])
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+        for i in range(10):
+            self.assertTrue(0 <= policy.backoff(i) <= 5)
+
+    def test_next_delay(self):
+        policy = RetryPolicy(max_retries=2, backoff_factor=1, jitter=False, deadline=10)
+        error = requests.ConnectionError()
+        self.assertEqual(1, policy.next_delay('GET', error, 0, 0, transport=True))
+        self.assertEqual(2, policy.next_delay('GET', error, 1, 0, transport=True))
+        self.assertIsNone(policy.next_delay('GET', error, 2, 0, transport=True))
+        self.assertIsNone(policy.next_delay('GET', error, 1, 9, transport=True))
+        self.assertIsNone(policy.next_delay('GET', LbsClientException('1', '1'), 0, 0))
+        self.assertEqual({'retries': 2, 'giveups': 2}, policy.stats())
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import threading
+import time
+import unittest
+
+from lbs.core.singleflight import SingleFlight
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.001)
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def _run(self, flight, func, n):
+        results = [None] * n
+
+        def worker(i):
+            try:
+                results[i] = flight.do('k', func)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i, )) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_share_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            wait_for(lambda: flight.shared == 4)
+            return {'v': [1]}
+
+        results = self._run(flight, func, 5)
+        self.assertEqual(1, len(calls))
+        self.assertEqual([{'v': [1]}] * 5, results)
+        # 每个调用得到独立的结果
+        self.assertEqual(5, len(set(id(result) for result in results)))
+        self.assertEqual(0, len(flight))
+        self.assertEqual({'v': 2}, flight.do('k', lambda: {'v': 2}))
+
+    def test_share_exception(self):
+        flight = SingleFlight()
+
+        def func():
+            wait_for(lambda: flight.shared == 2)
+            raise ValueError('error')
+
+        results = self._run(flight, func, 3)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(0, len(flight))
+
+    def test_different_keys(self):
+        flight = SingleFlight()
+        self.assertEqual(1, flight.do('a', lambda: 1))
+        self.assertEqual(2, flight.do('b', lambda: 2))
+        self.assertEqual(0, flight.shared)
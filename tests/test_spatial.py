@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import math
+import random
+import unittest
+
+from lbs.core import utils
+from lbs.core.model import LocationArray
+from lbs.core.spatial import PolygonIndex, parse_polygon
+
+
+def brute_force_contains(rings, longitude, latitude):
+    inside = False
+    for ring in rings:
+        for i in range(len(ring)):
+            x1, y1 = ring[i - 1]
+            x2, y2 = ring[i]
+            if (y1 > latitude) != (y2 > latitude) and longitude < (x2 - x1) * (latitude - y1) / (y2 - y1) + x1:
+                inside = not inside
+    return inside
+
+
+def star(center_x, center_y, radius, points, rnd):
+    ring = []
+    for i in range(points):
+        angle = 2 * math.pi * i / points
+        r = radius * rnd.uniform(0.3, 1.0)
+        ring.append((center_x + r * math.cos(angle), center_y + r * math.sin(angle)))
+    return ring
+
+
+class SpatialTestCase(unittest.TestCase):
+
+    def test_parse_polygon(self):
+        self.assertEqual(
+            [[(1.0, 1.0), (2.0, 1.0), (2.0, 2.0)], [(3.0, 3.0), (4.0, 3.0), (4.0, 4.0)]],
+            parse_polygon('1,1;2,1;2,2|3,3;4,3;4,4|5,5;6,6')
+        )
+        self.assertEqual([[(1.0, 1.0), (2.0, 1.0), (2.0, 2.0)]], parse_polygon([[(1, 1), (2, 1), (2, 2)]]))
+        self.assertEqual([], parse_polygon(''))
+
+    def test_query(self):
+        index = PolygonIndex(cell_size=0.5)
+        self.assertFalse(index.add('empty', []))
+        # 省 -> 市（带内环），同级相邻
+        index.add('province', '100,20;110,20;110,30;100,30', 1)
+        index.add('city_a', '101,21;105,21;105,25;101,25|102,22;103,22;103,23;102,23', 2)
+        index.add('city_b', '105,21;108,21;108,25;105,25', 2)
+        self.assertEqual(3, len(index))
+        self.assertEqual('city_a', index.query(101.5, 21.5))
+        self.assertEqual('province', index.query(101.5, 21.5, level=1))
+        self.assertEqual('province', index.query(102.5, 22.5))
+        self.assertIsNone(index.query(102.5, 22.5, level=2))
+        self.assertEqual('city_b', index.query(106, 24))
+        self.assertEqual('province', index.query(109, 29))
+        self.assertIsNone(index.query(111, 25))
+        self.assertEqual(
+            ['city_a', 'province', 'city_b', None],
+            index.query_batch([101.5, 102.5, 106, 111], [21.5, 22.5, 24, 25])
+        )
+        self.assertEqual(['city_a', None], index.query_batch([(101.5, 21.5), (0, 0)]))
+
+    def test_query_batch(self):
+        rnd = random.Random(7)
+        rings = {
+            'a': [star(116.4, 39.9, 1.0, 300, rnd)],
+            'b': [star(117.0, 40.2, 0.8, 200, rnd), star(115.0, 39.0, 0.3, 50, rnd)],
+        }
+        index = PolygonIndex(cell_size=0.05)
+        for key, polygon in rings.items():
+            index.add(key, polygon)
+        longitudes = [rnd.uniform(114.5, 118) for _ in range(5000)]
+        latitudes = [rnd.uniform(38.5, 41.5) for _ in range(5000)]
+        expected = []
+        for x, y in zip(longitudes, latitudes):
+            keys = [key for key in sorted(rings) if brute_force_contains(rings[key], x, y)]
+            expected.append(keys[0] if keys else None)
+        self.assertTrue(10 < expected.count('a') and 10 < expected.count('b'))
+        self.assertEqual(expected, [index.query(x, y) for x, y in zip(longitudes, latitudes)])
+        self.assertEqual(expected, index.query_batch(longitudes, latitudes))
+        self.assertEqual(expected, index.query_batch(LocationArray(longitudes, latitudes)))
+        numpy = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertEqual(expected, index.query_batch(longitudes, latitudes))
+        finally:
+            utils.numpy = numpy
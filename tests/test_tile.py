@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import math
+import random
+import unittest
+
+from lbs.core import utils
+from lbs.core.tile import Tile
+
+
+class TileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.latitudes = [rand.uniform(-89, 89) for _ in range(500)]
+        self.longitudes = [rand.uniform(-180, 180) for _ in range(500)]
+
+    def test_quad_key(self):
+        self.assertEqual('213', Tile.tile_xy_to_quad_key(3, 5, 3))
+        self.assertEqual('', Tile.tile_xy_to_quad_key(3, 5, 0))
+        self.assertEqual('0000000213', Tile.tile_xy_to_quad_key(3, 5, 10))
+        self.assertEqual(int('213', 4), Tile.tile_xy_to_quad_int(3, 5))
+        self.assertEqual('0213', Tile.quad_int_to_quad_key(int('213', 4), 4))
+
+    def assertBatch(self, level_of_detail):
+        pixel_x, pixel_y = Tile.lat_long_to_pixel_xy_batch(self.latitudes, self.longitudes, level_of_detail)
+        tile_x, tile_y = Tile.lat_long_to_tile_xy_batch(self.latitudes, self.longitudes, level_of_detail)
+        quad_ints = Tile.tile_xy_to_quad_int_batch(tile_x, tile_y)
+        quad_keys = Tile.tile_xy_to_quad_key_batch(tile_x, tile_y, level_of_detail)
+        for i, (latitude, longitude) in enumerate(zip(self.latitudes, self.longitudes)):
+            expected_pixel = Tile.lat_long_to_pixel_xy(latitude, longitude, level_of_detail)
+            self.assertEqual(expected_pixel, (pixel_x[i], pixel_y[i]))
+            expected_tile = Tile.pixel_xy_to_tile_xy(*expected_pixel)
+            self.assertEqual(expected_tile, (tile_x[i], tile_y[i]))
+            self.assertEqual(Tile.tile_xy_to_quad_int(*expected_tile), quad_ints[i])
+            self.assertEqual(Tile.tile_xy_to_quad_key(*(expected_tile + (level_of_detail, ))), quad_keys[i])
+
+    def test_batch(self):
+        for level_of_detail in (0, 1, 12, 23):
+            self.assertBatch(level_of_detail)
+
+    def test_batch_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            for level_of_detail in (0, 12):
+                self.assertBatch(level_of_detail)
+        finally:
+            utils.numpy = origin
+
+    def test_quad_key_to_tile_xy(self):
+        self.assertEqual((3, 5, 3), Tile.quad_key_to_tile_xy('213'))
+        self.assertEqual((3, 5, 10), Tile.quad_key_to_tile_xy('0000000213'))
+        self.assertEqual((0, 0, 0), Tile.quad_key_to_tile_xy(''))
+        rand = random.Random(1)
+        for _ in range(500):
+            level_of_detail = rand.randint(1, 30)
+            tile_x = rand.randrange(1 << level_of_detail)
+            tile_y = rand.randrange(1 << level_of_detail)
+            quad_key = Tile.tile_xy_to_quad_key(tile_x, tile_y, level_of_detail)
+            self.assertEqual((tile_x, tile_y, level_of_detail), Tile.quad_key_to_tile_xy(quad_key))
+        for quad_key in ('214', '21a', '21 3'):
+            self.assertRaises(ValueError, Tile.quad_key_to_tile_xy, quad_key)
+
+    def assertQuadKeyBatch(self):
+        rand = random.Random(2)
+        quad_keys = [''.join(rand.choice('0123') for _ in range(rand.randint(0, 23))) for _ in range(500)]
+        tile_x, tile_y, levels = Tile.quad_key_to_tile_xy_batch(quad_keys)
+        for i, quad_key in enumerate(quad_keys):
+            self.assertEqual(Tile.quad_key_to_tile_xy(quad_key), (tile_x[i], tile_y[i], levels[i]))
+        for quad_keys in (['213', '214'], ['0', '2 1'], ['21中']):
+            self.assertRaises(ValueError, Tile.quad_key_to_tile_xy_batch, quad_keys)
+
+    def test_quad_key_batch(self):
+        self.assertQuadKeyBatch()
+        tile_x, tile_y, levels = Tile.quad_key_to_tile_xy_batch([])
+        self.assertEqual(0, len(tile_x))
+
+    def test_quad_key_batch_without_numpy(self):
+        origin = utils.numpy
+        utils.numpy = None
+        try:
+            self.assertQuadKeyBatch()
+        finally:
+            utils.numpy = origin
+
+    def test_bbox_tiles(self):
+        tiles = list(Tile.bbox_tiles(39.7, 116.2, 40.1, 116.6, 10, 12))
+        self.assertEqual(len(tiles), len(set(tiles)))
+        for level_of_detail in (10, 11, 12):
+            level_tiles = set(tile for tile in tiles if tile[2] == level_of_detail)
+            for latitude, longitude in ((39.7, 116.2), (40.1, 116.6), (39.9, 116.4)):
+                tile = Tile.pixel_xy_to_tile_xy(*Tile.lat_long_to_pixel_xy(latitude, longitude, level_of_detail))
+                self.assertIn(tile + (level_of_detail, ), level_tiles)
+        quad_keys = list(Tile.bbox_tiles(39.7, 116.2, 40.1, 116.6, 10, 12, quad_key=True))
+        self.assertEqual([Tile.tile_xy_to_quad_key(*tile) for tile in tiles], quad_keys)
+
+    def _brute_force_polygon_tiles(self, polygon, level_of_detail):
+        edges = Tile._polygon_edges(polygon, level_of_detail)
+        tiles = set()
+        for tile_y in range(int(min(e[1] for e in edges)), int(max(e[1] for e in edges)) + 1):
+            crossings = Tile._crossings(edges, tile_y + 0.5)
+            for tile_x in range(int(min(e[0] for e in edges)), int(max(e[0] for e in edges)) + 1):
+                if any(Tile._segment_intersects_box(e, tile_x, tile_y, tile_x + 1, tile_y + 1) for e in edges) or \
+                        sum(x < tile_x + 0.5 for x in crossings) % 2:
+                    tiles.add((tile_x, tile_y, level_of_detail))
+        return tiles
+
+    def _random_polygon(self, rand):
+        count = rand.randint(3, 12)
+        latitude, longitude = rand.uniform(20, 40), rand.uniform(100, 120)
+        polygon = list()
+        for i in range(count):
+            angle = 2 * math.pi * i / count
+            radius = rand.uniform(0.2, 1.0)
+            polygon.append((latitude + radius * math.sin(angle), longitude + radius * math.cos(angle)))
+        return polygon
+
+    def test_polygon_tiles(self):
+        rand = random.Random(3)
+        for i in range(20):
+            polygon = self._random_polygon(rand)
+            if i % 3 == 0:
+                # 自相交多边形按奇偶规则处理
+                rand.shuffle(polygon)
+            level_of_detail = rand.randint(6, 10)
+            tiles = list(Tile.polygon_tiles(polygon, level_of_detail))
+            self.assertEqual(len(tiles), len(set(tiles)))
+            self.assertEqual(self._brute_force_polygon_tiles(polygon, level_of_detail), set(tiles))
+            for _ in range(50):
+                latitude = rand.uniform(min(p[0] for p in polygon), max(p[0] for p in polygon))
+                longitude = rand.uniform(min(p[1] for p in polygon), max(p[1] for p in polygon))
+                edges = Tile._polygon_edges(polygon, level_of_detail)
+                x, y = Tile._lat_long_to_tile_float(latitude, longitude, level_of_detail)
+                if sum(c < x for c in Tile._crossings(edges, y)) % 2:
+                    self.assertIn((int(x), int(y), level_of_detail), tiles)
+        self.assertRaises(ValueError, list, Tile.polygon_tiles([(39.9, 116.4), (40, 116.5)], 10))
+
+    def test_polygon_quad_keys(self):
+        rand = random.Random(4)
+        for _ in range(10):
+            polygon = self._random_polygon(rand)
+            level_of_detail = rand.randint(7, 10)
+            quad_keys = list(Tile.polygon_quad_keys(polygon, level_of_detail - 4, level_of_detail))
+            self.assertEqual(sorted(quad_keys), quad_keys)
+            tiles = set()
+            for quad_key in quad_keys:
+                tile_x, tile_y, level = Tile.quad_key_to_tile_xy(quad_key)
+                self.assertTrue(level_of_detail - 4 <= level <= level_of_detail)
+                size = 1 << (level_of_detail - level)
+                for y in range(tile_y * size, (tile_y + 1) * size):
+                    for x in range(tile_x * size, (tile_x + 1) * size):
+                        tiles.add((x, y, level_of_detail))
+            self.assertEqual(set(Tile.polygon_tiles(polygon, level_of_detail)), tiles)
+            self.assertLessEqual(len(quad_keys), len(tiles))